@@ -59,19 +59,24 @@
 
 # python_server/api.py - Updated with better error handling and CORS
 
-from flask import Flask, request, jsonify
-from controllers.emojiController import convert_text_to_emoji
+import os
+from flask import Flask, Blueprint, request, jsonify
+from controllers.emojiController import convert_text_to_emoji, convert_text_to_emoji_cacheable, convert_texts_to_emoji, get_cache_stats, get_pipeline_metrics, reload_emoji_dictionaries, start_emoji_warm_up
+from controllers.streamController import update_stream, stream_events, end_stream
+from controllers.classificationController import match_category, list_categories, match_categories, start_word_vectors_loading
+from controllers.catalogController import sync_patient_items, add_patient_items, rename_patient_item, remove_patient_item, match_patient_items, get_catalog_stats
 # from controllers.classificationController import load_word_vectors, match_category, list_categories, download_word2vec_model
 
-app = Flask(__name__)
+# routes live on a blueprint so app.py can mount them through initialize_app
+api = Blueprint('api', __name__)
 
 # default api route
-@app.route('/')
+@api.route('/')
 def home():
     return '<h1>API is Running</h1>'
 
 # text to emoji route
-@app.route('/api/convert-emoji', methods=['POST'])
+@api.route('/api/convert-emoji', methods=['POST'])
 def convert_text_to_emoji_route():
     try:
         # Get JSON data from request body
@@ -87,34 +92,213 @@ def convert_text_to_emoji_route():
     except Exception as e:
         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
 
-# # text classification route
-# @app.route('/api/match', methods=['GET'])
-# def match_category_route():
-#     try:
-#         phrase = request.args.get("q", "").strip()
+# cacheable text to emoji route - same text and dictionaries give the same ETag, so
+# browsers, node_server and proxies can reuse the result or revalidate with a 304
+@api.route('/api/convert-emoji', methods=['GET'])
+def convert_text_to_emoji_get_route():
+    try:
+        output = convert_text_to_emoji_cacheable(request.args.get('text', ''))
+        return output
 
-#         if not phrase:
-#             return jsonify({"error": "Missing 'q' query parameter"}), 400
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# batch text to emoji route - many texts in one request, results in the same order
+@api.route('/api/convert-emoji/batch', methods=['POST'])
+def convert_texts_to_emoji_route():
+    try:
+        # Get JSON data from request body
+        data = request.get_json()
+
+        # Validate input
+        if not data or 'texts' not in data:
+            return jsonify({'error': 'Texts field is required in request body'}), 400
+
+        output = convert_texts_to_emoji(data)
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# live transcript route - send the latest interim transcript, get back the emoji delta
+@api.route('/api/convert-emoji/stream', methods=['POST'])
+def update_stream_route():
+    try:
+        # Get JSON data from request body
+        data = request.get_json()
+
+        # Validate input
+        if not data or 'text' not in data:
+            return jsonify({'error': 'Text field is required in request body'}), 400
+
+        output = update_stream(data)
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# live transcript events route (Server-Sent Events)
+@api.route('/api/convert-emoji/stream/<session_id>/events', methods=['GET'])
+def stream_events_route(session_id):
+    try:
+        return stream_events(session_id)
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+@api.route('/api/convert-emoji/stream/<session_id>', methods=['DELETE'])
+def end_stream_route(session_id):
+    try:
+        output = end_stream(session_id)
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# conversion cache stats route
+@api.route('/api/convert-emoji/cache-stats', methods=['GET'])
+def cache_stats_route():
+    try:
+        output = get_cache_stats()
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# per-stage latency histograms of traced conversions
+@api.route('/api/convert-emoji/metrics', methods=['GET'])
+def pipeline_metrics_route():
+    try:
+        output = get_pipeline_metrics()
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# reload the emoji dictionaries data file without restarting the server,
+# needs EMOJI_ADMIN_TOKEN as a bearer token (or a local caller when it isn't set)
+@api.route('/api/convert-emoji/dictionaries/reload', methods=['POST'])
+def reload_dictionaries_route():
+    try:
+        output = reload_emoji_dictionaries(request.remote_addr, request.headers.get('Authorization'))
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# text classification route, ?k=N adds the top-N items, subcategories and main categories.
+# 503 with Retry-After until the word vectors have loaded
+@api.route('/api/match', methods=['GET'])
+def match_category_route():
+    try:
+        phrase = request.args.get("q", "").strip()
+
+        if not phrase:
+            return jsonify({"error": "Missing 'q' query parameter"}), 400
         
-#         output = match_category(phrase)
+        output = match_category(phrase, request.args.get("k"))
 
-#         return output
+        return output
         
-#     except Exception as e:
-#         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
 
-# @app.route('/api/categories')
-# def list_categories_route():
-#     try:
-#         output = list_categories()
+# batch text classification route - many phrases in one request, results in the same order
+@api.route('/api/match/batch', methods=['POST'])
+def match_categories_route():
+    try:
+        data = request.get_json(silent=True)
+
+        if not data or 'phrases' not in data:
+            return jsonify({'error': 'Phrases field is required in request body'}), 400
+
+        output = match_categories(data)
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# static category list, served with Cache-Control and an ETag
+@api.route('/api/categories')
+def list_categories_route():
+    try:
+        output = list_categories()
  
-#         return output
+        return output
 
-#     except Exception as e:
-#         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# per-patient item catalogs, kept in step with node_server's media hierarchy
+@api.route('/api/patients/<patient_id>/items', methods=['PUT'])
+def sync_patient_items_route(patient_id):
+    try:
+        output = sync_patient_items(patient_id, request.get_json(silent=True))
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+@api.route('/api/patients/<patient_id>/items', methods=['POST'])
+def add_patient_items_route(patient_id):
+    try:
+        output = add_patient_items(patient_id, request.get_json(silent=True))
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+@api.route('/api/patients/<patient_id>/items/<item_id>', methods=['PATCH'])
+def rename_patient_item_route(patient_id, item_id):
+    try:
+        output = rename_patient_item(patient_id, item_id, request.get_json(silent=True))
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+@api.route('/api/patients/<patient_id>/items/<item_id>', methods=['DELETE'])
+def remove_patient_item_route(patient_id, item_id):
+    try:
+        output = remove_patient_item(patient_id, item_id)
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+# top-k items of a patient's catalog for a phrase
+@api.route('/api/patients/<patient_id>/items/match', methods=['GET'])
+def match_patient_items_route(patient_id):
+    try:
+        phrase = request.args.get("q", "").strip()
+
+        if not phrase:
+            return jsonify({"error": "Missing 'q' query parameter"}), 400
+
+        output = match_patient_items(patient_id, phrase, request.args.get("k"))
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+@api.route('/api/patients/items/stats', methods=['GET'])
+def catalog_stats_route():
+    try:
+        output = get_catalog_stats()
+        return output
+
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+def initialize_app(app):
+    app.register_blueprint(api)
 
-# For standalone testing
+# For standalone testing, app.create_app builds the full app with these routes on it
 if __name__ == '__main__':
+    app = Flask(__name__)
+    initialize_app(app)
     # download_word2vec_model()
     # load_word_vectors()
-    app.run(debug=True)
\ No newline at end of file
+    start_emoji_warm_up()
+    start_word_vectors_loading()
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1")
\ No newline at end of file
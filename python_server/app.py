@@ -36,18 +36,25 @@ from datetime import datetime
 # load env
 load_dotenv()
 
-def create_app():
+# Frontends allowed to call the API, shared with the async server in asgi.py
+CORS_ORIGINS = [
+    "http://localhost:5173",  # Vite dev server
+    "http://localhost:3000",  # Alternative React dev server
+    "http://127.0.0.1:5173",  # Alternative localhost format
+    "http://127.0.0.1:3000",  # Alternative localhost format
+]
+
+def create_app(background_warm_up=True):
+    """
+    Build the Flask app. Production (wsgi.py) passes background_warm_up=False and warms
+    the models itself before gunicorn forks its workers
+    """
     app = Flask(__name__)
     
     # Enhanced CORS configuration for your frontend
-    CORS(app, origins=[
-        "http://localhost:5173",  # Vite dev server
-        "http://localhost:3000",  # Alternative React dev server
-        "http://127.0.0.1:5173",  # Alternative localhost format
-        "http://127.0.0.1:3000",  # Alternative localhost format
-    ], 
+    CORS(app, origins=CORS_ORIGINS, 
     allow_headers=["Content-Type", "Authorization", "Accept", "Origin", "X-Requested-With"], 
-    methods=["GET", "POST", "OPTIONS"])
+    methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
     
     # Add health check endpoint
     @app.route('/health', methods=['GET'])
@@ -61,6 +68,31 @@ def create_app():
             'message': 'Python server is running properly'
         }), 200
 
+    # Add readiness endpoint - unlike /health this only passes once the models are warmed up
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness check for load balancers, 503 until the emoji model has been warmed up"""
+        try:
+            from controllers.emojiController import get_emoji_readiness
+            ready, details = get_emoji_readiness()
+        except ImportError as e:
+            ready, details = False, {'status': 'unavailable', 'error': str(e)}
+
+        # the word vectors only gate the matching routes, not the emoji ones
+        try:
+            from controllers.classificationController import get_word_vectors_readiness
+            _, word_vectors = get_word_vectors_readiness()
+        except ImportError as e:
+            word_vectors = {'status': 'unavailable', 'error': str(e)}
+
+        return jsonify({
+            'ready': ready,
+            'service': 'python-emoji-server',
+            'emoji_model': details,
+            'word_vectors': word_vectors,
+            'timestamp': datetime.now().isoformat()
+        }), 200 if ready else 503
+
     # Add a simple test endpoint
     @app.route('/test', methods=['GET'])
     def test_endpoint():
@@ -91,6 +123,14 @@ def create_app():
         from api import initialize_app
         initialize_app(app)
         print("✅ API routes initialized successfully")
+
+        # Load and warm the models in the background, /ready passes once this is done
+        if background_warm_up:
+            from controllers.emojiController import start_emoji_warm_up
+            from controllers.classificationController import start_word_vectors_loading
+            start_emoji_warm_up()
+            start_word_vectors_loading()
+            print("🔥 Model warm-up and word vector loading started in the background")
     except ImportError as e:
         print(f"⚠️ Warning: Could not import API routes: {e}")
         # Add a fallback route
@@ -99,7 +139,7 @@ def create_app():
             return jsonify({
                 'message': 'Python Emoji Server is running',
                 'status': 'healthy',
-                'endpoints': ['/health', '/test', '/api/convert-emoji']
+                'endpoints': ['/health', '/ready', '/test', '/api/convert-emoji']
             })
     
     return app
@@ -109,14 +149,17 @@ if __name__ == '__main__':
     print("🐍 Starting Python Emoji Server...")
     print("📍 Available endpoints:")
     print("   GET  /health - Health check")
+    print("   GET  /ready - Readiness check (models warmed up)")
     print("   GET  /test - Test endpoint")
     print("   POST /api/convert-emoji - Convert text to emoji")
+    print("   POST /api/convert-emoji/stream - Incremental conversion of a live transcript")
     print("🌐 Server will be available at: http://localhost:5000")
+    print("🏭 For production use gunicorn instead: gunicorn -c gunicorn.conf.py")
     
-    # Run with specific host and port for better connectivity
+    # Development server only, the debugger and reloader are opt-in with FLASK_DEBUG=1
     app.run(
         host='0.0.0.0',  # Allow connections from other machines
         port=5000,
-        debug=True,
+        debug=os.getenv("FLASK_DEBUG") == "1",
         threaded=True  # Enable threading for better performance
     )
\ No newline at end of file
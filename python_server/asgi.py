@@ -0,0 +1,253 @@
+# python_server/asgi.py
+# Async front end for the text -> emoji and category matching routes.
+#
+# run from python_server/:
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+#   ASGI_EXECUTOR=process ASGI_WORKERS=4 uvicorn asgi:app --port 5000
+#
+# Connections, request bodies and responses are handled on the event loop, so an idle
+# keep-alive connection from a tablet costs a socket and a little memory, not a thread.
+# The CPU-bound work (spaCy, WordNet, word vectors) runs in a bounded executor:
+#   - thread  (default) shares the models and the conversion cache, spaCy releases the
+#             GIL for part of its work but conversions mostly run one at a time
+#   - process each worker process loads its own models, conversions run on every core,
+#             and the optional emoji LM runs once in a shared LM server process that the
+#             workers submit to (see models/emojiLM.py), so their requests share batches
+# Every request has a timeout, and once ASGI_MAX_PENDING requests are queued or running
+# new ones are turned away with 503 instead of piling up behind them.
+#
+# Scale with ASGI_EXECUTOR=process rather than uvicorn --workers: separate uvicorn workers
+# would each load the emoji LM, unless EMOJI_LM_SOCKET points them at one LM server.
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Route
+from werkzeug.http import parse_etags
+
+from app import CORS_ORIGINS
+from controllers.emojiController import (
+    TmojiModel, build_emoji_payload, build_cacheable_emoji_payload, build_reload_payload, conversion_etag,
+    warm_up_emoji_model, start_emoji_lm_loading, start_emoji_lm_server, stop_emoji_lm_server, use_shared_emoji_lm,
+    HTTP_MAX_AGE_SECONDS
+)
+from models.boundedExecutor import BoundedExecutor, ExecutorBusy
+
+logger = logging.getLogger(__name__)
+
+try:
+    from controllers.classificationController import (
+        build_match_payload, build_batch_match_payload, retry_after_headers, start_word_vectors_loading
+    )
+except ImportError as e:
+    build_match_payload = build_batch_match_payload = start_word_vectors_loading = None
+    logger.error(f"❌ Failed to import classificationController: {e}")
+
+EXECUTOR_KIND = os.getenv("ASGI_EXECUTOR", "thread")
+WORKERS = int(os.getenv("ASGI_WORKERS", str(os.cpu_count() or 1)))
+MAX_PENDING = int(os.getenv("ASGI_MAX_PENDING", str(WORKERS * 4)))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("ASGI_REQUEST_TIMEOUT", "10"))
+
+
+def warm_up_worker(lm_address=None):
+    """
+    Warm the emoji model, watch the dictionaries file and start loading the word vectors
+    (and the emoji LM, or connecting to the LM server at lm_address) in the background
+    """
+    if TmojiModel is not None:
+        TmojiModel.start_dictionary_watcher()
+    if start_word_vectors_loading is not None:
+        start_word_vectors_loading()
+    use_shared_emoji_lm(lm_address)
+    start_emoji_lm_loading()
+    return warm_up_emoji_model()
+
+
+def create_executor(lm_address=None):
+    if EXECUTOR_KIND == "process":
+        # every worker process warms its own copy of the models when it starts
+        executor = ProcessPoolExecutor(max_workers=WORKERS, initializer=warm_up_worker, initargs=(lm_address,))
+    elif EXECUTOR_KIND == "thread":
+        executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="asgi-cpu")
+    else:
+        raise ValueError(f"ASGI_EXECUTOR must be 'thread' or 'process', not '{EXECUTOR_KIND}'")
+    return BoundedExecutor(executor, MAX_PENDING)
+
+
+async def run_cpu_bound(request, func, *args, error_extras=()):
+    """
+    Run func in the executor and return its result, or (payload, status, *error_extras)
+    with 503/504 if it can't. error_extras fill in the rest of the result for funcs that
+    return more than (payload, status)
+    """
+    try:
+        future = request.app.state.executor.submit(func, *args)
+    except ExecutorBusy:
+        return ({'error': 'Server is busy, try again shortly', 'success': False}, 503, *error_extras)
+
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), REQUEST_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️ {func.__name__} timed out after {REQUEST_TIMEOUT_SECONDS}s")
+        return ({
+            'error': f'Processing took longer than {REQUEST_TIMEOUT_SECONDS:g}s',
+            'success': False,
+            'timestamp': datetime.now().isoformat()
+        }, 504, *error_extras)
+
+
+def json_response(payload, status=200):
+    return JSONResponse(payload, status_code=status)
+
+
+# --- Routes ---
+async def home(request):
+    return HTMLResponse('<h1>API is Running</h1>')
+
+async def health_check(request):
+    return json_response({
+        'status': 'healthy',
+        'service': 'python-emoji-server',
+        'version': '1.0.0',
+        'timestamp': datetime.now().isoformat(),
+        'message': 'Python server is running properly'
+    })
+
+def warm_up_status(app):
+    """Readiness of the executor that runs the conversions: (is_ready, details)"""
+    warm_up = app.state.warm_up
+    if not warm_up.done():
+        return False, {'status': 'warming_up'}
+    if warm_up.exception() is not None:
+        return False, {'status': 'failed', 'error': str(warm_up.exception())}
+    if not warm_up.result():
+        return False, {'status': 'unavailable', 'error': 'TmojiModel could not be imported'}
+    if TmojiModel.synonym_source() is None:
+        return False, {'status': 'missing_data', 'error': TmojiModel.MISSING_SYNONYM_DATA}
+    return True, {'status': 'ready'}
+
+async def readiness_check(request):
+    ready, details = warm_up_status(request.app)
+    return json_response({
+        'ready': ready,
+        'service': 'python-emoji-server',
+        'emoji_model': details,
+        'timestamp': datetime.now().isoformat()
+    }, 200 if ready else 503)
+
+async def convert_text_to_emoji_route(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return json_response({'error': 'Request body must be valid JSON'}, 400)
+
+    # Validate input
+    if not data or not isinstance(data, dict) or 'text' not in data:
+        return json_response({'error': 'Text field is required in request body'}, 400)
+
+    payload, status = await run_cpu_bound(request, build_emoji_payload, data)
+    return json_response(payload, status)
+
+def cache_headers(etag):
+    return {'ETag': f'"{etag}"', 'Cache-Control': f'public, max-age={HTTP_MAX_AGE_SECONDS}'}
+
+async def convert_text_to_emoji_get_route(request):
+    text = request.query_params.get('text', '')
+
+    # answer revalidations before converting anything
+    if_none_match = request.headers.get('if-none-match')
+    if TmojiModel is not None and text and if_none_match:
+        etag = conversion_etag(text, TmojiModel.get_dictionaries().version)
+        if parse_etags(if_none_match).contains_weak(etag):
+            return Response(status_code=304, headers=cache_headers(etag))
+
+    # busy and timed out responses have no ETag
+    payload, status, etag = await run_cpu_bound(request, build_cacheable_emoji_payload, text, error_extras=(None,))
+    response = json_response(payload, status)
+    if etag is None:
+        response.headers['Cache-Control'] = 'no-store'
+    else:
+        response.headers.update(cache_headers(etag))
+    return response
+
+async def reload_dictionaries_route(request):
+    # reloads this process (and so thread workers) off the event loop, process workers
+    # pick the new file up through their own watchers within TMOJI_DICTIONARIES_POLL_SECONDS
+    remote_addr = request.client.host if request.client else None
+    payload, status = await asyncio.to_thread(build_reload_payload, remote_addr, request.headers.get('authorization'))
+    return json_response(payload, status)
+
+async def match_category_route(request):
+    if build_match_payload is None:
+        return json_response({'error': 'Category matching is not available', 'success': False}, 503)
+
+    phrase = request.query_params.get("q", "").strip()
+    if not phrase:
+        return json_response({"error": "Missing 'q' query parameter"}, 400)
+
+    # the readiness check runs where the word vectors live, which may be a worker process
+    payload, status = await run_cpu_bound(request, build_match_payload, phrase, request.query_params.get("k"))
+    response = json_response(payload, status)
+    response.headers.update(retry_after_headers(status))
+    return response
+
+
+async def match_categories_route(request):
+    if build_batch_match_payload is None:
+        return json_response({'error': 'Category matching is not available', 'success': False}, 503)
+
+    try:
+        data = await request.json()
+    except ValueError:
+        return json_response({'error': 'Request body must be valid JSON'}, 400)
+
+    payload, status = await run_cpu_bound(request, build_batch_match_payload, data)
+    response = json_response(payload, status)
+    response.headers.update(retry_after_headers(status))
+    return response
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # process workers share one emoji LM server, thread workers share this process's LM
+    lm_server = start_emoji_lm_server() if EXECUTOR_KIND == "process" else (None, None)
+    app.state.executor = create_executor(lm_server[1])
+    if TmojiModel is not None:
+        # the ETags are computed here, so this process follows the file too
+        TmojiModel.start_dictionary_watcher()
+    # warm up off the event loop so /health answers straight away, /ready passes when done
+    app.state.warm_up = app.state.executor.submit(warm_up_worker, lm_server[1])
+    logger.info(f"🚀 Async server using a {EXECUTOR_KIND} executor with {WORKERS} workers")
+    try:
+        yield
+    finally:
+        app.state.executor.shutdown()
+        stop_emoji_lm_server(*lm_server)
+
+
+app = Starlette(
+    routes=[
+        Route('/', home),
+        Route('/health', health_check, methods=['GET']),
+        Route('/ready', readiness_check, methods=['GET']),
+        Route('/api/convert-emoji', convert_text_to_emoji_route, methods=['POST']),
+        Route('/api/convert-emoji', convert_text_to_emoji_get_route, methods=['GET']),
+        Route('/api/convert-emoji/dictionaries/reload', reload_dictionaries_route, methods=['POST']),
+        Route('/api/match', match_category_route, methods=['GET']),
+        Route('/api/match/batch', match_categories_route, methods=['POST']),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=CORS_ORIGINS,
+                   allow_headers=["Content-Type", "Authorization", "Accept", "Origin", "X-Requested-With"],
+                   allow_methods=["GET", "POST", "OPTIONS"])
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,157 @@
+# python_server/benchmarks/categoryMatchEquivalence.py
+# Checks the compiled category matrix against the original loop-based category matcher.
+#
+# The single and the batch matcher must both pick the same main category, subcategory and
+# item for every phrase, with similarities equal up to float rounding, and the top-k item
+# ranking must equal a full sort of every item scored one by one. Prints the time per
+# match and every difference; exits 1 if there are any.
+#
+# run from python_server/:
+#   python benchmarks/categoryMatchEquivalence.py                   # GloVe vectors (gensim download cache)
+#   python benchmarks/categoryMatchEquivalence.py --random-vectors  # offline, random vectors for the vocabulary
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.corpus import CATEGORY_PHRASES, SEED
+from controllers import classificationController as cc
+
+EXTRA_PHRASES = [
+    "hot coffee", "cold water", "i need the nurse", "my phone", "apple", "toilet paper",
+    "blue shirt", "pain pills", "something to eat", "juice", "zzzz unknown",
+]
+SIMILARITY_TOLERANCE = 1e-5
+RANKING_K = 5
+
+
+def find_best_category_match_legacy(input_phrase, wv_model):
+    """The original implementation, kept here as the reference"""
+    input_vec = cc.get_phrase_vector(input_phrase, wv_model)
+    if input_vec is None:
+        return {"main_category": None, "subcategory": None, "item": None, "all_subcategories": [], "similarity": -1.0}
+
+    categories = cc.CATEGORY_TAXONOMY
+    best_match = {"main_category": None, "subcategory": None, "item": None, "all_subcategories": [], "similarity": -1.0}
+
+    for main_category, subcats in categories.items():
+        all_items = [item for sublist in subcats.values() for item in sublist]
+        sim = cc.average_phrase_similarity(input_phrase, all_items, wv_model)
+        if sim > best_match["similarity"]:
+            best_match["main_category"] = main_category
+            best_match["similarity"] = float(sim)
+
+    if best_match["main_category"] is None:
+        return best_match
+
+    best_match["all_subcategories"] = list(categories[best_match["main_category"]].keys())
+    best_match["similarity"] = -1.0
+
+    for subcategory, items in categories[best_match["main_category"]].items():
+        sim = cc.average_phrase_similarity(input_phrase, items, wv_model)
+        if sim > best_match["similarity"]:
+            best_match["subcategory"] = subcategory
+            best_match["similarity"] = float(sim)
+
+        for item in items:
+            item_sim = cc.phrase_similarity(input_phrase, item, wv_model)
+            if item_sim > best_match["similarity"]:
+                best_match["subcategory"] = subcategory
+                best_match["item"] = item
+                best_match["similarity"] = float(item_sim)
+
+    return best_match
+
+
+def top_items_legacy(input_phrase, wv_model, k):
+    """Every item of the taxonomy scored one by one and fully sorted, the reference for the top-k ranking"""
+    scored = [
+        (cc.phrase_similarity(input_phrase, item, wv_model), item)
+        for subcats in cc.CATEGORY_TAXONOMY.values() for items in subcats.values() for item in items
+        if cc.get_phrase_vector(item, wv_model) is not None
+    ]
+    scored.sort(key=lambda entry: -entry[0])
+    return scored[:k]
+
+
+def ranking_matches(expected, ranking):
+    if ranking is None:
+        return not expected
+    actual = ranking["items"]
+    # ties may come out in either order, so compare scores and the items at distinct scores
+    return len(expected) == len(actual) and all(
+        abs(sim - entry["similarity"]) <= SIMILARITY_TOLERANCE for (sim, _), entry in zip(expected, actual)
+    ) and {item for _, item in expected} == {entry["item"] for entry in actual}
+
+
+def random_vectors(phrases, dim=50):
+    """KeyedVectors with a random vector for every word of the taxonomy and the phrases"""
+    from gensim.models import KeyedVectors
+
+    words = set()
+    for subcats in cc.CATEGORY_TAXONOMY.values():
+        for items in subcats.values():
+            for item in items:
+                words.update(item.lower().split())
+    for phrase in phrases:
+        words.update(phrase.lower().split())
+    words.discard("zzzz")  # keep one out-of-vocabulary word
+
+    words = sorted(words)
+    model = KeyedVectors(vector_size=dim)
+    model.add_vectors(words, np.random.default_rng(SEED).standard_normal((len(words), dim)).astype(np.float32))
+    return model
+
+
+def mean_us(func, phrases, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for phrase in phrases:
+            func(phrase)
+    return (time.perf_counter() - started) / (repeat * len(phrases)) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the compiled category matcher with the original')
+    parser.add_argument('--random-vectors', action='store_true', help='use random vectors instead of GloVe (offline)')
+    args = parser.parse_args()
+
+    phrases = CATEGORY_PHRASES + EXTRA_PHRASES
+    if args.random_vectors:
+        cc.wv = random_vectors(phrases)
+    wv_model = cc.load_word_vectors()
+
+    differences = []
+    batch_matches = cc.find_best_category_matches(phrases)
+    for phrase, batch_match in zip(phrases, batch_matches):
+        expected = find_best_category_match_legacy(phrase, wv_model)
+        for kind, actual in (("compiled", cc.find_best_category_match(phrase)), ("batch", batch_match)):
+            same_choice = all(expected[key] == actual[key] for key in ("main_category", "subcategory", "item", "all_subcategories"))
+            if not same_choice or abs(expected["similarity"] - actual["similarity"]) > SIMILARITY_TOLERANCE:
+                differences.append((phrase, expected, f"{kind:8}: {actual}"))
+
+        expected_top = top_items_legacy(phrase, wv_model, RANKING_K) if expected["main_category"] else []
+        ranked = cc.find_best_category_match(phrase, RANKING_K)
+        if not ranking_matches(expected_top, ranked.get("ranking")):
+            differences.append((phrase, expected_top, f"top-{RANKING_K}: {ranked.get('ranking', {}).get('items')}"))
+
+    legacy_us = mean_us(lambda phrase: find_best_category_match_legacy(phrase, wv_model), phrases)
+    compiled_us = mean_us(cc.find_best_category_match, phrases)
+    batch_us = mean_us(lambda _: cc.find_best_category_matches(phrases), [None]) / len(phrases)
+    print(f"legacy   : {legacy_us:8.1f} us/match")
+    print(f"compiled : {compiled_us:8.1f} us/match")
+    print(f"batch    : {batch_us:8.1f} us/match ({len(phrases)} phrases per call)")
+    print(f"speedup  : {legacy_us / compiled_us:8.2f}x single, {legacy_us / batch_us:.2f}x batch")
+
+    if differences:
+        print(f"\n{len(differences)} phrases match differently:")
+        for phrase, expected, actual in differences:
+            print(f"  '{phrase}'\n    legacy  : {expected}\n    {actual}")
+        sys.exit(1)
+
+    print(f"\nAll {len(phrases)} phrases match the same categories")
@@ -0,0 +1,57 @@
+# python_server/benchmarks/contractionsBenchmark.py
+# Compares the compiled fix_contractions against the old one-str.replace-per-entry version
+# run from python_server/: python benchmarks/contractionsBenchmark.py
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from models.TmojiModel import get_dictionaries, fix_contractions
+
+SAMPLES = [
+    "i'm hungry",
+    "don't worry, it's okay",
+    "we're gonna see the doctor at 3 o'clock",
+    "you shouldn't have done that, i'd've called you",
+    "it's time for your medicine and then we'll go for a walk, y'all ready?",
+    "i can't find my keys and i don't know where they're, could've left them in the car",
+    "how's your pain today? let's check your blood pressure before lunch, that'd help",
+]
+
+
+def fix_contractions_legacy(text):
+    """The original implementation, kept here as the benchmark baseline"""
+    for contraction, expansion in get_dictionaries().contractions.items():
+        text = text.replace(contraction, expansion)
+    return text
+
+
+def bench(func, number):
+    timer = timeit.Timer(lambda: [func(sample) for sample in SAMPLES])
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / (number * len(SAMPLES)) * 1e6  # microseconds per call
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    legacy_us = bench(fix_contractions_legacy, number)
+    compiled_us = bench(fix_contractions, number)
+
+    print(f"legacy   : {legacy_us:8.2f} us/call")
+    print(f"compiled : {compiled_us:8.2f} us/call")
+    print(f"speedup  : {legacy_us / compiled_us:8.2f}x")
+
+    # one long dictated sentence made of every sample
+    long_text = ' '.join(SAMPLES)
+    legacy_long = min(timeit.repeat(lambda: fix_contractions_legacy(long_text), repeat=5, number=number))
+    compiled_long = min(timeit.repeat(lambda: fix_contractions(long_text), repeat=5, number=number))
+    print(f"long text ({len(long_text)} chars) speedup: {legacy_long / compiled_long:.2f}x")
+
+    print("\nOutput differences (legacy rules also matched inside words):")
+    for sample in SAMPLES:
+        legacy, compiled = fix_contractions_legacy(sample), fix_contractions(sample)
+        if legacy != compiled:
+            print(f"  '{sample}'\n    legacy  : '{legacy}'\n    compiled: '{compiled}'")
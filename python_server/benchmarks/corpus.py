@@ -0,0 +1,82 @@
+# python_server/benchmarks/corpus.py
+# Benchmark corpus of caregiver and patient utterances, built deterministically and offline
+
+import os
+import json
+import random
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+SEED = 2025
+
+# Short things patients say or tap out
+PATIENT_UTTERANCES = [
+    "water",
+    "pain",
+    "toilet please",
+    "i need help",
+    "i'm cold",
+    "i'm hungry",
+    "i'm tired",
+    "call my daughter",
+    "where is my phone?",
+    "i want to sleep",
+    "my head hurts",
+    "i don't feel good",
+    "can't breathe",
+    "turn on the tv",
+    "i want coffee",
+    "yes",
+    "no thank you",
+    "i feel sick",
+    "help me stand up",
+    "when is lunch?",
+    "i miss you",
+    "bring my glasses",
+    "i'm okay",
+    "too hot",
+    "i want to go home",
+]
+
+# Item labels caregivers create, for category matching
+CATEGORY_PHRASES = [
+    "water", "coffee", "tea", "apple juice", "orange juice", "milk", "coke",
+    "rice", "bread", "noodles", "banana", "biscuit", "yogurt", "chicken soup",
+    "toothbrush", "soap", "towel", "phone", "tv remote", "glasses",
+    "shirt", "pants", "socks", "shoes", "blanket",
+    "pills", "insulin", "wheelchair", "walking stick", "plaster",
+    "bathing", "toilet", "call help", "nurse", "feeding",
+]
+
+
+def load_caregiver_utterances():
+    """Caregiver sentences from the emoji fine-tuning dataset"""
+    utterances = []
+    with open(os.path.join(DATA_DIR, 'emoji_dataset.jsonl'), encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                utterances.append(json.loads(line)['input'])
+    return utterances
+
+
+def build_corpus(long_count=40, sentences_per_long=5):
+    """
+    Utterances grouped by length:
+      short  - patient utterances (1-5 words)
+      medium - single caregiver sentences (4-10 words)
+      long   - dictated caregiver paragraphs made of several sentences
+    """
+    caregiver = load_caregiver_utterances()
+    rng = random.Random(SEED)
+    long = [' '.join(rng.sample(caregiver, sentences_per_long)) for _ in range(long_count)]
+
+    return {
+        'short': list(PATIENT_UTTERANCES),
+        'medium': caregiver,
+        'long': long,
+    }
+
+
+if __name__ == '__main__':
+    for bucket, utterances in build_corpus().items():
+        words = [len(u.split()) for u in utterances]
+        print(f"{bucket:6}: {len(utterances):4} utterances, {min(words)}-{max(words)} words")
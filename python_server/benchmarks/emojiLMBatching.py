@@ -0,0 +1,66 @@
+# python_server/benchmarks/emojiLMBatching.py
+# Throughput and latency of the emoji LM with and without micro-batching, under concurrent callers.
+#
+# run from python_server/ with a model or adapter directory (see models/trainLLMForEmoji.py):
+#   python benchmarks/emojiLMBatching.py /tmp/tiny-emoji-lm
+#   python benchmarks/emojiLMBatching.py emoji-lora-adapter --clients 32 --batch-sizes 1 4 8 16
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.corpus import PATIENT_UTTERANCES
+from benchmarks.runBenchmarks import percentile
+from models.emojiLM import EmojiLM, MicroBatcher
+
+
+def run_clients(batcher, clients, requests_per_client):
+    """Every client sends its requests one after the other, like a request thread would"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        for i in range(requests_per_client):
+            text = PATIENT_UTTERANCES[(offset + i) % len(PATIENT_UTTERANCES)]
+            started = time.perf_counter()
+            batcher.submit(text).result()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(offset,)) for offset in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, sorted(latencies)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark micro-batched emoji LM inference')
+    parser.add_argument('model', help='model or LoRA adapter directory')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent callers')
+    parser.add_argument('--requests', type=int, default=8, help='requests per caller')
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[1, 4, 8, 16])
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--max-new-tokens', type=int, default=16)
+    args = parser.parse_args()
+
+    lm = EmojiLM(args.model, max_new_tokens=args.max_new_tokens)
+    lm.generate_batch(PATIENT_UTTERANCES[:2])  # first call pays for lazy initialisation
+
+    print(f"{args.clients} clients x {args.requests} requests\n")
+    print(f"{'max batch':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean batch':>11}")
+    for batch_size in args.batch_sizes:
+        batcher = MicroBatcher(lm.generate_batch, max_batch_size=batch_size,
+                               max_wait_seconds=args.max_wait_ms / 1000, max_pending=args.clients * 2)
+        elapsed, latencies = run_clients(batcher, args.clients, args.requests)
+        stats = batcher.stats()
+        batcher.shutdown()
+
+        print(f"{batch_size:>9} {len(latencies) / elapsed:>8.1f} {percentile(latencies, 0.50) * 1000:>8.1f} "
+              f"{percentile(latencies, 0.95) * 1000:>8.1f} {stats['mean_batch_size']:>11}")
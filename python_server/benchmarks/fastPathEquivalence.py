@@ -0,0 +1,70 @@
+# python_server/benchmarks/fastPathEquivalence.py
+# Checks the spaCy-free fast path against the full spaCy path on the benchmark corpus.
+#
+# For every utterance the fast path can handle, its output must be identical to what
+# preprocess_text produces through nlp(). Prints the hit rate per corpus bucket, the
+# time per utterance on both paths and every mismatch; exits 1 if there are any.
+# In the default TMOJI_FAST_PATH=verify mode the server runs the same comparison on
+# data/fast_path_check.txt and the emoji dataset at warm-up, and leaves the fast path
+# off if anything differs.
+#
+# run from python_server/: python benchmarks/fastPathEquivalence.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.corpus import build_corpus
+from models import TmojiModel
+
+
+def spacy_path(text, dicts):
+    cleaned = TmojiModel.clean_text(text, dicts)
+    return TmojiModel.process_doc(TmojiModel.get_nlp()(cleaned), dicts=dicts)
+
+
+def fast_path(text, dicts):
+    return TmojiModel.fast_path_process(TmojiModel.clean_text(text, dicts), dicts)
+
+
+def check_bucket(texts, dicts):
+    hits = 0
+    fast_s = spacy_s = 0.0
+    for text in texts:
+        started = time.perf_counter()
+        hits += fast_path(text, dicts) is not None
+        fast_s += time.perf_counter() - started
+
+        started = time.perf_counter()
+        spacy_path(text, dicts)
+        spacy_s += time.perf_counter() - started
+
+    # the same comparison that gates the fast path at warm-up
+    return hits, TmojiModel.fast_path_mismatches(texts, dicts), fast_s, spacy_s
+
+
+if __name__ == '__main__':
+    TmojiModel.warm_up()
+    dicts = TmojiModel.get_dictionaries()
+    print(f"fast path table: {len(TmojiModel.fast_path_analyses)} surface forms, "
+          f"{'in use' if TmojiModel.fast_path_active else 'not in use'} ({TmojiModel.FAST_PATH_MODE} mode)")
+
+    corpus = build_corpus()
+    corpus['check'] = TmojiModel.load_fast_path_check_texts(dataset_path='')  # the dataset is already 'medium'
+
+    all_mismatches = []
+    for bucket, texts in corpus.items():
+        hits, mismatches, fast_s, spacy_s = check_bucket(texts, dicts)
+        all_mismatches.extend(mismatches)
+        print(f"{bucket:6}: {hits:4}/{len(texts):4} hits ({hits / len(texts):6.1%}), "
+              f"fast path {fast_s / len(texts) * 1e6:8.1f} us, spaCy {spacy_s / len(texts) * 1e6:8.1f} us per utterance")
+
+    if all_mismatches:
+        print(f"\n{len(all_mismatches)} fast path results differ from spaCy:")
+        for text, fast, expected in all_mismatches:
+            print(f"  '{text}'\n    fast : '{fast}'\n    spaCy: '{expected}'")
+        sys.exit(1)
+
+    print("\nAll fast path results match the spaCy path")
@@ -0,0 +1,45 @@
+# python_server/benchmarks/itemIndexBenchmark.py
+# Match latency of a patient's ItemIndex as the catalog grows, plus add/rename/remove cost.
+# Uses random vectors, so it runs offline.
+#
+# run from python_server/: python benchmarks/itemIndexBenchmark.py [vector size]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.corpus import SEED
+from models.itemIndex import ItemIndex
+
+CATALOG_SIZES = [100, 1000, 5000, 20000, 100000]
+QUERIES = 200
+
+
+def mean_us(func, values):
+    started = time.perf_counter()
+    for value in values:
+        func(value)
+    return (time.perf_counter() - started) / len(values) * 1e6
+
+
+if __name__ == '__main__':
+    vector_size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = np.random.default_rng(SEED)
+    queries = rng.standard_normal((QUERIES, vector_size))
+
+    print(f"{'items':>8} {'add us':>8} {'rename us':>10} {'remove us':>10} {'top-5 us':>9} {'MB':>6}")
+    for size in CATALOG_SIZES:
+        vectors = rng.standard_normal((size, vector_size))
+        index = ItemIndex(vector_size)
+
+        add_us = mean_us(lambda i: index.add(i, f"item {i}", vectors[i]), range(size))
+        search_us = mean_us(lambda query: index.search(query, 5), queries)
+        rename_us = mean_us(lambda i: index.rename(i, f"renamed {i}", vectors[-1 - i]), range(min(size, 1000)))
+        remove_us = mean_us(index.remove, range(min(size, 1000)))
+
+        print(f"{size:>8} {add_us:>8.2f} {rename_us:>10.2f} {remove_us:>10.2f} {search_us:>9.1f} "
+              f"{index.stats()['approx_bytes'] / 1e6:>6.1f}")
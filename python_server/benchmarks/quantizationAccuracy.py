@@ -0,0 +1,101 @@
+# python_server/benchmarks/quantizationAccuracy.py
+# Accuracy of the reduced-precision (float16 / int8) embedding mode against float32.
+#
+# Every word the benchmark corpus and the taxonomy use is written to a float16 and an int8
+# store, which the category matcher then scores in that precision. Reports how close the
+# stored vectors stay to the originals, how often the main category, subcategory and item
+# agree with float32 over the corpus, the largest similarity difference where they agree
+# and the size of a full-vocabulary store. Exits 1 if main category agreement drops
+# below --min-agreement.
+#
+# run from python_server/:
+#   python benchmarks/quantizationAccuracy.py                   # the server's word vectors
+#   python benchmarks/quantizationAccuracy.py --random-vectors  # offline, random vectors for the vocabulary
+
+import os
+import sys
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.corpus import build_corpus, CATEGORY_PHRASES
+from benchmarks.categoryMatchEquivalence import random_vectors
+from controllers import classificationController as cc
+from models.embeddingStore import EmbeddingStore, write_store
+
+QUANTIZED_PRECISIONS = ('float16', 'int8')
+BYTES_PER_VALUE = {'float32': 4, 'float16': 2, 'int8': 1}
+
+
+def vocabulary(phrases):
+    words = set()
+    for subcats in cc.CATEGORY_TAXONOMY.values():
+        for items in subcats.values():
+            for item in items:
+                words.update(item.lower().split())
+    for phrase in phrases:
+        words.update(phrase.lower().split())
+    return sorted(words)
+
+
+def store_size_mb(words, dimensions, precision):
+    scales = words * 4 if precision == 'int8' else 0
+    return (words * dimensions * BYTES_PER_VALUE[precision] + scales) / (1024 * 1024)
+
+
+def match_all(model, phrases):
+    cc.wv = model
+    return cc.find_best_category_matches(phrases)
+
+
+def agreement(reference, matches, key):
+    pairs = [(r, m) for r, m in zip(reference, matches) if r["main_category"] is not None]
+    return sum(r[key] == m[key] for r, m in pairs) / len(pairs) if pairs else 1.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare float16/int8 embeddings with float32')
+    parser.add_argument('--random-vectors', action='store_true', help='use random vectors instead of GloVe (offline)')
+    parser.add_argument('--min-agreement', type=float, default=0.98, help='lowest acceptable main category agreement')
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    phrases = CATEGORY_PHRASES + corpus['short'] + corpus['medium']
+    model = random_vectors(phrases) if args.random_vectors else cc.load_word_vectors()
+
+    words = [word for word in vocabulary(phrases) if word in model.key_to_index]
+    vectors = np.stack([model[word] for word in words]).astype(np.float32)
+    reference = match_all(model, phrases)
+
+    print(f"{len(phrases)} phrases, {len(words)} distinct words, {len(model)} words in the full vocabulary\n")
+    print(f"{'precision':10} {'min cos':>8} {'main':>7} {'sub':>7} {'item':>7} {'max dsim':>9} {'full store MB':>14}")
+    print(f"{'float32':10} {1.0:>8.4f} {1.0:>7.1%} {1.0:>7.1%} {1.0:>7.1%} {0.0:>9.5f} "
+          f"{store_size_mb(len(model), model.vector_size, 'float32'):>14.1f}")
+
+    failed = False
+    with tempfile.TemporaryDirectory() as store_dir:
+        for precision in QUANTIZED_PRECISIONS:
+            write_store(words, vectors, store_dir, f'check-{precision}', precision=precision)
+            store = EmbeddingStore.open(store_dir, f'check-{precision}')
+
+            restored = np.stack([store[word] for word in words])
+            cosines = np.sum(restored * vectors, axis=1) / (
+                np.linalg.norm(restored, axis=1) * np.linalg.norm(vectors, axis=1))
+
+            matches = match_all(store, phrases)
+            main = agreement(reference, matches, "main_category")
+            # similarity drift where both picked the same item, a different pick isn't comparable
+            deltas = [abs(r["similarity"] - m["similarity"]) for r, m in zip(reference, matches)
+                      if (r["main_category"], r["subcategory"], r["item"]) == (m["main_category"], m["subcategory"], m["item"])]
+
+            print(f"{precision:10} {cosines.min():>8.4f} {main:>7.1%} "
+                  f"{agreement(reference, matches, 'subcategory'):>7.1%} {agreement(reference, matches, 'item'):>7.1%} "
+                  f"{max(deltas, default=0.0):>9.5f} {store_size_mb(len(model), model.vector_size, precision):>14.1f}")
+            failed = failed or main < args.min_agreement
+
+    if failed:
+        print(f"\nMain category agreement below {args.min_agreement:.0%}")
+        sys.exit(1)
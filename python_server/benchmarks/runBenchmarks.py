@@ -0,0 +1,249 @@
+# python_server/benchmarks/runBenchmarks.py
+# Offline benchmark suite for the emoji and category matching pipelines.
+#
+# Reports per-function throughput and p50/p95/p99 latency for every corpus length,
+# cold-start time (import + warm-up in a fresh process) and peak RSS, and writes
+# everything to JSON so runs can be compared.
+#
+# run from python_server/:
+#   python benchmarks/runBenchmarks.py                          # writes benchmarks/results/<timestamp>.json
+#   python benchmarks/runBenchmarks.py --compare benchmarks/results/<baseline>.json
+#   python benchmarks/runBenchmarks.py --only convert_to_emojis --iterations 3
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import subprocess
+import contextlib
+from datetime import datetime
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BASE_DIR)
+
+from benchmarks.corpus import build_corpus, CATEGORY_PHRASES, SEED
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+# --- Measurement helpers ---
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_s, items_per_call=1):
+    ordered = sorted(latencies_s)
+    total = sum(ordered)
+    return {
+        'calls': len(ordered),
+        'items_per_call': items_per_call,
+        'throughput_per_s': round(len(ordered) * items_per_call / total, 2) if total else None,
+        'mean_ms': round(total / len(ordered) * 1000, 4),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 4),
+    }
+
+
+def time_calls(func, inputs, iterations, warmup=3):
+    """Time func on every input, `iterations` passes over the inputs in a fixed shuffled order"""
+    for value in inputs[:warmup]:
+        func(value)
+
+    order = list(inputs) * iterations
+    random.Random(SEED).shuffle(order)
+
+    latencies = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for value in order:
+            started = time.perf_counter()
+            func(value)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- Cold start ---
+def cold_start_child():
+    """Runs in a fresh interpreter: time importing and warming up the emoji model"""
+    started = time.perf_counter()
+    from models import TmojiModel
+    imported = time.perf_counter()
+    TmojiModel.warm_up()
+    warmed = time.perf_counter()
+
+    print(json.dumps({
+        'import_s': round(imported - started, 4),
+        'warm_up_s': round(warmed - imported, 4),
+        'total_s': round(warmed - started, 4),
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def measure_cold_start(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--cold-start-child'], cwd=BASE_DIR, text=True
+        )
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        'runs': runs,
+        'samples': samples,
+        'best_total_s': min(s['total_s'] for s in samples),
+        'peak_rss_mb': max(s['peak_rss_mb'] for s in samples),
+    }
+
+
+# --- Benchmarks ---
+def category_matching_setup():
+    """Returns (match function, None) or (None, reason it can't run offline)"""
+    try:
+        import gensim.downloader
+        from controllers import classificationController
+        from models.embeddingStore import store_exists
+    except ImportError as e:
+        return None, f'import failed: {e}'
+
+    model_dir = os.path.join(gensim.downloader.BASE_DIR, 'glove-wiki-gigaword-50')
+    store_ready = store_exists(classificationController.WORD_VECTORS_STORE_DIR,
+                               classificationController.WORD_VECTORS_STORE_NAME)
+    if not store_ready and not os.path.exists(model_dir):
+        return None, f'word vectors not available offline (expected {model_dir} or an embedding store)'
+
+    classificationController.load_word_vectors()
+    return classificationController.find_best_category_match, None
+
+
+def run_benchmarks(only, iterations):
+    from models import TmojiModel
+    TmojiModel.warm_up()
+
+    corpus = build_corpus()
+    per_text = {
+        'fix_contractions': TmojiModel.fix_contractions,
+        'preprocess_text': TmojiModel.preprocess_text,
+        'convert_to_emojis': TmojiModel.convert_to_emojis,
+    }
+
+    results = {}
+    for name, func in per_text.items():
+        if only and name not in only:
+            continue
+        results[name] = {
+            bucket: summarize(time_calls(func, texts, iterations))
+            for bucket, texts in corpus.items()
+        }
+
+    if not only or 'convert_many_to_emojis' in only:
+        # a whole bucket per call, throughput is texts per second
+        results['convert_many_to_emojis'] = {
+            bucket: summarize(time_calls(TmojiModel.convert_many_to_emojis, [texts], iterations, warmup=1),
+                              items_per_call=len(texts))
+            for bucket, texts in corpus.items()
+        }
+
+    if not only or 'find_best_category_match' in only:
+        match, reason = category_matching_setup()
+        if match is None:
+            results['find_best_category_match'] = {'skipped': reason}
+        else:
+            results['find_best_category_match'] = {
+                'phrases': summarize(time_calls(match, CATEGORY_PHRASES, iterations))
+            }
+
+    return results
+
+
+# --- Reporting ---
+def print_results(results, baseline=None):
+    baseline_benchmarks = (baseline or {}).get('benchmarks', {})
+    print(f"\n{'function':26} {'bucket':8} {'throughput/s':>13} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+
+    for name, buckets in results['benchmarks'].items():
+        if 'skipped' in buckets:
+            print(f"{name:26} skipped: {buckets['skipped']}")
+            continue
+
+        for bucket, stats in buckets.items():
+            line = (f"{name:26} {bucket:8} {stats['throughput_per_s']:>13} "
+                    f"{stats['p50_ms']:>10} {stats['p95_ms']:>10} {stats['p99_ms']:>10}")
+
+            before = baseline_benchmarks.get(name, {}).get(bucket)
+            if before and 'p50_ms' in before:
+                line += f"   p50 x{stats['p50_ms'] / before['p50_ms']:.2f} vs baseline"
+            print(line)
+
+    cold = results.get('cold_start')
+    if cold:
+        line = f"\ncold start: {cold['best_total_s']}s (best of {cold['runs']}), peak RSS {cold['peak_rss_mb']} MB"
+        before = (baseline or {}).get('cold_start')
+        if before:
+            line += f"   (baseline {before['best_total_s']}s, {before['peak_rss_mb']} MB)"
+        print(line)
+    print(f"benchmark process peak RSS: {results['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the emoji and category matching pipelines')
+    parser.add_argument('--only', nargs='*', help='only run these functions')
+    parser.add_argument('--iterations', type=int, default=5, help='passes over each corpus bucket')
+    parser.add_argument('--cold-start-runs', type=int, default=3, help='fresh processes to time (0 to skip)')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--cold-start-child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start_child:
+        cold_start_child()
+        return
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'env': {key: value for key, value in os.environ.items() if key.startswith(('TMOJI_', 'EMOJI_'))},
+        },
+        'cold_start': measure_cold_start(args.cold_start_runs) if args.cold_start_runs else None,
+        'benchmarks': run_benchmarks(args.only, args.iterations),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
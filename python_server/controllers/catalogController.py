@@ -0,0 +1,300 @@
+# python_server/controllers/catalogController.py
+# Matching phrases against each patient's own item catalog.
+#
+# The fixed taxonomy in classificationController only has example items. Caregivers
+# create the real items per patient through node_server's media hierarchy, so node_server
+# pushes every patient's catalog here: in full (PUT) on startup or resync, and one item
+# at a time (POST/PATCH/DELETE) as caregivers add, rename and delete items.
+#
+# The catalogs live in a CatalogStore on disk (CATALOG_STORE_DIR), an operation log per
+# patient that every worker process reads, so a change pushed to one gunicorn worker is
+# seen by all of them and survives restarts. Each worker keeps an ItemIndex per patient
+# and before every request replays only the operations appended since it last looked,
+# so a change still touches one row of the index and a match is an exact top-k search.
+# A patient without a catalog gets 409 with code "catalog_not_loaded": node_server should
+# answer that with a full PUT.
+
+from flask import jsonify
+import logging
+import os
+import threading
+
+from controllers.classificationController import load_word_vectors, get_phrase_vector, word_vectors_ready, word_vectors_unavailable
+from models.catalogStore import CatalogStore, CatalogNotLoaded, fold_operations
+from models.itemIndex import ItemIndex, ItemIndexRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 5
+MAX_TOP_K = int(os.getenv("CATALOG_MAX_TOP_K", "50"))
+MAX_CATALOG_SIZE = int(os.getenv("CATALOG_MAX_ITEMS", "50000"))
+CATALOG_STORE_DIR = os.getenv(
+    "CATALOG_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'catalogs')
+)
+# a log is rewritten as a snapshot once it holds this many operations and twice the items
+COMPACT_MIN_OPERATIONS = int(os.getenv("CATALOG_COMPACT_MIN_OPERATIONS", "1000"))
+
+catalog_store = CatalogStore(CATALOG_STORE_DIR)
+patient_indexes = ItemIndexRegistry()
+patient_catalogs = {}  # patient id -> {item id: label}, including items without vectors
+log_positions = {}  # patient id -> (store position, operations read since the last snapshot)
+patient_locks = {}
+patient_locks_lock = threading.Lock()
+
+# helper functions
+def parse_items(data):
+    """
+    (id, label) pairs of an {"items": [{"id": ..., "label": ...}]} body, or raises ValueError.
+    Ids are kept as strings so media ids from JSON and from the URL are the same key
+    """
+    if not data or not isinstance(data, dict) or not isinstance(data.get("items"), list):
+        raise ValueError("Request body must be a JSON object with an 'items' list")
+    if len(data["items"]) > MAX_CATALOG_SIZE:
+        raise ValueError(f"At most {MAX_CATALOG_SIZE} items per catalog")
+
+    items = []
+    for position, item in enumerate(data["items"]):
+        if not isinstance(item, dict) or item.get("id") is None:
+            raise ValueError(f"Item {position} must be an object with an 'id'")
+        label = item.get("label")
+        if not isinstance(label, str) or not label.strip():
+            raise ValueError(f"Item {position} must have a non-empty 'label'")
+        items.append((str(item["id"]), label.strip()))
+    return items
+
+def apply_operations(index, operations, wv_model):
+    """Replay catalog operations on index, items none of whose words have a vector are left out"""
+    for operation in operations:
+        if operation["op"] == "remove":
+            index.remove(operation["id"])
+            continue
+
+        vector = get_phrase_vector(operation["label"], wv_model)
+        if vector is None:
+            index.remove(operation["id"])  # a renamed-away label must not keep matching
+        else:
+            index.add(operation["id"], operation["label"], vector)
+
+def patient_lock(patient_id):
+    with patient_locks_lock:
+        return patient_locks.setdefault(patient_id, threading.Lock())
+
+def sync_index(patient_id, wv_model):
+    """
+    This process's index of a patient and the catalog it was built from, caught up with
+    the shared catalog: (index, {item id: label}). Raises CatalogNotLoaded if the
+    patient has no catalog
+    """
+    with patient_lock(patient_id):
+        index = patient_indexes.get(patient_id)
+        position, operation_count = log_positions.get(patient_id, (None, 0))
+        if index is None or index.vector_size != wv_model.vector_size:
+            position = None
+
+        try:
+            operations, position, reset = catalog_store.read(patient_id, position)
+        except CatalogNotLoaded:
+            patient_indexes.drop(patient_id)
+            patient_catalogs.pop(patient_id, None)
+            log_positions.pop(patient_id, None)
+            raise
+
+        items = patient_catalogs.get(patient_id)
+        if reset:
+            # the catalog was replaced (or is new to this process), rebuild from its start
+            index = ItemIndex(wv_model.vector_size)
+            items = {}
+            operation_count = 0
+        apply_operations(index, operations, wv_model)
+        fold_operations(operations, items)
+        if reset:
+            patient_indexes.replace(patient_id, index)
+            patient_catalogs[patient_id] = items
+
+        log_positions[patient_id] = (position, operation_count + len(operations))
+        return index, items
+
+def compact_if_needed(patient_id, items):
+    """Rewrite the patient's log once renames and removals make it much longer than the catalog"""
+    _, operation_count = log_positions.get(patient_id, (None, 0))
+    if operation_count >= COMPACT_MIN_OPERATIONS and operation_count > 2 * len(items):
+        items = catalog_store.compact(patient_id)
+        logger.info(f"📚 Compacted the catalog log of patient {patient_id}: {operation_count} operations -> {items} items")
+
+def catalog_not_loaded(patient_id):
+    return jsonify({
+        "success": False,
+        "code": "catalog_not_loaded",
+        "message": f"No catalog loaded for patient {patient_id}, send the full catalog with PUT"
+    }), 409
+
+def parse_top_k(value):
+    try:
+        k = int(value) if value is not None else DEFAULT_TOP_K
+    except (TypeError, ValueError):
+        raise ValueError("'k' must be an integer")
+    if not 1 <= k <= MAX_TOP_K:
+        raise ValueError(f"'k' must be between 1 and {MAX_TOP_K}")
+    return k
+
+# business functions
+def sync_patient_items(patient_id, data):
+    """
+    Replace a patient's whole catalog. The new catalog file is written on the side and
+    swapped in, so other requests see the old catalog until it is complete
+    """
+    if not word_vectors_ready():
+        return word_vectors_unavailable()
+
+    try:
+        items = parse_items(data)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        catalog_store.replace(patient_id, items)
+        index, _ = sync_index(patient_id, load_word_vectors())
+        skipped = [item_id for item_id, _ in items if item_id not in index]
+
+        logger.info(f"📚 Synced {len(index)} items for patient {patient_id} ({len(skipped)} not in vocabulary)")
+        return jsonify({
+            "success": True,
+            "patient_id": patient_id,
+            "indexed": len(index),
+            "skipped": skipped
+        }), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error syncing catalog: {str(e)}"}), 500
+
+def add_patient_items(patient_id, data):
+    """Add items to a patient's catalog; items whose id is already in it are replaced"""
+    if not word_vectors_ready():
+        return word_vectors_unavailable()
+
+    try:
+        items = parse_items(data)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        wv_model = load_word_vectors()
+        _, catalog = sync_index(patient_id, wv_model)
+        if len(catalog.keys() | {item_id for item_id, _ in items}) > MAX_CATALOG_SIZE:
+            return jsonify({"success": False, "message": f"At most {MAX_CATALOG_SIZE} items per catalog"}), 400
+
+        catalog_store.append(patient_id, [{"op": "add", "id": item_id, "label": label} for item_id, label in items])
+        index, catalog = sync_index(patient_id, wv_model)
+        skipped = [item_id for item_id, _ in items if item_id not in index]
+        compact_if_needed(patient_id, catalog)
+        return jsonify({
+            "success": True,
+            "patient_id": patient_id,
+            "indexed": len(items) - len(skipped),
+            "skipped": skipped,
+            "total_items": len(index)
+        }), 200
+
+    except CatalogNotLoaded:
+        return catalog_not_loaded(patient_id)
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error adding items: {str(e)}"}), 500
+
+def rename_patient_item(patient_id, item_id, data):
+    if not word_vectors_ready():
+        return word_vectors_unavailable()
+
+    label = data.get("label") if isinstance(data, dict) else None
+    if not isinstance(label, str) or not label.strip():
+        return jsonify({"success": False, "message": "Request body must have a non-empty 'label'"}), 400
+
+    try:
+        wv_model = load_word_vectors()
+        # items without vectors are in the catalog too, and renaming may give them some
+        _, catalog = sync_index(patient_id, wv_model)
+        if item_id not in catalog:
+            return jsonify({"success": False, "message": f"Item '{item_id}' is not in patient {patient_id}'s catalog"}), 404
+
+        catalog_store.append(patient_id, [{"op": "add", "id": item_id, "label": label.strip()}])
+        index, catalog = sync_index(patient_id, wv_model)
+        compact_if_needed(patient_id, catalog)
+        if item_id not in index:
+            # keep the catalog honest: the item can't be matched under its new name
+            return jsonify({
+                "success": True,
+                "patient_id": patient_id,
+                "item_id": item_id,
+                "indexed": False,
+                "message": f"'{label.strip()}' is not in vocabulary, item removed from matching"
+            }), 200
+
+        return jsonify({"success": True, "patient_id": patient_id, "item_id": item_id, "indexed": True}), 200
+
+    except CatalogNotLoaded:
+        return catalog_not_loaded(patient_id)
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error renaming item: {str(e)}"}), 500
+
+def remove_patient_item(patient_id, item_id):
+    if not word_vectors_ready():
+        return word_vectors_unavailable()
+
+    try:
+        wv_model = load_word_vectors()
+        _, catalog = sync_index(patient_id, wv_model)
+        if item_id not in catalog:
+            return jsonify({"success": False, "message": f"Item '{item_id}' is not in patient {patient_id}'s catalog"}), 404
+
+        catalog_store.append(patient_id, [{"op": "remove", "id": item_id}])
+        index, catalog = sync_index(patient_id, wv_model)
+        compact_if_needed(patient_id, catalog)
+
+        return jsonify({"success": True, "patient_id": patient_id, "item_id": item_id, "total_items": len(index)}), 200
+
+    except CatalogNotLoaded:
+        return catalog_not_loaded(patient_id)
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error removing item: {str(e)}"}), 500
+
+def match_patient_items(patient_id, phrase, k=None):
+    """The k items of a patient's catalog most similar to phrase"""
+    if not word_vectors_ready():
+        return word_vectors_unavailable()
+
+    try:
+        k = parse_top_k(k)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        wv_model = load_word_vectors()
+        index, _ = sync_index(patient_id, wv_model)
+        vector = get_phrase_vector(phrase, wv_model)
+        if vector is None:
+            return jsonify({
+                "success": False,
+                "message": f"No match found for '{phrase}' - phrase may not be in vocabulary",
+                "phrase": phrase
+            }), 404
+
+        matches = index.search(vector, k)
+        return jsonify({
+            "success": True,
+            "patient_id": patient_id,
+            "phrase": phrase,
+            "matches": [
+                {"id": item_id, "label": label, "similarity_score": round(similarity, 4)}
+                for item_id, label, similarity in matches
+            ],
+            "catalog_size": len(index)
+        }), 200
+
+    except CatalogNotLoaded:
+        return catalog_not_loaded(patient_id)
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error processing request: {str(e)}"}), 500
+
+def get_catalog_stats():
+    """Catalogs indexed by this worker process"""
+    return jsonify(patient_indexes.stats()), 200
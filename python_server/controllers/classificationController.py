@@ -1,9 +1,9 @@
-from gensim.models import KeyedVectors
-import gensim.downloader as api
 import numpy as np
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 import urllib.request
 import os
+import threading
+from models.embeddingStore import EmbeddingStore, store_exists, quantize, DEFAULT_STORE_DIR, DEFAULT_STORE_NAME
 
 np.random.seed(42)
 app = Flask(__name__)
@@ -11,6 +11,21 @@ app = Flask(__name__)
 # Load model globally
 wv = None
 
+# Memory-mapped store written by models/buildEmbeddingStore.py, used instead of gensim when present
+WORD_VECTORS_STORE_DIR = os.getenv("WORD_VECTORS_STORE_DIR", DEFAULT_STORE_DIR)
+WORD_VECTORS_STORE_NAME = os.getenv("WORD_VECTORS_STORE_NAME", DEFAULT_STORE_NAME)
+
+# The word vectors load on a background thread at boot (start_word_vectors_loading) so
+# the emoji routes serve straight away; until they are ready the matching routes answer
+# 503 with a Retry-After instead of blocking on the load
+WORD_VECTORS_RETRY_AFTER_SECONDS = int(os.getenv("WORD_VECTORS_RETRY_AFTER", "10"))
+
+word_vectors_lock = threading.Lock()         # held for the whole load
+word_vectors_thread_lock = threading.Lock()  # only guards starting the loader thread
+word_vectors_done = threading.Event()
+word_vectors_error = None
+word_vectors_thread = None
+
 # helper functions
 def download_word2vec_model():
     url = "https://figshare.com/ndownloader/files/10798046"
@@ -34,15 +49,82 @@ def download_word2vec_model():
 
 def load_word_vectors():
     global wv
-    if wv is None:
-        print("Loading word2vec model..")
-        # model_path = download_word2vec_model()
-        # print("modelpath is", model_path)
-        # wv = KeyedVectors.load_word2vec_format(model_path, binary=True)
-        wv = api.load("glove-wiki-gigaword-50")
-        print("Model loaded successfully")
+    if wv is not None:
+        return wv
+
+    # once-only: concurrent callers wait for the first load instead of starting their own
+    with word_vectors_lock:
+        if wv is None:
+            if store_exists(WORD_VECTORS_STORE_DIR, WORD_VECTORS_STORE_NAME):
+                # maps the files, nothing is parsed and the pages are shared between processes
+                model = EmbeddingStore.open(WORD_VECTORS_STORE_DIR, WORD_VECTORS_STORE_NAME)
+                print(f"Word vector store mapped ({len(model)} words)")
+            else:
+                print("Loading word2vec model.. (run models/buildEmbeddingStore.py to memory-map it instead)")
+                import gensim.downloader as api
+                # model_path = download_word2vec_model()
+                # print("modelpath is", model_path)
+                # model = KeyedVectors.load_word2vec_format(model_path, binary=True)
+                model = api.load("glove-wiki-gigaword-50")
+                print("Model loaded successfully")
+            wv = model
     return wv
 
+def warm_up_word_vectors():
+    """Load the word vectors and compile the taxonomy against them, then mark them ready"""
+    global word_vectors_error
+    try:
+        get_category_matrix(load_word_vectors())
+        word_vectors_error = None
+        word_vectors_done.set()
+    except Exception as e:
+        word_vectors_error = str(e)
+        print(f"❌ Word vectors failed to load: {e}")
+        raise
+
+def start_word_vectors_loading():
+    """Start warm_up_word_vectors on a background thread, once per process (again after a failure)"""
+    global word_vectors_thread
+    with word_vectors_thread_lock:
+        if not word_vectors_done.is_set() and (word_vectors_thread is None or not word_vectors_thread.is_alive()):
+            word_vectors_thread = threading.Thread(target=warm_up_word_vectors, name="word-vectors-load", daemon=True)
+            word_vectors_thread.start()
+
+    return word_vectors_thread
+
+def word_vectors_ready():
+    return word_vectors_done.is_set()
+
+def get_word_vectors_readiness():
+    """
+    Readiness of the word vectors: (is_ready, details)
+    """
+    if word_vectors_ready():
+        return True, {'status': 'ready'}
+    if word_vectors_error:
+        return False, {'status': 'failed', 'error': word_vectors_error}
+    return False, {'status': 'loading'}
+
+def word_vectors_unavailable_payload():
+    """
+    503 body while the word vectors load: (payload, status). Also (re)starts the load, for
+    processes that were started without it or whose load failed
+    """
+    start_word_vectors_loading()
+    _, details = get_word_vectors_readiness()
+    return {
+        "success": False,
+        "message": "Word vectors are still loading, try again shortly",
+        "word_vectors": details
+    }, 503
+
+def retry_after_headers(status):
+    return {"Retry-After": str(WORD_VECTORS_RETRY_AFTER_SECONDS)} if status == 503 else {}
+
+def word_vectors_unavailable():
+    payload, status = word_vectors_unavailable_payload()
+    return jsonify(payload), status, retry_after_headers(status)
+
 def get_phrase_vector(phrase, model):
     """Get average vector for a phrase (handles both single words and multi-word phrases)"""
     tokens = phrase.lower().split()
@@ -83,55 +165,181 @@ def average_phrase_similarity(input_phrase, phrase_list, model):
     
     return np.mean(similarities)
 
-def find_best_category_match(input_phrase):
-    wv_model = load_word_vectors()
-    
-    # Check if any tokens in the phrase exist in vocabulary
-    input_vec = get_phrase_vector(input_phrase, wv_model)
-    if input_vec is None:
+# Category taxonomy: main category -> subcategory -> example items
+CATEGORY_TAXONOMY = {
+    "Services": {
+        "Personal Care": ["bathing", "toilet", "dressing"],
+        "Meal Help": ["eating", "feeding"],
+        "Emergency": ["call help", "nurse"]
+    },
+    "Drinks": {
+        "Cold Drinks": ["coke"],
+        "Hot Drinks": ["coffee", "tea"],
+        "Juices": ["apple juice", "orange juice"],
+        "Still Drinks": ["water", "milk"]
+    },
+    "Food": {
+        "Staples": ["rice", "bread", "noodles"],
+        "Fruits & Vegetables": ["apple", "banana", "carrot"],
+        "Snacks": ["biscuit", "chips", "yogurt"]
+    },
+    "Objects": {
+        "Toiletries": ["toothbrush", "soap"],
+        "Kitchen Items": ["cup", "spoon"],
+        "Devices": ["TV remote", "phone"]
+    },
+    "Clothing": {
+        "Tops": ["shirt", "blouse"],
+        "Bottoms": ["pants", "skirt"],
+        "Footwear": ["shoes", "socks"]
+    },
+    "Medical": {
+        "Medication": ["pills", "insulin"],
+        "Mobility": ["wheelchair", "walking stick"],
+        "Bandages": ["plaster", "gauze"]
+    }
+}
+
+class CategoryMatrix:
+    """
+    The taxonomy compiled against a word vector model: one unit-normalized row per item
+    that has a phrase vector, and for every row the index of its subcategory and main
+    category, so all similarities of a phrase are one matrix-vector product and the
+    category averages are segment means over it.
+
+    precision (default: the model's, float32 for gensim) is the form the item rows are
+    kept and scored in: float16, or int8 codes with a scale per row where the dot
+    products accumulate in int32 and are scaled back afterwards
+    """
+    def __init__(self, model, taxonomy, precision=None):
+        self.precision = precision or getattr(model, 'precision', 'float32')
+        self.main_categories = list(taxonomy)
+        self.subcategories = []      # (main index, subcategory name)
+        self.subcategory_items = []  # per subcategory: [(item, row or None)]
+        self.item_names = []         # per row: item
+        rows, item_subs, item_mains = [], [], []
+
+        for main_index, (main_category, subcats) in enumerate(taxonomy.items()):
+            for subcategory, items in subcats.items():
+                sub_index = len(self.subcategories)
+                self.subcategories.append((main_index, subcategory))
+                self.subcategory_items.append([])
+
+                for item in items:
+                    vector = get_phrase_vector(item, model)
+                    row = None
+                    if vector is not None:
+                        row = len(rows)
+                        rows.append(vector / np.linalg.norm(vector))
+                        self.item_names.append(item)
+                        item_subs.append(sub_index)
+                        item_mains.append(main_index)
+                    self.subcategory_items[sub_index].append((item, row))
+
+        unit_items = np.array(rows, dtype=np.float64).reshape(len(rows), model.vector_size)
+        if self.precision == 'float32':
+            self.unit_items, self.item_scales = unit_items, None  # float64, as the original matcher
+        else:
+            self.unit_items, self.item_scales = quantize(unit_items, self.precision)
+        self.item_subcategory = np.array(item_subs, dtype=np.intp)
+        self.item_main = np.array(item_mains, dtype=np.intp)
+        self.subcategory_counts = np.bincount(self.item_subcategory, minlength=len(self.subcategories))
+        self.main_counts = np.bincount(self.item_main, minlength=len(self.main_categories))
+
+        # item -> segment averaging weights (1/count in the item's segment column), so the
+        # segment means of one or many similarity rows are a single product
+        self.subcategory_weights = self.segment_weights(self.item_subcategory, self.subcategory_counts)
+        self.main_weights = self.segment_weights(self.item_main, self.main_counts)
+        self.subcategories_of_main = [
+            [sub_index for sub_index, (main_index, _) in enumerate(self.subcategories) if main_index == m]
+            for m in range(len(self.main_categories))
+        ]
+
+    def item_similarities(self, input_vecs):
+        """
+        Cosine similarity to every item row: a vector for one input vector, or a
+        (phrases x items) matrix for stacked input vectors
+        """
+        input_vecs = np.asarray(input_vecs, dtype=np.float64)
+        unit_inputs = input_vecs / np.linalg.norm(input_vecs, axis=-1, keepdims=True)
+        if self.precision == 'float32':
+            return unit_inputs @ self.unit_items.T
+
+        # the input is quantized like the items and the product taken on the quantized forms
+        batch = np.atleast_2d(unit_inputs)
+        codes, scales = quantize(batch, self.precision)
+        if scales is None:
+            similarities = np.matmul(codes, self.unit_items.T, dtype=np.float32)
+        else:
+            similarities = np.matmul(codes, self.unit_items.T, dtype=np.int32) * scales[:, None] * self.item_scales
+        similarities = similarities.astype(np.float64)
+        return similarities if unit_inputs.ndim == 2 else similarities[0]
+
+    @staticmethod
+    def segment_weights(segment_ids, counts):
+        weights = np.zeros((len(segment_ids), len(counts)))
+        weights[np.arange(len(segment_ids)), segment_ids] = 1.0 / counts[segment_ids]
+        return weights
+
+    @staticmethod
+    def segment_means(similarities, weights, counts):
+        """Mean similarity per segment, -1.0 for segments without any item vectors"""
+        means = similarities @ weights
+        means[..., counts == 0] = -1.0
+        return means
+
+    def category_means(self, similarities):
+        """(main category means, subcategory means) of one or many similarity rows"""
+        return (
+            self.segment_means(similarities, self.main_weights, self.main_counts),
+            self.segment_means(similarities, self.subcategory_weights, self.subcategory_counts)
+        )
+
+    @staticmethod
+    def top_k(scores, k, valid=None):
+        """Indexes of the k highest scores, highest first: a partial selection, then a sort of only those k"""
+        candidates = np.arange(len(scores)) if valid is None else np.flatnonzero(valid)
+        if k < len(candidates):
+            picked = np.argpartition(scores[candidates], len(candidates) - k)[len(candidates) - k:]
+            candidates = candidates[picked]
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    def rank(self, similarities, main_means, sub_means, k):
+        """
+        The k best items, subcategories and main categories of one phrase's scores. Items are
+        ranked across the whole taxonomy, not only inside the best main category
+        """
         return {
-            "main_category": None,
-            "subcategory": None,
-            "item": None,
-            "all_subcategories": [],
-            "similarity": -1.0
+            "items": [{
+                "item": self.item_names[row],
+                "subcategory": self.subcategories[self.item_subcategory[row]][1],
+                "main_category": self.main_categories[self.item_main[row]],
+                "similarity": float(similarities[row])
+            } for row in self.top_k(similarities, k)],
+            "subcategories": [{
+                "subcategory": self.subcategories[sub_index][1],
+                "main_category": self.main_categories[self.subcategories[sub_index][0]],
+                "similarity": float(sub_means[sub_index])
+            } for sub_index in self.top_k(sub_means, k, self.subcategory_counts > 0)],
+            "main_categories": [{
+                "main_category": self.main_categories[main_index],
+                "similarity": float(main_means[main_index])
+            } for main_index in self.top_k(main_means, k, self.main_counts > 0)]
         }
 
-    categories = {
-        "Services": {
-            "Personal Care": ["bathing", "toilet", "dressing"],
-            "Meal Help": ["eating", "feeding"],
-            "Emergency": ["call help", "nurse"]
-        },
-        "Drinks": {
-            "Cold Drinks": ["coke"],
-            "Hot Drinks": ["coffee", "tea"],
-            "Juices": ["apple juice", "orange juice"],
-            "Still Drinks": ["water", "milk"]
-        },
-        "Food": {
-            "Staples": ["rice", "bread", "noodles"],
-            "Fruits & Vegetables": ["apple", "banana", "carrot"],
-            "Snacks": ["biscuit", "chips", "yogurt"]
-        },
-        "Objects": {
-            "Toiletries": ["toothbrush", "soap"],
-            "Kitchen Items": ["cup", "spoon"],
-            "Devices": ["TV remote", "phone"]
-        },
-        "Clothing": {
-            "Tops": ["shirt", "blouse"],
-            "Bottoms": ["pants", "skirt"],
-            "Footwear": ["shoes", "socks"]
-        },
-        "Medical": {
-            "Medication": ["pills", "insulin"],
-            "Mobility": ["wheelchair", "walking stick"],
-            "Bandages": ["plaster", "gauze"]
-        }
-    }
+category_matrix = None
+category_matrix_model = None
+
+def get_category_matrix(model):
+    """The taxonomy compiled for model, built on first use and whenever the model changes"""
+    global category_matrix, category_matrix_model
+    if category_matrix is None or category_matrix_model is not model:
+        category_matrix = CategoryMatrix(model, CATEGORY_TAXONOMY)
+        category_matrix_model = model
+    return category_matrix
 
-    best_match = {
+def no_category_match():
+    return {
         "main_category": None,
         "subcategory": None,
         "item": None,
@@ -139,81 +347,229 @@ def find_best_category_match(input_phrase):
         "similarity": -1.0
     }
 
-    # Step 1: Find best main category by comparing to all example items
-    for main_category, subcats in categories.items():
-        all_items = [item for sublist in subcats.values() for item in sublist]
-        sim = average_phrase_similarity(input_phrase, all_items, wv_model)
-        print(f"{main_category} vs '{input_phrase}': {sim}")
+def find_best_category_match(input_phrase, k=None):
+    """
+    The best main category, subcategory and item for a phrase. With k, the match also
+    has a "ranking" of the top-k items, subcategories and main categories, taken from
+    the same scores
+    """
+    wv_model = load_word_vectors()
+    compiled = get_category_matrix(wv_model)
+
+    # Check if any tokens in the phrase exist in vocabulary
+    input_vec = get_phrase_vector(input_phrase, wv_model)
+    if input_vec is None:
+        return no_category_match()
+
+    similarities = compiled.item_similarities(input_vec)
+    main_means, sub_means = compiled.category_means(similarities)
+    best_match = select_best_match(compiled, similarities, main_means, sub_means)
+    if k and best_match["main_category"] is not None:
+        best_match["ranking"] = compiled.rank(similarities, main_means, sub_means, k)
+    return best_match
+
+def find_best_category_matches(input_phrases):
+    """
+    find_best_category_match for many phrases: their vectors are stacked and scored
+    against every item in one matrix-matrix product. Results are in input order
+    """
+    wv_model = load_word_vectors()
+    compiled = get_category_matrix(wv_model)
+
+    input_vecs = [get_phrase_vector(phrase, wv_model) for phrase in input_phrases]
+    matches = [no_category_match() for _ in input_phrases]
+    known = [i for i, input_vec in enumerate(input_vecs) if input_vec is not None]
+    if not known:
+        return matches
+
+    similarities = compiled.item_similarities(np.stack([input_vecs[i] for i in known]))
+    main_means, sub_means = compiled.category_means(similarities)
+    for row, i in enumerate(known):
+        matches[i] = select_best_match(compiled, similarities[row], main_means[row], sub_means[row])
+    return matches
+
+def select_best_match(compiled, similarities, main_means, sub_means):
+    """Pick the main category, subcategory and item from one phrase's precomputed scores"""
+    best_match = no_category_match()
+
+    # Step 1: Find best main category by its average similarity to all example items
+    best_main = None
+    for main_index, sim in enumerate(main_means):
         if sim > best_match["similarity"]:
-            best_match["main_category"] = main_category
+            best_main = main_index
+            best_match["main_category"] = compiled.main_categories[main_index]
             best_match["similarity"] = float(sim)
 
-    if best_match["main_category"] is None:
+    if best_main is None:
         return best_match
 
-    best_match["all_subcategories"] = list(categories[best_match["main_category"]].keys())
+    sub_indexes = compiled.subcategories_of_main[best_main]
+    best_match["all_subcategories"] = [compiled.subcategories[i][1] for i in sub_indexes]
     best_match["similarity"] = -1.0  # Reset for subcategory/item search
 
-    # Step 2: Find best subcategory and most similar item
-    for subcategory, items in categories[best_match["main_category"]].items():
-        sim = average_phrase_similarity(input_phrase, items, wv_model)
-        print(f"{subcategory} vs '{input_phrase}': {sim}")
-        if sim > best_match["similarity"]:
+    # Step 2: Find best subcategory and most similar item. Subcategory averages and
+    # single items compete for the same running best, in taxonomy order
+    for sub_index in sub_indexes:
+        subcategory = compiled.subcategories[sub_index][1]
+        if sub_means[sub_index] > best_match["similarity"]:
             best_match["subcategory"] = subcategory
-            best_match["similarity"] = float(sim)
+            best_match["similarity"] = float(sub_means[sub_index])
 
         # Find the most similar individual item
-        for item in items:
-            item_sim = phrase_similarity(input_phrase, item, wv_model)
-            if item_sim > best_match["similarity"]:
+        for item, row in compiled.subcategory_items[sub_index]:
+            if row is not None and similarities[row] > best_match["similarity"]:
                 best_match["subcategory"] = subcategory
                 best_match["item"] = item
-                best_match["similarity"] = float(item_sim)
+                best_match["similarity"] = float(similarities[row])
 
     return best_match
 
+# the category list only changes with a deploy
+CATEGORIES_MAX_AGE_SECONDS = int(os.getenv("CATEGORIES_HTTP_MAX_AGE", "86400"))
+
+# Largest batch accepted by /api/match/batch
+MAX_MATCH_BATCH_SIZE = int(os.getenv("MATCH_MAX_BATCH_SIZE", "1000"))
+
+# Largest k accepted by /api/match
+MAX_MATCH_TOP_K = int(os.getenv("MATCH_MAX_TOP_K", "20"))
+
 # business functions
-def match_category(phrase):
-    try:        
-        result = find_best_category_match(phrase)
+def match_category(phrase, k=None):
+    payload, status = build_match_payload(phrase, k)
+    return jsonify(payload), status, retry_after_headers(status)
+
+def parse_match_top_k(value):
+    """k from the query string: None when absent, else an int in 1..MAX_MATCH_TOP_K or ValueError"""
+    if value is None or value == "":
+        return None
+    try:
+        k = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("'k' must be an integer")
+    if not 1 <= k <= MAX_MATCH_TOP_K:
+        raise ValueError(f"'k' must be between 1 and {MAX_MATCH_TOP_K}")
+    return k
 
-        if result["main_category"] is None:
-            return jsonify({
-                "success": False,
-                "message": f"No match found for '{phrase}' - phrase may not be in vocabulary",
-                "phrase": phrase
-            }), 404
+def rounded_scores(entries):
+    return [{
+        **{key: value for key, value in entry.items() if key != "similarity"},
+        "similarity_score": round(entry["similarity"], 4)
+    } for entry in entries]
 
-        return jsonify({
-            "success": True,
-            "phrase": phrase,
-            "main_category": result["main_category"],
-            "best_subcategory": result["subcategory"],
-            "all_subcategories": result["all_subcategories"],
-            "most_similar_item": result["item"],
-            "similarity_score": round(result["similarity"], 4)
-        })
+def match_result_payload(phrase, result):
+    """Response body of one match: (payload, status)"""
+    if result["main_category"] is None:
+        return {
+            "success": False,
+            "message": f"No match found for '{phrase}' - phrase may not be in vocabulary",
+            "phrase": phrase
+        }, 404
+
+    payload = {
+        "success": True,
+        "phrase": phrase,
+        "main_category": result["main_category"],
+        "best_subcategory": result["subcategory"],
+        "all_subcategories": result["all_subcategories"],
+        "most_similar_item": result["item"],
+        "similarity_score": round(result["similarity"], 4)
+    }
+    if "ranking" in result:
+        payload["top_items"] = rounded_scores(result["ranking"]["items"])
+        payload["top_subcategories"] = rounded_scores(result["ranking"]["subcategories"])
+        payload["top_main_categories"] = rounded_scores(result["ranking"]["main_categories"])
+    return payload, 200
+
+def build_match_payload(phrase, k=None):
+    """
+    Match a phrase to a category and build the response body: (payload, status), without Flask.
+    k (a query string value) adds the top-k items, subcategories and main categories
+    """
+    try:
+        k = parse_match_top_k(k)
+    except ValueError as e:
+        return {"success": False, "message": str(e), "phrase": phrase}, 400
+
+    if not word_vectors_ready():
+        return word_vectors_unavailable_payload()
+
+    try:        
+        result = find_best_category_match(phrase, k)
+        return match_result_payload(phrase, result)
 
     except Exception as e:
-        return jsonify({
+        return {
             "success": False,
             "message": f"Error processing phrase '{phrase}': {str(e)}",
             "phrase": phrase
-        }), 500
+        }, 500
+
+def match_categories(data):
+    payload, status = build_batch_match_payload(data)
+    return jsonify(payload), status, retry_after_headers(status)
+
+def build_batch_match_payload(data):
+    """
+    Match many phrases in one pass, eg. a patient's whole item list on import.
+    Results keep the input order and every phrase gets its own success flag
+    """
+    if not data or not isinstance(data, dict) or not isinstance(data.get("phrases"), list):
+        return {"success": False, "message": "Request body must be a JSON object with a 'phrases' list"}, 400
+    if not word_vectors_ready():
+        return word_vectors_unavailable_payload()
+
+    phrases = data["phrases"]
+    if len(phrases) > MAX_MATCH_BATCH_SIZE:
+        return {
+            "success": False,
+            "message": f"Batch too large - at most {MAX_MATCH_BATCH_SIZE} phrases per request",
+            "received_count": len(phrases)
+        }, 400
+
+    try:
+        valid = [i for i, phrase in enumerate(phrases) if isinstance(phrase, str) and phrase.strip()]
+        matches = find_best_category_matches([phrases[i].strip() for i in valid])
+
+        results = [{
+            "index": i,
+            "success": False,
+            "phrase": phrase,
+            "message": "Phrase must be a non-empty string"
+        } for i, phrase in enumerate(phrases)]
+        for i, result in zip(valid, matches):
+            payload, _ = match_result_payload(phrases[i].strip(), result)
+            results[i] = {"index": i, **payload}
+
+        matched = sum(1 for result in results if result["success"])
+        return {
+            "success": True,
+            "results": results,
+            "total": len(phrases),
+            "matched": matched,
+            "unmatched": len(phrases) - matched
+        }, 200
+
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error processing batch: {str(e)}"
+        }, 500
 
 def list_categories():
-    categories = {
-        "Services": ["Personal Care", "Meal Help", "Emergency"],
-        "Food": ["Staples", "Fruits & Vegetables", "Snacks"],
-        "Drinks": ["Cold Drinks", "Hot Drinks", "Juices", "Still Drinks"],
-        "Objects": ["Toiletries", "Kitchen Items", "Devices"],
-        "Clothing": ["Tops", "Bottoms", "Footwear"],
-        "Medical": ["Medication", "Mobility", "Bandages"]
-    }
+    if not word_vectors_ready():
+        return word_vectors_unavailable()
 
-    return jsonify({
+    categories = {main_category: list(subcats) for main_category, subcats in CATEGORY_TAXONOMY.items()}
+
+    response = jsonify({
         "success": True,
         "categories": categories,
         "total_main_categories": len(categories),
         "total_subcategories": sum(len(subs) for subs in categories.values())
-    })
\ No newline at end of file
+    })
+
+    # static data: cacheable by browsers and proxies, with an ETag of the body for revalidation
+    response.cache_control.public = True
+    response.cache_control.max_age = CATEGORIES_MAX_AGE_SECONDS
+    response.add_etag()
+    return response.make_conditional(request)
\ No newline at end of file
@@ -36,76 +36,550 @@
 
 # python_server/controllers/emojiController.py - Updated with better error handling
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+import hashlib
+import hmac
 import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime
+from models.boundedExecutor import BoundedExecutor, ExecutorBusy
+from models.circuitBreaker import CircuitBreaker
+from models.conversionCache import ConversionCache
+from models.pipelineTracer import Trace, start_trace, finish_trace, current_trace, attach_trace, histogram_snapshot, SAMPLE_RATE
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Importing the model is cheap (nothing is loaded until warm-up), so do it once here
+# instead of inside the first request
+try:
+    from models import TmojiModel
+except ImportError as e:
+    TmojiModel = None
+    logger.error(f"❌ Failed to import TmojiModel: {e}")
+
+# Result cache in front of the TmojiModel, shared by the single and batch routes
+conversion_cache = ConversionCache(
+    max_entries=int(os.getenv("EMOJI_CACHE_SIZE", "4096")),
+    max_bytes=int(os.getenv("EMOJI_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("EMOJI_CACHE_TTL", "3600")),
+    eviction=os.getenv("EMOJI_CACHE_EVICTION", "lru")
+)
+
+# Latency budget of the TmojiModel per request. Over budget the request gets the
+# fallback result marked as degraded (0 waits for the model however long it takes)
+LATENCY_BUDGET_SECONDS = float(os.getenv("EMOJI_LATENCY_BUDGET_MS", "500")) / 1000
+BATCH_LATENCY_BUDGET_SECONDS = float(os.getenv("EMOJI_BATCH_LATENCY_BUDGET_MS", "2000")) / 1000
+ENGINE_WORKERS = int(os.getenv("EMOJI_ENGINE_WORKERS", "4"))
+
+# Conversions run here so the request thread can stop waiting at the deadline,
+# work beyond max_pending is refused straight away instead of queueing
+engine_executor = BoundedExecutor(
+    ThreadPoolExecutor(max_workers=ENGINE_WORKERS, thread_name_prefix="tmoji-engine"),
+    max_pending=int(os.getenv("EMOJI_ENGINE_MAX_PENDING", str(ENGINE_WORKERS * 2)))
+)
+
+# While the model keeps missing its deadline, requests skip it and get the fallback
+engine_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("EMOJI_BREAKER_FAILURES", "5")),
+    reset_seconds=float(os.getenv("EMOJI_BREAKER_RESET_SECONDS", "30"))
+)
+
+# Optional LM tier: the emoji LM fine-tuned by models/trainLLMForEmoji.py, for callers that
+# send "engine": "lm" (or every caller with EMOJI_ENGINE=lm). Concurrent requests share
+# micro-batched generate calls. Until the LM has loaded, or when it misses its budget or
+# fails, requests get the TmojiModel result marked as degraded. Needs requirements-lm.txt.
+#
+# A single process loads the LM itself. Servers whose workers are separate processes
+# (gunicorn.conf.py, asgi.py with ASGI_EXECUTOR=process) start one shared LM server per
+# node with start_emoji_lm_server and point their workers at it with use_shared_emoji_lm,
+# so there is one copy of the model and the workers' requests share its batches
+EMOJI_LM_PATH = os.getenv("EMOJI_LM_PATH")  # adapter or model directory, unset disables the tier
+EMOJI_LM_SOCKET = os.getenv("EMOJI_LM_SOCKET")  # an LM server run separately, see models/emojiLM.py
+DEFAULT_ENGINE = os.getenv("EMOJI_ENGINE", "tmoji")
+ENGINES = ('tmoji', 'lm')
+LM_LATENCY_BUDGET_SECONDS = float(os.getenv("EMOJI_LM_LATENCY_BUDGET_MS", "2000")) / 1000
+LM_BATCH_LATENCY_BUDGET_SECONDS = float(os.getenv("EMOJI_LM_BATCH_LATENCY_BUDGET_MS", "5000")) / 1000
+LM_MAX_BATCH_SIZE = int(os.getenv("EMOJI_LM_MAX_BATCH", "8"))
+LM_MAX_WAIT_SECONDS = float(os.getenv("EMOJI_LM_MAX_WAIT_MS", "10")) / 1000
+LM_MAX_PENDING = int(os.getenv("EMOJI_LM_MAX_PENDING", "256"))
+LM_MAX_NEW_TOKENS = int(os.getenv("EMOJI_LM_MAX_NEW_TOKENS", "16"))
+LM_THREADS = int(os.getenv("EMOJI_LM_THREADS", "0"))  # torch threads, 0 keeps torch's default
+
+lm_cache = ConversionCache(max_entries=int(os.getenv("EMOJI_CACHE_SIZE", "4096")))
+lm_batcher = None
+lm_error = None
+lm_lock = threading.Lock()
+lm_thread = None
+lm_thread_lock = threading.Lock()
+lm_server_address = EMOJI_LM_SOCKET
+LM_CONNECT_RETRY_SECONDS = 1.0
+
+def start_emoji_lm_server():
+    """
+    Start the node's shared emoji LM server in a child process: (process, address).
+    The process is None when EMOJI_LM_SOCKET points at a server run separately, and
+    both are None when the tier is off
+    """
+    if not EMOJI_LM_PATH:
+        return None, None
+    if EMOJI_LM_SOCKET:
+        return None, EMOJI_LM_SOCKET
+
+    from models.emojiLM import spawn_server
+    address = os.path.join(tempfile.mkdtemp(prefix='emoji-lm-'), 'lm.sock')
+    process = spawn_server(EMOJI_LM_PATH, address, max_new_tokens=LM_MAX_NEW_TOKENS, threads=LM_THREADS,
+                           max_batch_size=LM_MAX_BATCH_SIZE, max_wait_seconds=LM_MAX_WAIT_SECONDS,
+                           max_pending=LM_MAX_PENDING)
+    logger.info(f"🧠 Starting the shared emoji LM server (pid {process.pid}) on {address}")
+    return process, address
+
+def stop_emoji_lm_server(process, address):
+    """Stop a server start_emoji_lm_server started, and remove its socket"""
+    if process is None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    shutil.rmtree(os.path.dirname(address), ignore_errors=True)
+
+def use_shared_emoji_lm(address):
+    """Submit to the LM server at address instead of loading the LM in this process"""
+    global lm_server_address
+    if address:
+        lm_server_address = address
+
+def connect_emoji_lm():
+    """Connect to the shared LM server, waiting for it while it loads the model"""
+    from models.emojiLM import EmojiLMClient
+    waited = False
+    while True:
+        try:
+            client = EmojiLMClient(lm_server_address)
+            logger.info(f"🧠 Using the shared emoji LM server on {lm_server_address}")
+            return client
+        except OSError as e:
+            if not waited:
+                logger.info(f"⏳ Waiting for the shared emoji LM server on {lm_server_address}: {e}")
+                waited = True
+            time.sleep(LM_CONNECT_RETRY_SECONDS)
+
+def load_emoji_lm():
+    """
+    Load the emoji LM and start its micro-batcher (or connect to the node's shared LM
+    server), once per process. None if the tier is off
+    """
+    global lm_batcher, lm_error
+    if lm_batcher is not None or not EMOJI_LM_PATH:
+        return lm_batcher
+
+    with lm_lock:
+        if lm_batcher is None and lm_server_address:
+            lm_batcher = connect_emoji_lm()
+            lm_error = None
+        elif lm_batcher is None:
+            try:
+                from models.emojiLM import EmojiLM, MicroBatcher
+                lm = EmojiLM(EMOJI_LM_PATH, max_new_tokens=LM_MAX_NEW_TOKENS, threads=LM_THREADS)
+                lm_batcher = MicroBatcher(lm.generate_batch, max_batch_size=LM_MAX_BATCH_SIZE,
+                                          max_wait_seconds=LM_MAX_WAIT_SECONDS, max_pending=LM_MAX_PENDING,
+                                          name="emoji-lm-batcher")
+                lm_error = None
+                logger.info(f"🧠 Emoji LM loaded from {EMOJI_LM_PATH}")
+            except Exception as e:
+                lm_error = str(e)
+                logger.error(f"❌ Emoji LM failed to load from {EMOJI_LM_PATH}: {e}")
+    return lm_batcher
+
+def start_emoji_lm_loading():
+    """Load the emoji LM on a background thread, once per process (again after a failure)"""
+    global lm_thread
+    if not EMOJI_LM_PATH:
+        return None
+    with lm_thread_lock:
+        if lm_batcher is None and (lm_thread is None or not lm_thread.is_alive()):
+            lm_thread = threading.Thread(target=load_emoji_lm, name="emoji-lm-load", daemon=True)
+            lm_thread.start()
+    return lm_thread
+
+def convert_with_lm(texts, budget_seconds=LM_LATENCY_BUDGET_SECONDS):
+    """
+    Convert texts with the emoji LM: (emoji_results, cache_hits, failure_reason).
+    On failure the results are None and the caller falls back to the TmojiModel
+    """
+    global lm_batcher
+    if lm_batcher is not None and lm_batcher.closed:
+        # the shared LM server went away, reconnect in the background
+        logger.warning("⚠️ Lost the shared emoji LM server, reconnecting")
+        lm_batcher = None
+
+    if lm_batcher is None:
+        start_emoji_lm_loading()
+        return None, 0, 'lm_unavailable' if lm_error or not EMOJI_LM_PATH else 'lm_loading'
+
+    results = [lm_cache.get(text, EMOJI_LM_PATH) for text in texts]
+    misses = [i for i, result in enumerate(results) if result is None]
+
+    futures = []
+    try:
+        for i in misses:
+            future = lm_batcher.submit(texts[i])
+            # late results still land in the cache for the next request
+            future.add_done_callback(
+                lambda f, text=texts[i]: f.cancelled() or f.exception() or lm_cache.put(text, EMOJI_LM_PATH, f.result())
+            )
+            futures.append(future)
+    except ExecutorBusy:
+        for future in futures:
+            future.cancel()
+        logger.warning(f"⚠️ Emoji LM overloaded, using the TmojiModel for {len(texts)} texts")
+        return None, 0, 'lm_overloaded'
+    except ConnectionError as e:
+        for future in futures:
+            future.cancel()
+        logger.warning(f"⚠️ {e}, using the TmojiModel for {len(texts)} texts")
+        return None, 0, 'lm_unavailable'
+
+    deadline = time.monotonic() + budget_seconds
+    try:
+        for i, future in zip(misses, futures):
+            results[i] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FuturesTimeoutError:
+        for future in futures:
+            future.cancel()  # drops them from batches that haven't started yet
+        logger.warning(f"⚠️ Emoji LM missed its {budget_seconds * 1000:g}ms budget, using the TmojiModel")
+        return None, 0, 'lm_deadline_exceeded'
+    except ExecutorBusy:
+        # the shared LM server turned it away
+        for future in futures:
+            future.cancel()
+        logger.warning(f"⚠️ Emoji LM overloaded, using the TmojiModel for {len(texts)} texts")
+        return None, 0, 'lm_overloaded'
+    except Exception as e:
+        logger.error(f"❌ Error in emoji LM conversion: {e}")
+        return None, 0, 'lm_error'
+
+    return results, len(texts) - len(misses), None
+
+def convert_with_engine(texts, engine, budget_seconds=LATENCY_BUDGET_SECONDS,
+                        lm_budget_seconds=LM_LATENCY_BUDGET_SECONDS):
+    """
+    convert_with_cache with the engine the caller asked for:
+    (emoji_results, cache_hits, degraded_reason, engine_used)
+    """
+    lm_failure = None
+    if engine == 'lm':
+        results, cache_hits, lm_failure = convert_with_lm(texts, lm_budget_seconds)
+        if lm_failure is None:
+            return results, cache_hits, None, 'lm'
+
+    results, cache_hits, degraded_reason = convert_with_cache(texts, budget_seconds)
+    return results, cache_hits, degraded_reason or lm_failure, 'tmoji'
+
+def requested_engine(data):
+    """The engine named in the request body, DEFAULT_ENGINE if none. Raises ValueError for unknown ones"""
+    engine = data.get('engine', DEFAULT_ENGINE) if isinstance(data, dict) else DEFAULT_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+    return engine
+
+def run_engine(texts, dicts, trace=None):
+    """
+    Convert texts with the TmojiModel and cache the results. Results that arrive after
+    the request gave up still land in the cache for the next one
+    """
+    if trace is not None:
+        attach_trace(trace)  # the request's child trace, see convert_within_budget
+    try:
+        if len(texts) == 1:
+            converted = [TmojiModel.convert_to_emojis(texts[0], dicts)]
+        else:
+            converted = TmojiModel.convert_many_to_emojis(texts, dicts)
+
+        for text, emoji_result in zip(texts, converted):
+            conversion_cache.put(text, dicts.version, emoji_result)
+        return converted
+    finally:
+        if trace is not None:
+            attach_trace(None)
+
+def engine_warming_up():
+    """True until the TmojiModel's first warm-up has finished or failed"""
+    return not TmojiModel.is_ready() and TmojiModel.warm_up_error is None
+
+def convert_within_budget(texts, dicts, budget_seconds):
+    """
+    Run the TmojiModel within the latency budget: (emoji_results, degraded_reason).
+    Over budget, when the engine is overloaded or while the circuit breaker is open
+    the fallback results come back with the reason instead
+    """
+    if budget_seconds <= 0:
+        return run_engine(texts, dicts), None
+
+    if not engine_breaker.allow_request():
+        return [simple_emoji_fallback(text) for text in texts], 'circuit_open'
+
+    # requests that arrive before warm-up has finished are slow because of it, not because
+    # the engine is unhealthy, so they fall back without counting against the breaker
+    warming_up = engine_warming_up()
+
+    # the engine thread records into its own trace, an abandoned one can't race the
+    # request thread finishing the request's trace
+    trace = current_trace()
+    engine_trace = Trace() if trace is not None else None
+    try:
+        future = engine_executor.submit(run_engine, texts, dicts, engine_trace)
+    except ExecutorBusy:
+        if not warming_up:
+            engine_breaker.record_failure()
+        logger.warning(f"⚠️ TmojiModel overloaded, using fallback conversion for {len(texts)} texts")
+        return [simple_emoji_fallback(text) for text in texts], 'overloaded'
+
+    try:
+        converted = future.result(timeout=budget_seconds)
+    except FuturesTimeoutError:
+        if not warming_up:
+            engine_breaker.record_failure()
+        logger.warning(f"⚠️ TmojiModel missed its {budget_seconds * 1000:g}ms budget, using fallback conversion")
+        return [simple_emoji_fallback(text) for text in texts], 'deadline_exceeded'
+    except Exception:
+        engine_breaker.record_failure()
+        raise
+
+    if trace is not None:
+        trace.merge(engine_trace)
+    engine_breaker.record_success()
+    return converted, None
+
+def convert_with_cache(texts, budget_seconds=LATENCY_BUDGET_SECONDS, dicts=None):
+    """
+    Convert texts with the TmojiModel, only running the model for cache misses.
+    Returns (emoji_results, cache_hits, degraded_reason) with results in the same order
+    as texts. degraded_reason is None unless some results came from the fallback
+    """
+    if TmojiModel is None:
+        raise ImportError("TmojiModel is not available")
+
+    # convert with the same dictionaries the cache entries are tagged with. Callers that
+    # report the version pass the dictionaries they read it from
+    dicts = dicts or TmojiModel.get_dictionaries()
+    version = dicts.version
+    results = [conversion_cache.get(text, version) for text in texts]
+    misses = [i for i, result in enumerate(results) if result is None]
+
+    degraded_reason = None
+    if misses:
+        converted, degraded_reason = convert_within_budget([texts[i] for i in misses], dicts, budget_seconds)
+        for i, emoji_result in zip(misses, converted):
+            results[i] = emoji_result
+
+    return results, len(texts) - len(misses), degraded_reason
+
+def get_cache_stats():
+    """
+    Hit/miss/eviction stats of the conversion cache
+    """
+    return jsonify({
+        'success': True,
+        'cache': conversion_cache.stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+def wants_trace(data):
+    """
+    Callers ask for per-stage timings in processing_info with "trace": true
+    """
+    return isinstance(data, dict) and data.get('trace') is True
+
+def get_pipeline_metrics():
+    """
+    Aggregated per-stage latency histograms of traced conversions
+    """
+    return jsonify({
+        'success': True,
+        'sample_rate': SAMPLE_RATE,
+        'stages': histogram_snapshot(),
+        'fast_path': TmojiModel.fast_path_stats() if TmojiModel is not None else None,
+        'circuit_breaker': engine_breaker.stats(),
+        'lm': lm_batcher.stats() if lm_batcher is not None else {'enabled': bool(EMOJI_LM_PATH), 'error': lm_error},
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+def start_emoji_warm_up():
+    """
+    Load and warm the TmojiModel in a background thread so the server can start serving
+    (and answering /health) straight away
+    """
+    start_emoji_lm_loading()
+    if TmojiModel is None:
+        return None
+    TmojiModel.start_dictionary_watcher()
+    return TmojiModel.start_background_warm_up()
+
+def warm_up_emoji_model():
+    """
+    Load and warm the TmojiModel in this thread, used by the production server to load
+    everything once in the gunicorn master before the workers are forked
+    """
+    if TmojiModel is None:
+        logger.warning("⚠️ TmojiModel is not available, skipping warm-up")
+        return False
+    TmojiModel.warm_up()
+    return True
+
+# Reloads change the output for every user, so they need EMOJI_ADMIN_TOKEN as a bearer
+# token, or have to come from this machine when no token is configured
+ADMIN_TOKEN = os.getenv("EMOJI_ADMIN_TOKEN")
+LOCAL_ADDRESSES = frozenset(['127.0.0.1', '::1'])
+
+def admin_request_allowed(remote_addr, authorization):
+    if ADMIN_TOKEN:
+        scheme, _, token = (authorization or '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode())
+    return remote_addr in LOCAL_ADDRESSES
+
+def reload_emoji_dictionaries(remote_addr, authorization):
+    """
+    Reload the emoji dictionaries from their data file without restarting.
+    A broken file is rejected and the current dictionaries stay in place
+    """
+    payload, status = build_reload_payload(remote_addr, authorization)
+    return jsonify(payload), status
+
+def build_reload_payload(remote_addr, authorization):
+    """
+    Reload the dictionaries and build the response body: (payload, status)
+    """
+    if not admin_request_allowed(remote_addr, authorization):
+        logger.warning(f"⚠️ Dictionary reload refused for {remote_addr}")
+        return {'error': 'Not allowed to reload the dictionaries', 'success': False}, 403
+    if TmojiModel is None:
+        return {'error': 'TmojiModel is not available', 'success': False}, 503
+
+    previous_version = TmojiModel.get_dictionaries().version
+    try:
+        dicts = TmojiModel.reload_dictionaries()
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ Emoji dictionaries not reloaded: {e}")
+        return {
+            'error': f'Invalid dictionaries file: {str(e)}',
+            'success': False,
+            'version': previous_version
+        }, 400
+
+    logger.info(f"📚 Emoji dictionaries reloaded: {previous_version} -> {dicts.version}")
+    return {
+        'success': True,
+        'previous_version': previous_version,
+        'version': dicts.version,
+        'entries': {
+            'comprehension': len(dicts.comprehension),
+            'phrases': len(dicts.phrases),
+            'contractions': len(dicts.contractions)
+        },
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+def get_emoji_readiness():
+    """
+    Readiness of the emoji engine: (is_ready, details)
+    """
+    if TmojiModel is None:
+        return False, {'status': 'unavailable', 'error': 'TmojiModel could not be imported'}
+    if TmojiModel.synonym_source() is None:
+        # the model would warm up, but every conversion would degrade
+        return False, {'status': 'missing_data', 'error': TmojiModel.MISSING_SYNONYM_DATA}
+    if TmojiModel.is_ready():
+        return True, {'status': 'ready'}
+    if TmojiModel.warm_up_error:
+        return False, {'status': 'failed', 'error': TmojiModel.warm_up_error}
+    return False, {'status': 'warming_up'}
+
 def convert_text_to_emoji(data):
     """
     Convert text to emoji representation using the TmojiModel
     """
+    payload, status = build_emoji_payload(data)
+    return jsonify(payload), status
+
+def build_emoji_payload(data):
+    """
+    Convert text to emoji and build the response body: (payload, status).
+    Doesn't touch Flask so it can also run in the async server's executor
+    """
     try:
-        logger.info(f"🔄 Starting emoji conversion process")
-        
         # Validate input data
         if not data or not isinstance(data, dict):
             logger.error("❌ Invalid data format - expected dictionary")
-            return jsonify({
+            return {
                 'error': 'Invalid data format - expected JSON object',
                 'success': False,
                 'received_type': type(data).__name__
-            }), 400
+            }, 400
         
         if 'text' not in data:
             logger.error("❌ Missing 'text' field")
-            return jsonify({
+            return {
                 'error': 'Text field is required in request body',
                 'success': False,
                 'received_fields': list(data.keys())
-            }), 400
+            }, 400
         
         input_text = data['text']
         
         # Validate text content
         if not input_text or not isinstance(input_text, str):
             logger.error(f"❌ Invalid text content: {type(input_text)}")
-            return jsonify({
+            return {
                 'error': 'Text must be a non-empty string',
                 'success': False,
                 'received_type': type(input_text).__name__
-            }), 400
+            }, 400
             
         if not input_text.strip():
             logger.error("❌ Empty text after stripping")
-            return jsonify({
+            return {
                 'error': 'Text cannot be empty or only whitespace',
                 'success': False
-            }), 400
+            }, 400
         
-        logger.info(f"📝 Processing text: '{input_text}'")
+        try:
+            engine = requested_engine(data)
+        except ValueError as e:
+            return {'error': str(e), 'success': False}, 400
+
+        logger.debug("📝 Processing text: '%s'", input_text)
         
-        # Import and use the TmojiModel
+        # Use the TmojiModel, or the emoji LM when asked for
+        trace = start_trace(force=wants_trace(data))
+        cache_hit = False
+        engine_used = 'fallback'
         try:
-            from models.TmojiModel import convert_to_emojis
-            logger.info("✅ TmojiModel imported successfully")
-            
             # Convert text to emojis
-            emoji_result = convert_to_emojis(input_text.strip())
-            logger.info(f"✅ Conversion successful: '{emoji_result}'")
+            [emoji_result], cache_hits, degraded_reason, engine_used = convert_with_engine([input_text.strip()], engine)
+            cache_hit = cache_hits == 1
+            logger.debug("✅ Conversion successful: '%s'", emoji_result)
             
         except ImportError as e:
             logger.error(f"❌ Failed to import TmojiModel: {e}")
             # Fallback emoji conversion
             emoji_result = simple_emoji_fallback(input_text)
+            degraded_reason = 'engine_unavailable'
             logger.warning(f"⚠️ Using fallback conversion: '{emoji_result}'")
             
         except Exception as e:
             logger.error(f"❌ Error in TmojiModel conversion: {e}")
             # Fallback emoji conversion
             emoji_result = simple_emoji_fallback(input_text)
+            degraded_reason = 'engine_error'
             logger.warning(f"⚠️ Using fallback conversion: '{emoji_result}'")
         
         # Return successful response
@@ -113,65 +587,247 @@ def convert_text_to_emoji(data):
             'original_text': input_text,
             'emoji_text': emoji_result,
             'success': True,
+            'degraded': degraded_reason is not None,
             'timestamp': datetime.now().isoformat(),
             'processing_info': {
                 'input_length': len(input_text),
                 'output_length': len(emoji_result),
-                'word_count': len(input_text.split())
+                'word_count': len(input_text.split()),
+                'cache_hit': cache_hit,
+                'engine': engine_used,
+                'degraded_reason': degraded_reason
             }
         }
+        timings = finish_trace(trace)
+        if timings is not None and wants_trace(data):
+            response_data['processing_info']['stage_timings_ms'] = timings
         
-        logger.info(f"📤 Returning successful response")
-        return jsonify(response_data), 200
+        return response_data, 200
         
     except Exception as e:
         logger.error(f"❌ Unexpected error in convert_text_to_emoji: {str(e)}")
+        return {
+            'error': f'Processing failed: {str(e)}',
+            'success': False,
+            'timestamp': datetime.now().isoformat()
+        }, 500
+
+# GET /api/convert-emoji responses may be reused by browsers and proxies for this long,
+# revalidating with the ETag afterwards costs a 304 and no conversion
+HTTP_MAX_AGE_SECONDS = int(os.getenv("EMOJI_HTTP_MAX_AGE", "300"))
+# the text travels in the URL, so keep it to what proxies reliably accept
+MAX_GET_TEXT_LENGTH = int(os.getenv("EMOJI_MAX_GET_TEXT_LENGTH", "1000"))
+
+def conversion_etag(text, dictionary_version):
+    """
+    ETag of a GET conversion: the same text and dictionaries always convert the same way
+    """
+    digest = hashlib.blake2b(f"{dictionary_version}\0{text}".encode('utf-8'), digest_size=16)
+    return digest.hexdigest()
+
+def build_cacheable_emoji_payload(text):
+    """
+    Convert text for the cacheable GET route: (payload, status, etag).
+    The payload has no timestamp or timings so it is the same every time, and etag is
+    None when the response must not be cached (bad input or a degraded result)
+    """
+    if not text or not text.strip():
+        return {'error': "Missing 'text' query parameter", 'success': False}, 400, None
+    if len(text) > MAX_GET_TEXT_LENGTH:
+        return {
+            'error': f'Text too long for GET - at most {MAX_GET_TEXT_LENGTH} characters, use POST instead',
+            'success': False
+        }, 400, None
+
+    dictionary_version = None
+    try:
+        # one snapshot for the conversion and its ETag, so a reload in between can't tag
+        # an old result with the new version
+        dicts = TmojiModel.get_dictionaries() if TmojiModel is not None else None
+        dictionary_version = dicts.version if dicts is not None else None
+        [emoji_result], _, degraded_reason = convert_with_cache([text.strip()], dicts=dicts)
+    except Exception as e:
+        logger.error(f"❌ Error in TmojiModel conversion: {e}")
+        emoji_result = simple_emoji_fallback(text)
+        degraded_reason = 'engine_unavailable' if isinstance(e, ImportError) else 'engine_error'
+
+    payload = {
+        'original_text': text,
+        'emoji_text': emoji_result,
+        'success': True,
+        'degraded': degraded_reason is not None,
+        'dictionary_version': dictionary_version
+    }
+    if degraded_reason is not None:
+        payload['degraded_reason'] = degraded_reason
+        return payload, 200, None
+    return payload, 200, conversion_etag(text, dictionary_version)
+
+def convert_text_to_emoji_cacheable(text):
+    """
+    GET conversion with HTTP caching: an ETag from the text and dictionary version,
+    304 Not Modified when the client already has it, and Cache-Control for proxies
+    """
+    # answer revalidations before converting anything
+    if TmojiModel is not None and text and request.if_none_match:
+        etag = conversion_etag(text, TmojiModel.get_dictionaries().version)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.cache_control.public = True
+            response.cache_control.max_age = HTTP_MAX_AGE_SECONDS
+            return response
+
+    payload, status, etag = build_cacheable_emoji_payload(text)
+    response = jsonify(payload)
+    response.status_code = status
+    if etag is None:
+        response.cache_control.no_store = True
+    else:
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = HTTP_MAX_AGE_SECONDS
+    return response
+
+# Largest batch accepted by /api/convert-emoji/batch
+MAX_BATCH_SIZE = int(os.getenv("EMOJI_MAX_BATCH_SIZE", "256"))
+
+def convert_texts_to_emoji(data):
+    """
+    Convert a batch of texts to emoji in one pass through the TmojiModel.
+    Results keep the order of the input texts, and invalid items get their own error
+    instead of failing the whole batch
+    """
+    try:
+        # Validate input data
+        if not data or not isinstance(data, dict) or not isinstance(data.get('texts'), list):
+            logger.error("❌ Invalid batch format - expected 'texts' list")
+            return jsonify({
+                'error': "Request body must be a JSON object with a 'texts' list",
+                'success': False
+            }), 400
+
+        texts = data['texts']
+        if len(texts) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': f'Batch too large - at most {MAX_BATCH_SIZE} texts per request',
+                'success': False,
+                'received_count': len(texts)
+            }), 400
+
+        try:
+            engine = requested_engine(data)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+
+        results = [None] * len(texts)
+        valid_indexes = []
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or not text.strip():
+                results[i] = {
+                    'index': i,
+                    'original_text': text,
+                    'error': 'Text must be a non-empty string',
+                    'success': False
+                }
+            else:
+                valid_indexes.append(i)
+
+        logger.debug("📝 Processing batch of %d texts", len(valid_indexes))
+        valid_texts = [texts[i].strip() for i in valid_indexes]
+        trace = start_trace(force=wants_trace(data))
+
+        # Convert all valid texts together, falling back per item if the model fails
+        cache_hits = 0
+        engine_used = 'fallback'
+        try:
+            emoji_results, cache_hits, degraded_reason, engine_used = convert_with_engine(
+                valid_texts, engine, BATCH_LATENCY_BUDGET_SECONDS, LM_BATCH_LATENCY_BUDGET_SECONDS
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Error in TmojiModel batch conversion: {e}")
+            emoji_results = [simple_emoji_fallback(text) for text in valid_texts]
+            degraded_reason = 'engine_unavailable' if isinstance(e, ImportError) else 'engine_error'
+            logger.warning(f"⚠️ Using fallback conversion for {len(valid_texts)} texts")
+
+        for i, emoji_result in zip(valid_indexes, emoji_results):
+            results[i] = {
+                'index': i,
+                'original_text': texts[i],
+                'emoji_text': emoji_result,
+                'success': True
+            }
+
+        processing_info = {
+            'total': len(texts),
+            'succeeded': len(valid_indexes),
+            'failed': len(texts) - len(valid_indexes),
+            'cache_hits': cache_hits,
+            'engine': engine_used,
+            'degraded_reason': degraded_reason
+        }
+        timings = finish_trace(trace)
+        if timings is not None and wants_trace(data):
+            processing_info['stage_timings_ms'] = timings
+
+        return jsonify({
+            'results': results,
+            'success': True,
+            'degraded': degraded_reason is not None,
+            'timestamp': datetime.now().isoformat(),
+            'processing_info': processing_info
+        }), 200
+
+    except Exception as e:
+        logger.error(f"❌ Unexpected error in convert_texts_to_emoji: {str(e)}")
         return jsonify({
             'error': f'Processing failed: {str(e)}',
             'success': False,
             'timestamp': datetime.now().isoformat()
         }), 500
 
+# Basic emoji mappings for common words, used by simple_emoji_fallback
+SIMPLE_EMOJI_MAPPINGS = {
+    # Greetings
+    'hello': '👋', 'hi': '👋', 'hey': '👋', 'goodbye': '👋',
+    
+    # Basic needs
+    'help': '🆘', 'water': '💧', 'food': '🍽️', 'eat': '🍽️', 'drink': '🥤',
+    'bathroom': '🚻', 'toilet': '🚽', 'sleep': '😴', 'tired': '😴',
+    
+    # Medical
+    'pain': '😣', 'hurt': '🤕', 'medicine': '💊', 'doctor': '👨‍⚕️', 'nurse': '👩‍⚕️',
+    'hospital': '🏥', 'sick': '🤒',
+    
+    # Emotions
+    'happy': '😊', 'sad': '😢', 'angry': '😠', 'love': '❤️', 'scared': '😨',
+    'worried': '😟', 'good': '👍', 'bad': '👎',
+    
+    # Questions and responses
+    'yes': '✅', 'no': '❌', 'please': '🙏', 'thank': '🙏', 'sorry': '😔',
+    
+    # Time
+    'morning': '🌅', 'afternoon': '☀️', 'evening': '🌇', 'night': '🌙',
+    'today': '📅', 'tomorrow': '📅',
+    
+    # Family
+    'family': '👪', 'mom': '👩', 'dad': '👨', 'son': '👦', 'daughter': '👧',
+    
+    # Actions
+    'go': '➡️', 'come': '⬅️', 'sit': '🪑', 'stand': '🧍', 'walk': '🚶',
+    'call': '📞', 'visit': '👋',
+    
+    # Questions
+    'what': '❓', 'how': '❓', 'where': '❓', 'when': '❓', 'who': '❓', 'why': '❓'
+}
+
 def simple_emoji_fallback(text):
     """
-    Simple fallback emoji conversion for when TmojiModel fails
+    Simple fallback emoji conversion for when TmojiModel fails or is too slow,
+    a dictionary lookup per word so it always answers fast
     """
-    logger.info("🔄 Using simple emoji fallback")
-    
-    # Basic emoji mappings for common words
-    simple_mappings = {
-        # Greetings
-        'hello': '👋', 'hi': '👋', 'hey': '👋', 'goodbye': '👋',
-        
-        # Basic needs
-        'help': '🆘', 'water': '💧', 'food': '🍽️', 'eat': '🍽️', 'drink': '🥤',
-        'bathroom': '🚻', 'toilet': '🚽', 'sleep': '😴', 'tired': '😴',
-        
-        # Medical
-        'pain': '😣', 'hurt': '🤕', 'medicine': '💊', 'doctor': '👨‍⚕️', 'nurse': '👩‍⚕️',
-        'hospital': '🏥', 'sick': '🤒',
-        
-        # Emotions
-        'happy': '😊', 'sad': '😢', 'angry': '😠', 'love': '❤️', 'scared': '😨',
-        'worried': '😟', 'good': '👍', 'bad': '👎',
-        
-        # Questions and responses
-        'yes': '✅', 'no': '❌', 'please': '🙏', 'thank': '🙏', 'sorry': '😔',
-        
-        # Time
-        'morning': '🌅', 'afternoon': '☀️', 'evening': '🌇', 'night': '🌙',
-        'today': '📅', 'tomorrow': '📅',
-        
-        # Family
-        'family': '👪', 'mom': '👩', 'dad': '👨', 'son': '👦', 'daughter': '👧',
-        
-        # Actions
-        'go': '➡️', 'come': '⬅️', 'sit': '🪑', 'stand': '🧍', 'walk': '🚶',
-        'call': '📞', 'visit': '👋',
-        
-        # Questions
-        'what': '❓', 'how': '❓', 'where': '❓', 'when': '❓', 'who': '❓', 'why': '❓'
-    }
+    logger.debug("🔄 Using simple emoji fallback")
     
     # Convert text to lowercase and split into words
     words = text.lower().split()
@@ -182,14 +838,14 @@ def simple_emoji_fallback(text):
         clean_word = ''.join(char for char in word if char.isalpha())
         
         # Look for emoji mapping
-        if clean_word in simple_mappings:
-            emoji_words.append(simple_mappings[clean_word])
+        if clean_word in SIMPLE_EMOJI_MAPPINGS:
+            emoji_words.append(SIMPLE_EMOJI_MAPPINGS[clean_word])
         else:
             # Keep original word if no mapping found
             emoji_words.append(word)
     
     result = ' '.join(emoji_words)
-    logger.info(f"🔄 Fallback conversion complete: '{result}'")
+    logger.debug("🔄 Fallback conversion complete: '%s'", result)
     return result
 
 # For testing the controller standalone
@@ -0,0 +1,242 @@
+# python_server/controllers/streamController.py
+# Incremental text -> emoji conversion for live speech transcripts.
+#
+# Every session keeps the transcript it has already converted, split into segments:
+# sentences, with long ones cut every EMOJI_STREAM_SEGMENT_WORDS words. When a new
+# interim transcript arrives only the segments from the first changed one onwards are
+# converted again, so the cost of an update depends on the size of the change and not
+# on how long the conversation (or an unpunctuated sentence) has been going.
+# Deltas are returned to the caller and also pushed to Server-Sent Events subscribers.
+
+from flask import Response, jsonify, stream_with_context
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from controllers.emojiController import TmojiModel, simple_emoji_fallback
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = float(os.getenv("EMOJI_STREAM_SESSION_TTL", "600"))
+MAX_SESSIONS = int(os.getenv("EMOJI_STREAM_MAX_SESSIONS", "1000"))
+HEARTBEAT_SECONDS = float(os.getenv("EMOJI_STREAM_HEARTBEAT", "15"))
+# longest piece of a sentence converted at once; a phrase split over a cut isn't matched
+MAX_SEGMENT_WORDS = int(os.getenv("EMOJI_STREAM_SEGMENT_WORDS", "12"))
+
+# a sentence is everything up to and including its closing punctuation
+SENTENCE_PATTERN = re.compile(r'[^.?!]+[.?!]+|[^.?!]+$')
+
+class StreamSession:
+    """
+    Conversion state of one live transcript
+    """
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.segment_texts = []   # segment texts already converted
+        self.emoji_segments = []  # emoji output, one per segment
+        self.revision = 0
+        self.closed = False
+        self.last_seen = time.monotonic()
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def update(self, transcript):
+        """
+        Convert the changed tail of transcript and return the delta
+        """
+        texts = split_segments(transcript)
+
+        # first segment that differs from what was already converted
+        start = 0
+        common = min(len(texts), len(self.segment_texts))
+        while start < common and texts[start] == self.segment_texts[start]:
+            start += 1
+
+        changed = texts[start:]
+        segments = convert_segments(changed) if changed else []
+
+        unchanged_tail = start == len(self.segment_texts) and not changed
+        self.segment_texts = texts
+        self.emoji_segments = self.emoji_segments[:start] + segments
+        self.last_seen = time.monotonic()
+
+        if unchanged_tail:
+            return None
+
+        self.revision += 1
+        return {
+            'session_id': self.session_id,
+            'revision': self.revision,
+            'from_segment': start,
+            'segments': segments,
+            'total_segments': len(self.emoji_segments)
+        }
+
+    def publish(self, event, payload):
+        for subscriber in list(self.subscribers):
+            subscriber.put((event, payload))
+
+def split_segments(transcript, max_words=MAX_SEGMENT_WORDS):
+    """
+    Sentences of transcript, each cut every max_words words. The cuts are counted from the
+    start of the sentence, so while an interim sentence grows without punctuation only its
+    last piece changes, and closing it later leaves the earlier pieces as they were
+    """
+    segments = []
+    for sentence in SENTENCE_PATTERN.findall(transcript):
+        words = sentence.split()
+        segments.extend(' '.join(words[i:i + max_words]) for i in range(0, len(words), max_words))
+    return segments
+
+def convert_segments(sentences):
+    """
+    Convert sentences in one batch, falling back per sentence if the model fails.
+    Interim sentences are mostly one-offs, so this skips the shared result cache
+    """
+    try:
+        if TmojiModel is None:
+            raise ImportError("TmojiModel is not available")
+        if len(sentences) == 1:
+            return [TmojiModel.convert_to_emojis(sentences[0])]
+        return TmojiModel.convert_many_to_emojis(sentences)
+    except Exception as e:
+        logger.error(f"❌ Error in TmojiModel stream conversion: {e}")
+        return [simple_emoji_fallback(sentence) for sentence in sentences]
+
+# --- Session Store ---
+sessions = {}
+sessions_lock = threading.Lock()
+
+def get_session(session_id, create=False):
+    with sessions_lock:
+        expire_sessions()
+
+        session = sessions.get(session_id)
+        if session is None and create:
+            if len(sessions) >= MAX_SESSIONS:
+                # drop the least recently used session to make room
+                oldest = min(sessions.values(), key=lambda s: s.last_seen)
+                close_session(oldest)
+            session = sessions[session_id] = StreamSession(session_id)
+        return session
+
+def expire_sessions():
+    """Close sessions that have been idle longer than the TTL, call with sessions_lock held"""
+    now = time.monotonic()
+    for session in list(sessions.values()):
+        if now - session.last_seen > SESSION_TTL_SECONDS and not session.subscribers:
+            close_session(session)
+
+def close_session(session):
+    """Remove a session and end its event streams, call with sessions_lock held"""
+    sessions.pop(session.session_id, None)
+    session.closed = True
+    session.publish('end', {'session_id': session.session_id, 'revision': session.revision})
+
+# --- Business Functions ---
+def update_stream(data):
+    """
+    Feed the latest transcript of a live session and get back the emoji delta
+    """
+    try:
+        if not data or not isinstance(data, dict) or not isinstance(data.get('text'), str):
+            return jsonify({
+                'error': "Request body must be a JSON object with a 'text' string",
+                'success': False
+            }), 400
+
+        session_id = data.get('session_id') or uuid.uuid4().hex
+        if not isinstance(session_id, str):
+            return jsonify({'error': 'session_id must be a string', 'success': False}), 400
+
+        session = get_session(session_id, create=True)
+        with session.lock:
+            delta = session.update(data['text'])
+            if delta is not None:
+                session.publish('delta', delta)
+
+        if data.get('final'):
+            with sessions_lock:
+                close_session(session)
+
+        return jsonify({
+            'session_id': session_id,
+            'success': True,
+            'changed': delta is not None,
+            'delta': delta,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+
+    except Exception as e:
+        logger.error(f"❌ Unexpected error in update_stream: {str(e)}")
+        return jsonify({
+            'error': f'Processing failed: {str(e)}',
+            'success': False,
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+def stream_events(session_id):
+    """
+    Server-Sent Events stream of the deltas of a session. Starts with a snapshot of
+    everything converted so far, then one 'delta' event per update. Sessions are
+    only created by update_stream, subscribing to an unknown one is a 404
+    """
+    session = get_session(session_id)
+    if session is None:
+        return jsonify({'error': f"Unknown session '{session_id}'", 'success': False}), 404
+    subscriber = queue.Queue()
+
+    with session.lock:
+        snapshot = {
+            'session_id': session_id,
+            'revision': session.revision,
+            'from_segment': 0,
+            'segments': list(session.emoji_segments),
+            'total_segments': len(session.emoji_segments)
+        }
+        session.subscribers.append(subscriber)
+
+    def generate():
+        try:
+            yield format_event('snapshot', snapshot)
+            while True:
+                try:
+                    event, payload = subscriber.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+
+                yield format_event(event, payload)
+                if event == 'end':
+                    return
+        finally:
+            with session.lock:
+                if subscriber in session.subscribers:
+                    session.subscribers.remove(subscriber)
+            session.last_seen = time.monotonic()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # stop reverse proxies from buffering the stream
+    })
+
+def end_stream(session_id):
+    """
+    Close a session and its event streams
+    """
+    with sessions_lock:
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({'error': f"Unknown session '{session_id}'", 'success': False}), 404
+        close_session(session)
+
+    return jsonify({'session_id': session_id, 'success': True}), 200
+
+def format_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
@@ -0,0 +1,94 @@
+# python_server/gunicorn.conf.py
+# Production server: a pre-forked pool of workers that share one copy of the models.
+#
+# run from python_server/:
+#   gunicorn -c gunicorn.conf.py
+#   WEB_CONCURRENCY=4 gunicorn -c gunicorn.conf.py       # 4 worker processes
+#   kill -HUP <master pid>                                # reload dictionaries, replace workers
+#
+# preload_app imports wsgi.py (and so loads spaCy, the dictionaries and the synonym
+# index) once in the master, then forks the workers. Each worker is its own process, so
+# CPU-bound conversions run on every core instead of queueing behind one GIL.
+#
+# Every worker keeps its own conversion cache and live transcript sessions. A live
+# transcript's POSTs and its event stream can land on different workers, so run the
+# streaming endpoints behind sticky sessions or with a single worker.
+#
+# Patient item catalogs are not per worker: they are written to CATALOG_STORE_DIR
+# (data/catalogs) and every worker replays the changes the others made before it
+# answers, so they also survive restarts and recycled workers. All workers must see the
+# same directory, ie. a local disk on a single host or a volume they share.
+#
+# The optional emoji LM (EMOJI_LM_PATH) is not loaded in the workers either: the master
+# starts one shared LM server process (python -m models.emojiLM) and every worker submits
+# to it over a Unix socket, so the node holds one copy of the model and the workers'
+# concurrent requests share its batches. Set EMOJI_LM_SOCKET to use a server run separately.
+
+import gc
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# a few threads per worker keep long-lived event streams from blocking conversions
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# recycle workers now and then so a slow leak can't grow forever (0 disables)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # kept on the arbiter, which outlives SIGHUP reloads of this file
+    from controllers.emojiController import start_emoji_lm_server
+    server.emoji_lm_server = start_emoji_lm_server()
+
+
+def when_ready(server):
+    server.log.info("🚀 Models preloaded, forking %s workers", workers)
+
+
+def post_fork(server, worker):
+    # threads don't survive fork, so each worker runs its own dictionary watcher
+    from models import TmojiModel
+    TmojiModel.start_dictionary_watcher()
+
+    # and loads the word vectors in the background, so the master isn't held up before
+    # forking; the matching routes answer 503 until they are ready
+    from controllers.classificationController import start_word_vectors_loading
+    start_word_vectors_loading()
+
+    # and connects to the node's shared emoji LM server, once it has loaded the model
+    from controllers.emojiController import use_shared_emoji_lm, start_emoji_lm_loading
+    use_shared_emoji_lm(server.emoji_lm_server[1])
+    start_emoji_lm_loading()
+
+
+def on_reload(server):
+    # Runs in the master on SIGHUP before the new workers are forked. The app itself is
+    # preloaded and not re-imported, so reload the dictionaries here for the new workers
+    # to inherit. Code changes still need a full restart
+    from models import TmojiModel
+    try:
+        TmojiModel.reload_dictionaries()
+    except (OSError, ValueError) as e:
+        server.log.error("Emoji dictionaries not reloaded, keeping the current ones: %s", e)
+
+    gc.collect()
+    gc.freeze()
+
+
+def on_exit(server):
+    from controllers.emojiController import stop_emoji_lm_server
+    stop_emoji_lm_server(*server.emoji_lm_server)
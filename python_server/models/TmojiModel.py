@@ -1,317 +1,430 @@
 import nltk
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import wordnet
+from nltk.corpus.reader.wordnet import NOUN, VERB, ADJ, ADV
 import re
+import os
+import json
+import hashlib
+import time
+import functools
+import threading
 import spacy
+from types import MappingProxyType
 
+from models.pipelineTracer import stage
 
-nlp = spacy.load("en_core_web_sm")
 
-# Ensure that the necessary NLTK resources are downloaded
-nltk.download('wordnet')
-nltk.download('omw-1.4')
+# spaCy pipeline profiles (components to exclude), picked with TMOJI_SPACY_PROFILE.
+# preprocess_text only reads lemma_, pos_, is_alpha and is_punct, which come from the
+# tagger, attribute_ruler and lemmatizer, so the default "emoji" profile drops the
+# parser and NER
+SPACY_PROFILES = {
+  "full": [],
+  "emoji": ["parser", "ner"],
+}
+SPACY_PROFILE = os.getenv("TMOJI_SPACY_PROFILE", "emoji")
+SPACY_MODEL = os.getenv("TMOJI_SPACY_MODEL", "en_core_web_sm")
+SPACY_BATCH_SIZE = int(os.getenv("TMOJI_SPACY_BATCH_SIZE", "64"))
+
+def load_spacy_pipeline(profile=SPACY_PROFILE):
+  if profile not in SPACY_PROFILES:
+    raise ValueError(f"Unknown spaCy profile '{profile}', expected one of {list(SPACY_PROFILES)}")
+  
+  return spacy.load(SPACY_MODEL, exclude=SPACY_PROFILES[profile])
+
+
+# Nothing is downloaded or loaded at import time. The spaCy model is an installed
+# package (or a local path in TMOJI_SPACY_MODEL) and NLTK data is read from the local
+# bundle in data/nltk_data, filled at build time by models/buildSynonymIndex.py
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'nltk_data')
+nltk.data.path.insert(0, NLTK_DATA_DIR)
+
+nlp = None  # set by load_models()
+models_lock = threading.Lock()
 
 # Initialize lemmatizer
 lemmatizer = WordNetLemmatizer()
 
-# Emoji dictionary
-comprehension_dict = {
-  "medicine": "💊", "pill": "💊", "medication": "💊", "take": "👋",
-  "doctor": "👨‍⚕️", "nurse": "👩‍⚕️", "appointment": "📅", "hospital": "🏥", "clinic": "🏥",
-  "therapy": "🧠", "exercise": "🏃", "physical": "🏃", "speech": "🗣️",
-  "blood": "🩸", "pressure": "🩸", "temperature": "🌡️", "heart": "❤️", "pulse": "💓",
-  "xray": "📷", "scan": "📷", "test": "🔬", "results": "📄", "injection": "💉", "shot": "💉",
-  "bandage": "🩹", "cast": "🦴", "crutches": "🩼", "oxygen": "💨", "allergy": "🤧",
-  "dizzy": "💫", "nausea": "🤢", "vomit": "🤮", "itchy": "🦟", "rash": "🔴", "cough": "🤧",
-  "eat": "🍽️", "drink": "🥤", "water": "💧", "food": "🍽️", "meal": "🍽️", "snack": "🍎",
-  "breakfast": "🌅🍽️", "lunch": "☀️🍽️", "dinner": "🌆🍽️", "dessert": "🍰",
-  "shower": "🚿", "bath": "🛁", "wash": "🧼", "brush": "🦷", "teeth": "🦷", "hair": "💇",
-  "sleep": "😴", "nap": "😴", "rest": "😴", "bed": "🛏️", "awake": "👀", "wake": "⏰",
-  "bathroom": "🚽", "toilet": "🚽", "diaper": "👶", "change": "🔄", "clean": "🧹", "dirty": "🧼",
-  "clothes": "👕", "dress": "👗", "shirt": "👕", "pants": "👖", "shoes": "👟", "socks": "🧦",
-  "laundry": "👕🌀", "dishes": "🍽️🧼", "cook": "👩‍🍳", "shop": "🛒", "drive": "🚗", "work": "💼",
-  "go": "➡️", "come": "⬅️", "stay": "⏹️", "sit": "🪑", "stand": "🧍", "walk": "🚶", "run": "🏃",
-  "give": "🤲", "take": "👋", "get": "🫳", "put": "⬇️", "bring": "➡️", "carry": "🏋️",
-  "make": "🛠️", "do": "🔨", "have": "🫴", "use": "🖐️", "need": "🙏", "want": "🤲",
-  "try": "🔧", "find": "🔍", "keep": "📥", "leave": "🚪", "open": "📂", "close": "📁",
-  "start": "⏯️", "stop": "⏹️", "wait": "⏳", "help": "🆘", "show": "👀", "look": "👀",
-  "ask": "🗣️", "tell": "💬", "talk": "💬", "speak": "💬", "listen": "👂", "hear": "👂",
-  "read": "📖", "write": "✍️", "draw": "🎨", "play": "🎮", "watch": "📺", "call": "📞",
-  "feel": "🤲", "hold": "🤝", "touch": "✋", "hug": "🫂", "love": "❤️", "like": "👍",
-  "how": "❓", "what": "❓", "where": "❓", "when": "❓", "who": "❓", "why": "❓", "which": "❓",
-  "feel": "😊", "feeling": "😊", "pain": "😣", "hurt": "😣", "okay": "👍", "wrong": "❌",
-  "need": "🤲", "want": "🤲", "like": "👍", "comfortable": "😌", "ready": "✅",
-  "hungry": "🍽️", "thirsty": "😰", "tired": "😴", "cold": "❄️", "hot": "🔥", "sick": "🤒",
-  "now": "⏰", "today": "📅", "tomorrow": "📅", "yesterday": "📅⬅️", 
-  "morning": "🌅", "afternoon": "☀️", "evening": "🌇", "night": "🌙", 
-  "later": "⏰", "soon": "⏰", "early": "⏰⬆️", "late": "⏰⬇️",
-  "minute": "⏰", "hour": "⏰", "day": "📅", "week": "📅7️⃣", "month": "📅30️⃣", "year": "📅365️⃣",
-  "family": "👪", "visit": "👋", "visitor": "👥", "call": "📞", "phone": "📱", "text": "💬",
-  "mom": "👩", "dad": "👨", "mother": "👩", "father": "👨", "wife": "👩", "husband": "👨",
-  "son": "👦", "daughter": "👧", "child": "👶", "grandchild": "👶", "baby": "👶",
-  "friend": "👫", "neighbor": "🏠👥", "pet": "🐕", "dog": "🐕", "cat": "🐈",
-  "go": "➡️", "come": "⬅️", "stay": "⏹️", "sit": "🪑", "stand": "🧍", "walk": "🚶", "run": "🏃",
-  "room": "🏠", "kitchen": "🍳", "bedroom": "🛏️", "living": "🛋️", "garden": "🌳", "yard": "🌱",
-  "outside": "🌳", "inside": "🏠", "here": "📍", "there": "📍", "up": "⬆️", "down": "⬇️",
-  "home": "🏠", "car": "🚗", "wheelchair": "♿", "stairs": "🪜", "elevator": "🛗",
-  "help": "🆘", "emergency": "🚨", "911": "🚨", "fire": "🔥", "police": "👮", "danger": "⚠️",
-  "safe": "✅", "careful": "⚠️", "stop": "✋", "fall": "⚠️", "hurt": "🤕", "accident": "🚑",
-  "love": "❤️", "care": "❤️", "worry": "😔", "worry": "😟", "scared": "😨", "afraid": "😨",
-  "happy": "😄", "sad": "😢", "angry": "😠", "mad": "😠", "calm": "🧘", "relax": "😌",
-  "better": "📈", "worse": "📉", "same": "➡️", "improve": "📈", "heal": "❤️🩹", "well": "👍",
-  "please": "🙏", "can": "❓", "could": "❓", "would": "❓", "will": "⏩", "shall": "❓",
-  "open": "📂", "close": "📁", "turn": "🔄", "press": "👆", "push": "👆", "pull": "👇",
-  "give": "🤲", "bring": "➡️", "show": "👀", "look": "👀", "listen": "👂", "wait": "⏳",
-  "yes": "✅", "no": "❌", "maybe": "🤷", "ok": "👍", "okay": "👍", "alright": "👍",
-  "sure": "✅", "fine": "👍", "good": "👍", "bad": "👎", "cannot": "❌", "not": "❌",
-  "coffee": "☕", "tea": "🍵", "juice": "🧃", "milk": "🥛", "beer": "🍺", "wine": "🍷",
-  "soda": "🥤", "cup": "☕", "glass": "🥛", "bottle": "🍾", "refresh": "💦", "ice": "🧊",
-  "watermelon": "🍉", "lemon": "🍋", "apple": "🍎", "banana": "🍌", "bread": "🍞", "rice": "🍚",
-  "?": "❓", "!": "❗", "let's": "🤝", "you": "🫵", "your": "🫵", "me": "👈", "my": "👈",
-  "money": "💰", "keys": "🔑", "wallet": "👛", "remote": "📱", "light": "💡", "tv": "📺",
-  "book": "📖", "game": "🎮", "music": "🎵", "party": "🎉", "gift": "🎁", "pray": "🙏",
-  "hello": "👋", "hi": "👋", "hey": "👋", "greetings": "👋",
-  "goodbye": "👋", "bye": "👋", "see you": "👋", "farewell": "👋",
-  "good morning": "🌅👋", "good afternoon": "☀️👋", "good evening": "🌆👋", "good night": "🌙😴",
-  "welcome": "🫂", "nice to meet you": "😊🤝", "howdy": "🤠👋",
-  "please": "🙏", "thank you": "🙏❤️", "thanks": "🙏", "you're welcome": "😊👍",
-  "excuse me": "🗣️", "pardon": "😅", "sorry": "😔", "my bad": "😅",
-  "bless you": "🤧🙏", "take care": "❤️⚠️", "have a good day": "😊📅",
-  "time": "⏰", "to": "➡️", 
-}
+# --- Phrase Matcher ---
+# phrase dictionary compiled once into a token-level trie, so matching is a single
+# left-to-right pass instead of sliding every phrase over the sentence
+PHRASE_END = None  # marker key for "a phrase ends at this node"
 
-phrase_dict = {
-  "how be you": "❓🫵",
-  "what be": "❓",
-  "where be": "❓📍",
-  "when be": "❓⏰",
-  "who be": "❓👤",
-  "why be": "❓",
-  "do not": "❌",
-  "be not": "❌",
-  "will not": "❌⏩",
-  "can not": "❌",
-  "need to": "🙏",
-  "want to": "🙏",
-  "have to": "📋", 
-  "go to": "➡️",
-  "it be": "👉",
-  
-  "take medicine": "🗣️💊",
-  "feel pain": "😣💢", 
-  "call doctor": "📞👨‍⚕️",
-  "go hospital": "➡️🏥",
-  
-  "use bathroom": "🚽🧻",
-  "drink water": "💧🥤",
-  "eat food": "🍽️", 
-  "get dress": "👕👖",
-  "take shower": "🚿🧼",
-  "brush tooth": "🪥🦷",
-  
-  "love you": "❤️🫵",
-  "miss you": "😢💭🫵",
-  "see you": "👀👋", 
-  "call family": "📞👪",
-  "visit today": "👋📅🏠",
-
-  "right now": "⏰❗",
-  "later today": "⏰➡️📅",
-  "every day": "📅🔄",
-  "once a": "1️⃣📅",
-  "twice a": "2️⃣📅",
-
-  "call 911": "📞🚨👮",
-  "need help": "🙏🆘", 
-  "feel sick": "🤒🤢",
-  "cannot breathe": "❌🫁😫",
-  "hurt bad": "😣💢❗",
-
-  "feel good": "😊👍",
-  "feel bad": "😢👎",
-  "be okay": "👍✅",
-  "be safe": "✅🛡️",
-  "feel better": "😊📈❤️",
-  "do not": "❌",
-  "can not": "❌",
-  "do you": "❓🫵",
-  "are you": "❓🫵",
-  "can you": "❓🫵",
-  "will you": "❓🫵",
-}
+def compile_phrase_trie(phrases):
+  trie = {}
+  for phrase, emoji in phrases.items():
+    node = trie
+    for word in phrase.split():
+      node = node.setdefault(word, {})
+    node[PHRASE_END] = emoji
+    
+  return trie
 
-contractions_dict = {
-  # Specific irregular cases FIRST
-  "won't": "will not",
-  "can't": "cannot",
-  "shan't": "shall not",
-  "ain't": "am not",
-  "ma'am": "madam",
-  "o'clock": "of the clock",
-  "y'all": "you all",
-  
-  # Informal contractions
-  "gonna": "going to",
-  "wanna": "want to", 
-  "gotta": "got to",
-  "hafta": "have to",
-  "kinda": "kind of",
-  "sorta": "sort of",
-  "lotta": "lot of",
-  "outta": "out of",
-  "coulda": "could have",
-  "shoulda": "should have",
-  "woulda": "would have",
-  "mighta": "might have",
-  "musta": "must have",
+
+# Function to find every longest non-overlapping phrase in a list of words
+# returns (start, end, emoji) tuples, leftmost match first
+def match_phrases(words_list, trie):
+  matches = []
+  i = 0
+  while i < len(words_list):
+    node = trie
+    match_end, match_emoji = None, None
+    
+    # walk down the trie as far as the words allow, remembering the longest phrase
+    j = i
+    while j < len(words_list) and words_list[j] in node:
+      node = node[words_list[j]]
+      j += 1
+      if PHRASE_END in node:
+        match_end, match_emoji = j, node[PHRASE_END]
+    
+    if match_end is None:
+      i += 1
+    else:
+      matches.append((i, match_end, match_emoji))
+      i = match_end
+      
+  return matches
+
+
+# --- Synonym Index ---
+# WordNet lookups precomputed offline into {pos: {lemma: dictionary key}}, so synonym
+# replacement is a dict lookup instead of a WordNet corpus read per token.
+# Build (or rebuild after changing the comprehension dictionary) with: python models/buildSynonymIndex.py
+SYNONYM_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'synonym_index.json')
+SYNONYM_ANY_POS = '*'  # index section for tokens without a WordNet POS
+
+def comprehension_fingerprint(comprehension):
+  keys = "\n".join(sorted(comprehension))
+  return hashlib.sha256(keys.encode('utf-8')).hexdigest()[:16]
+
+
+def load_synonym_index(comprehension, path=SYNONYM_INDEX_PATH):
+  if not os.path.exists(path):
+    print(f"Synonym index not found at {path}, falling back to live WordNet lookups")
+    return None
   
-  # Negative contractions (specific verbs first)
-  "haven't": "have not",
-  "hasn't": "has not",
-  "hadn't": "had not",
-  "wasn't": "was not",
-  "weren't": "were not",
-  "isn't": "is not",
-  "aren't": "are not",
-  "doesn't": "does not",
-  "didn't": "did not",
-  "don't": "do not",
-  "wouldn't": "would not",
-  "shouldn't": "should not",
-  "couldn't": "could not",
-  "mightn't": "might not",
-  "mustn't": "must not",
-  "needn't": "need not",
-  "daren't": "dare not",
-  "usedn't": "used not",
+  with open(path, encoding='utf-8') as f:
+    data = json.load(f)
   
-  # Perfect tense contractions
-  "should've": "should have",
-  "could've": "could have", 
-  "would've": "would have",
-  "might've": "might have",
-  "must've": "must have",
-  "ought've": "ought have",
+  # keys removed from the dictionary are filtered at lookup time, but new keys
+  # won't be reached through synonyms until the index is rebuilt
+  if data.get("dictionary_fingerprint") != comprehension_fingerprint(comprehension):
+    print(f"Synonym index at {path} is out of date, rebuild it with models/buildSynonymIndex.py")
+    
+  return data["index"]
+
+
+def synonym_source(dicts=None):
+  """
+  Where synonyms come from: 'index', 'wordnet' (live lookups in the local bundle) or
+  None when neither was built, in which case every WordNet lookup raises LookupError
+  """
+  dicts = dicts or dictionaries
+  if dicts.synonym_index is not None:
+    return 'index'
+  try:
+    nltk.data.find('corpora/wordnet')  # also finds corpora/wordnet.zip
+    return 'wordnet'
+  except LookupError:
+    return None
+
+
+# --- Emoji Dictionaries ---
+# The comprehension, phrase and contraction dictionaries live in a versioned data file
+# (data/emoji_dictionaries.json) and are compiled at load time into a frozen
+# EmojiDictionaries: read-only mappings plus the phrase trie, contraction tables and
+# synonym index built from them. Reloading compiles a new object and swaps the module
+# reference in one assignment; every conversion works on the object it started with,
+# so in-flight requests finish on the old version and spaCy is never touched
+DICTIONARIES_PATH = os.getenv(
+  "TMOJI_DICTIONARIES_PATH",
+  os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'emoji_dictionaries.json')
+)
+DICTIONARIES_POLL_SECONDS = float(os.getenv("TMOJI_DICTIONARIES_POLL_SECONDS", "10"))
+
+# fix_contractions splits the text into words once and looks each word up in the
+# contraction table, instead of one str.replace per entry. Because lookups are per
+# whole word, the general suffix rules ("n't", "'s", ...) only apply at the end of a
+# word and the result doesn't depend on dictionary order
+word_split_pattern = re.compile(r"([\w']+)")
+
+class EmojiDictionaries:
+  def __init__(self, comprehension, phrases, contractions, declared_version=None,
+               source=None, synonym_index=None):
+    self.comprehension = MappingProxyType(dict(comprehension))
+    self.phrases = MappingProxyType(dict(phrases))
+    self.contractions = MappingProxyType(dict(contractions))
+    self.source = source
+    self.mtime = os.path.getmtime(source) if source and os.path.exists(source) else None
+    
+    # Content hash, result caches are keyed on it so they drop their entries
+    # whenever the dictionaries change
+    content = json.dumps([comprehension, phrases, contractions], sort_keys=True)
+    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+    self.version = f"{declared_version}-{content_hash}" if declared_version is not None else content_hash
+    
+    self.phrase_trie = compile_phrase_trie(self.phrases)
+    self.contraction_suffixes = tuple(sorted(
+      (c for c in self.contractions if c.startswith("'") or c == "n't"), key=len, reverse=True
+    ))
+    self.contraction_words = MappingProxyType(
+      {c: e for c, e in self.contractions.items() if c not in self.contraction_suffixes}
+    )
+    self.synonym_index = synonym_index
+    
+    # memoized per instance, so a reload starts with empty memos
+    self.expand_contraction = functools.lru_cache(maxsize=4096)(self._expand_contraction)
+    self.lookup_wordnet_synonym = functools.lru_cache(maxsize=8192)(self._lookup_wordnet_synonym)
+    
+  def _expand_contraction(self, word):
+    expansion = self.contraction_words.get(word)
+    if expansion is not None:
+      return expansion
+    
+    if "'" in word:
+      for suffix in self.contraction_suffixes:
+        stem = word[:-len(suffix)]
+        if word.endswith(suffix) and stem and not stem.endswith("'"):
+          # stem can hold another contraction, eg "i'd've" -> "i'd" + "'ve"
+          return self.expand_contraction(stem) + self.contractions[suffix]
+          
+    return word
   
-  # Specific pronoun + verb contractions
-  "that's": "that is",
-  "there's": "there is",
-  "here's": "here is",
-  "what's": "what is",
-  "where's": "where is",
-  "when's": "when is",
-  "how's": "how is",
-  "who's": "who is",
-  "why's": "why is",
-  "it's": "it is",
-  "he's": "he is",
-  "she's": "she is",
-  "we're": "we are",
-  "they're": "they are",
-  "you're": "you are",
-  "let's": "let us",
+  # Walk WordNet for the first lemma that is in the comprehension dictionary.
+  # Only used to build the synonym index, or as a memoized fallback when it hasn't been built
+  def _lookup_wordnet_synonym(self, word, pos_tag=None):
+    synonyms = wordnet.synsets(word, pos=pos_tag)
+    for syn in synonyms:
+      for lemma in syn.lemma_names():
+        lemma_clean = lemma.replace('_', ' ').lower()
+        if lemma_clean in self.comprehension:
+          return lemma_clean
+    
+    return word # fallback to original if no match
+
+
+def read_dictionaries_file(path):
+  def reject_duplicates(pairs):
+    seen = {}
+    for key, value in pairs:
+      if key in seen:
+        raise ValueError(f"Duplicate key '{key}' in {path}")
+      seen[key] = value
+    return seen
   
-  # Perfect tense (have)
-  "you've": "you have",
-  "we've": "we have", 
-  "they've": "they have",
-  "i've": "i have",
+  with open(path, encoding='utf-8') as f:
+    data = json.load(f, object_pairs_hook=reject_duplicates)
   
-  # Future tense (will)
-  "you'll": "you will",
-  "we'll": "we will",
-  "they'll": "they will", 
-  "i'll": "i will",
-  "he'll": "he will",
-  "she'll": "she will",
-  "it'll": "it will",
-  "that'll": "that will",
-  "there'll": "there will",
+  for section in ("comprehension", "phrases", "contractions"):
+    if not isinstance(data.get(section), dict):
+      raise ValueError(f"'{section}' section missing from {path}")
+      
+  return data
+
+
+def load_dictionaries(path=DICTIONARIES_PATH):
+  data = read_dictionaries_file(path)
+  return EmojiDictionaries(
+    data["comprehension"], data["phrases"], data["contractions"],
+    declared_version=data.get("version"),
+    source=path,
+    synonym_index=load_synonym_index(data["comprehension"])
+  )
+
+
+dictionaries = load_dictionaries()
+dictionaries_lock = threading.Lock()
+
+def get_dictionaries():
+  return dictionaries
+
+
+# Function to hot-swap the dictionaries from the data file.
+# A broken file raises and leaves the current dictionaries in place
+def reload_dictionaries(path=None):
+  global dictionaries
+  with dictionaries_lock:
+    new_dictionaries = load_dictionaries(path or dictionaries.source or DICTIONARIES_PATH)
+    old_version = dictionaries.version
+    dictionaries = new_dictionaries  # single reference swap
+    
+  print(f"Emoji dictionaries reloaded: {old_version} -> {new_dictionaries.version}")
+  if nlp is not None:
+    update_fast_path(new_dictionaries)  # analyse words the new dictionaries added
+  return new_dictionaries
+
+
+# Function to reload the dictionaries if the data file changed on disk
+def reload_dictionaries_if_changed():
+  current = dictionaries
+  if not current.source or not os.path.exists(current.source):
+    return False
+  if os.path.getmtime(current.source) == current.mtime:
+    return False
   
-  # Conditional (would)
-  "you'd": "you would",
-  "we'd": "we would",
-  "they'd": "they would",
-  "i'd": "i would", 
-  "he'd": "he would",
-  "she'd": "she would",
-  "it'd": "it would",
-  "that'd": "that would",
-  "there'd": "there would",
+  try:
+    reload_dictionaries(current.source)
+    return True
+  except (OSError, ValueError) as e:
+    print(f"Emoji dictionaries not reloaded, keeping {current.version}: {e}")
+    return False
+
+
+dictionary_watcher_thread = None
+
+def start_dictionary_watcher(interval=DICTIONARIES_POLL_SECONDS):
+  global dictionary_watcher_thread
+  if interval <= 0:
+    return None
   
-  # First person singular
-  "i'm": "i am",
+  def watch():
+    while True:
+      time.sleep(interval)
+      reload_dictionaries_if_changed()
   
-  # General patterns LAST (to avoid conflicts)
-  "n't": " not",
-  "'re": " are", 
-  "'ve": " have",
-  "'ll": " will",
-  "'d": " would",
-  "'m": " am",
-  "'s": " is",
-}
+  with dictionaries_lock:
+    if dictionary_watcher_thread is None:
+      dictionary_watcher_thread = threading.Thread(target=watch, name="tmoji-dictionary-watcher", daemon=True)
+      dictionary_watcher_thread.start()
+      
+  return dictionary_watcher_thread
+
+
+# --- Model Loading & Warm-up ---
+# load_models() loads the spaCy pipeline once. warm_up() also runs a synthetic
+# conversion so the first real request doesn't pay for lazy initialisation; servers
+# start it in the background at boot and report readiness through is_ready()
+WARM_UP_TEXT = "Hi, do you want to drink some water? I don't feel good, please call the doctor!"
+
+warm_up_done = threading.Event()
+warm_up_error = None
+warm_up_thread = None
+
+MISSING_SYNONYM_DATA = (
+  f"Neither {os.path.normpath(SYNONYM_INDEX_PATH)} nor WordNet in {os.path.normpath(NLTK_DATA_DIR)} exists, "
+  "build them with: python models/buildSynonymIndex.py"
+)
+
+def load_models():
+  global nlp
+  with models_lock:
+    if nlp is None:
+      nlp = load_spacy_pipeline()
+      
+  return nlp
+
+
+def get_nlp():
+  return nlp if nlp is not None else load_models()
+
+
+def warm_up():
+  global warm_up_error
+  try:
+    if synonym_source() is None:
+      # said once at boot instead of a LookupError swallowed on every request
+      print(f"⚠️ {MISSING_SYNONYM_DATA}")
+    load_models()
+    update_fast_path()
+    convert_to_emojis(WARM_UP_TEXT)
+    preprocess_texts([WARM_UP_TEXT, WARM_UP_TEXT])
+    warm_up_done.set()
+  except Exception as e:
+    warm_up_error = str(e)
+    raise
+
+
+def start_background_warm_up():
+  global warm_up_thread
+  with models_lock:
+    if warm_up_thread is None:
+      warm_up_thread = threading.Thread(target=warm_up, name="tmoji-warm-up", daemon=True)
+      warm_up_thread.start()
+      
+  return warm_up_thread
+
+
+def is_ready():
+  return warm_up_done.is_set()
+
 
 # --- Helper Functions ---
 # Function to convert contractions into non contraction text
-def fix_contractions(text):  
-  for contraction, expansion in contractions_dict.items():
-    text = text.replace(contraction, expansion)
+def fix_contractions(text, dicts=None):  
+  dicts = dicts or dictionaries
+  parts = word_split_pattern.split(text)  # words land on the odd indexes
+  parts[1::2] = map(dicts.expand_contraction, parts[1::2])
     
-  return text
+  return "".join(parts)
+
 
+# Words kept as-is even though WordNet would map them to something in the dictionary
+important_words = frozenset(['need', 'do', 'be', 'have', 'go', 'get', 'want'])
 
 # Function to get the best synonym for a word based on the comprehension dictionary
-def get_best_synonym(word, pos_tag=None):
-  if word in comprehension_dict:
+def get_best_synonym(word, pos_tag=None, dicts=None):
+  dicts = dicts or dictionaries
+  if word in dicts.comprehension:
     return word
   
-  important_words = ['need', 'do', 'be', 'have', 'go', 'get', 'want']
   if word in important_words:
     return word
   
-  synonyms = wordnet.synsets(word, pos=pos_tag)
-  for syn in synonyms:
-    for lemma in syn.lemma_names():
-      lemma_clean = lemma.replace('_', ' ').lower()
-      if lemma_clean in comprehension_dict:
-        return lemma_clean
+  # precomputed (lemma, pos) -> dictionary key index, see models/buildSynonymIndex.py
+  if dicts.synonym_index is not None:
+    synonym = dicts.synonym_index.get(pos_tag or SYNONYM_ANY_POS, {}).get(word)
+    return synonym if synonym in dicts.comprehension else word
   
-  return word # fallback to original if no match
+  return dicts.lookup_wordnet_synonym(word, pos_tag)
 
-# Function to preprocess text
-def preprocess_text(argText):
-  # Lower and fix contractions
-  text = argText.lower() 
-  text = fix_contractions(text)
-  # print(f"After contractions: {text}")        # TO REMOVE
-  
-  # Clean and Lemmatize
-  text = re.sub(r'[^\w\s\?\!]', '', text)  # remove punctuation
-  doc = nlp(text)
-  
+
+# spaCy POS -> WordNet POS for synonym lookups
+# (constants from the corpus reader module, touching wordnet.NOUN would load the corpus)
+wordnet_pos_map = {'NOUN': NOUN, 'VERB': VERB, 'ADJ': ADJ, 'ADV': ADV}
+
+# Function to lower, expand contractions and strip punctuation before spaCy
+def clean_text(argText, dicts=None):
+  with stage("contractions"):
+    # Lower and fix contractions
+    text = argText.lower() 
+    text = fix_contractions(text, dicts)
+    # print(f"After contractions: {text}")        # TO REMOVE
+    
+    return re.sub(r'[^\w\s\?\!]', '', text)  # remove punctuation
+
+
+# Function to lemmatize and replace synonyms in a parsed doc.
+# synonym_cache lets a batch of docs share synonym lookups
+def process_doc(doc, synonym_cache=None, dicts=None):
   lemmatized_words = []
   pos_tags = []
   
-  for token in doc:
-    if not token.is_punct and token.is_alpha:
-      lemmatized_words.append(token.lemma_.lower())
-      pos_tags.append(token.pos_)
-    elif token.text in ['?', '!']:
-      lemmatized_words.append(token.text)
-      pos_tags.append('PUNCT')
+  with stage("spacy_parse"):  # token attributes are computed lazily by spaCy
+    for token in doc:
+      if not token.is_punct and token.is_alpha:
+        lemmatized_words.append(token.lemma_.lower())
+        pos_tags.append(token.pos_)
+      elif token.text in ['?', '!']:
+        lemmatized_words.append(token.text)
+        pos_tags.append('PUNCT')
 
   # Synonym replacement
   replaced_words = []
-  for i, word in enumerate(lemmatized_words):
-    if word in ['?', '!']:
-      replaced_words.append(word)
-    else:
-      pos_map = {'NOUN': wordnet.NOUN, 'VERB': wordnet.VERB, 
-                'ADJ': wordnet.ADJ, 'ADV': wordnet.ADV}
-      wordnet_pos = pos_map.get(pos_tags[i], None)
-      synonym = get_best_synonym(word, wordnet_pos)
-      replaced_words.append(synonym)
+  with stage("synonym_lookup"):
+    for i, word in enumerate(lemmatized_words):
+      if word in ['?', '!']:
+        replaced_words.append(word)
+      else:
+        wordnet_pos = wordnet_pos_map.get(pos_tags[i], None)
+        if synonym_cache is None:
+          synonym = get_best_synonym(word, wordnet_pos, dicts)
+        else:
+          synonym = synonym_cache.get((word, wordnet_pos))
+          if synonym is None:
+            synonym = synonym_cache[(word, wordnet_pos)] = get_best_synonym(word, wordnet_pos, dicts)
+        replaced_words.append(synonym)
     
   processed_text = " ".join(replaced_words)
   # print(f"After processing: {processed_text}")
@@ -320,51 +433,312 @@ def preprocess_text(argText):
     "processed_text": processed_text,
     "replaced_words": replaced_words
   }
+
+
+# --- Fast Path ---
+# Short utterances are mostly dictionary words, simple inflections of them and stop
+# words. At warm-up every such surface form is run through spaCy in a few sentence
+# templates and its (lemma, POS) analyses are stored. An utterance whose words all have
+# analyses that lead to the same final word is processed from the table without
+# calling spaCy; anything unknown or ambiguous falls through to nlp().
+# TMOJI_FAST_PATH picks the mode:
+#   verify (default) after every table build the fast path is run against spaCy on the
+#                    utterances of data/fast_path_check.txt and the emoji dataset, and only
+#                    used if it matched spaCy on all of them
+#   1                use the table without checking it
+#   0                never build or use the table
+# benchmarks/fastPathEquivalence.py runs the same comparison over the benchmark corpus.
+FAST_PATH_MODE = os.getenv("TMOJI_FAST_PATH", "verify")
+FAST_PATH_ENABLED = FAST_PATH_MODE != "0"
+FAST_PATH_CHECK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'fast_path_check.txt')
+EMOJI_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'emoji_dataset.jsonl')
+
+# sentence templates a word is analysed in, {} is replaced by the word
+FAST_PATH_TEMPLATES = (
+  "{}",
+  "i {}",
+  "the {}",
+  "i want to {} it",
+  "it is {}",
+  "my {} is here",
+  "can you {} please",
+)
+
+# a whitespace separated piece of cleaned text: a word and/or trailing ? and !, which
+# spaCy always splits into one token each
+fast_piece_pattern = re.compile(r'([a-z]*)([?!]*)')
+
+fast_path_analyses = {}  # surface form -> tuple of (lemma, spaCy POS) seen in the templates
+fast_path_active = FAST_PATH_MODE == "1"  # in verify mode, set once the table passed its check
+fast_path_seen = set()   # surface forms already analysed, including rejected ones
+fast_path_lock = threading.Lock()
+fast_path_counts = {"hits": 0, "misses": 0}
+fast_path_counts_lock = threading.Lock()
+
+# Function to list a word and the regular inflections it might appear as
+# (spelling rules only, forms spaCy doesn't lemmatize back to the word are dropped later)
+def inflection_candidates(word):
+  forms = {word + suffix for suffix in ("s", "es", "ed", "d", "ing", "er", "est", "ly")}
+  if word.endswith("e"):
+    forms.add(word[:-1] + "ing")
+  if len(word) > 2 and word.endswith("y") and word[-2] not in "aeiou":
+    forms.update(word[:-1] + suffix for suffix in ("ies", "ied", "ier", "iest"))
+  if len(word) > 2 and word[-1] not in "aeiouwxy" and word[-2] in "aeiou" and word[-3] not in "aeiou":
+    forms.update(word + word[-1] + suffix for suffix in ("ed", "ing", "er"))
+    
+  return forms
+
+
+# Function to list the surface forms worth analysing for a set of dictionaries
+def fast_path_candidates(dicts):
+  from spacy.lang.en.stop_words import STOP_WORDS
+  
+  base_words = set(dicts.comprehension) | set(important_words)
+  for phrase in dicts.phrases:
+    base_words.update(phrase.split())
+  base_words = {word for word in base_words if word.isalpha() and word.isascii()}
+  
+  inflected = set()
+  for word in base_words:
+    inflected.update(inflection_candidates(word))
+  stop_words = {word for word in STOP_WORDS if word.isalpha() and word.isascii()}
   
+  return base_words | stop_words, inflected - base_words - stop_words
 
-# --- Main Function ---
-def convert_to_emojis(text):
-  #  Preprocess the text
-  processed_data = preprocess_text(text)
-  processed_text = processed_data["processed_text"]
-  words_list = processed_text.split()    
+
+# Function to analyse surface forms in every template, returns {form: analyses}.
+# Forms spaCy splits into several tokens or doesn't keep as a word are left out
+def analyse_surface_forms(nlp, forms, templates):
+  analyses = {form: set() for form in forms}
+  rejected = set()
   
+  for template in templates:
+    position = template.split().index("{}")
+    texts = [template.format(form) for form in forms]
+    for form, doc in zip(forms, nlp.pipe(texts, batch_size=256)):
+      token = doc[position] if len(doc) == len(template.split()) else None
+      if token is None or token.text != form or token.is_punct or not token.is_alpha:
+        rejected.add(form)
+      else:
+        analyses[form].add((token.lemma_.lower(), token.pos_))
+        
+  return {form: tuple(sorted(found)) for form, found in analyses.items() if form not in rejected}
+
+
+# Function to add the surface forms of a set of dictionaries to the fast path table.
+# Only forms not analysed before are run through spaCy, so a reload only pays for new words
+def update_fast_path(dicts=None, nlp_pipeline=None):
+  global fast_path_analyses, fast_path_active
+  if not FAST_PATH_ENABLED:
+    return 0
+  
+  dicts = dicts or dictionaries
+  nlp_pipeline = nlp_pipeline or get_nlp()
+  with fast_path_lock:
+    base_words, inflected = fast_path_candidates(dicts)
+    base_words -= fast_path_seen
+    candidates = sorted(inflected - fast_path_seen)
+    
+    # inflections only count when spaCy lemmatizes them back to a dictionary word
+    # (cheap single template first, so nonsense forms skip the other templates)
+    bare = analyse_surface_forms(nlp_pipeline, candidates, FAST_PATH_TEMPLATES[:1])
+    known_lemmas = base_words | set(dicts.comprehension)
+    inflected = [form for form, found in bare.items() if any(lemma in known_lemmas for lemma, _ in found)]
+    
+    new_analyses = analyse_surface_forms(nlp_pipeline, sorted(base_words) + inflected, FAST_PATH_TEMPLATES)
+    fast_path_seen.update(base_words, candidates)
+    if FAST_PATH_MODE == "verify":
+      fast_path_active = False  # the new forms haven't been checked yet
+    fast_path_analyses = {**fast_path_analyses, **new_analyses}  # swap, readers never see a half-built table
+  
+  verify_fast_path(dicts)
+  return len(new_analyses)
+
+
+# Function to list the utterances the fast path is checked on
+def load_fast_path_check_texts(path=FAST_PATH_CHECK_PATH, dataset_path=EMOJI_DATASET_PATH):
+  texts = []
+  if os.path.exists(path):
+    with open(path, encoding='utf-8') as f:
+      texts.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+  if os.path.exists(dataset_path):
+    with open(dataset_path, encoding='utf-8') as f:
+      texts.extend(json.loads(line)['input'] for line in f if line.strip())
+      
+  return texts
+
+
+# Function to run texts through the fast path and spaCy, returns (text, fast, spaCy)
+# processed texts for every text the fast path handles and gets wrong
+def fast_path_mismatches(texts, dicts=None):
+  dicts = dicts or dictionaries
+  hits = []
+  for text in texts:
+    cleaned = clean_text(text, dicts)
+    processed = fast_path_process(cleaned, dicts)
+    if processed is not None:
+      hits.append((text, cleaned, processed))
+      
+  mismatches = []
+  docs = get_nlp().pipe((cleaned for _, cleaned, _ in hits), batch_size=SPACY_BATCH_SIZE)
+  for (text, _, processed), doc in zip(hits, docs):
+    expected = process_doc(doc, dicts=dicts)
+    if processed != expected:
+      mismatches.append((text, processed["processed_text"], expected["processed_text"]))
+      
+  return mismatches
+
+
+# Function to switch the fast path on in verify mode, if it matches spaCy on the check utterances
+def verify_fast_path(dicts=None):
+  global fast_path_active
+  if FAST_PATH_MODE != "verify":
+    return None
+  
+  mismatches = fast_path_mismatches(load_fast_path_check_texts(), dicts)
+  fast_path_active = not mismatches
+  if mismatches:
+    text, fast, expected = mismatches[0]
+    print(f"⚠️ Fast path left off: {len(mismatches)} check utterances differ from spaCy, "
+          f"eg. '{text}' -> '{fast}' instead of '{expected}'")
+  return mismatches
+
+
+# Function to process cleaned text from the table, None if any word needs spaCy
+def fast_path_process(text, dicts):
+  analyses_table = fast_path_analyses
+  replaced_words = []
+  
+  for piece in text.split():
+    match = fast_piece_pattern.fullmatch(piece)
+    if match is None:
+      return None
+    
+    word, marks = match.groups()
+    if word:
+      analyses = analyses_table.get(word)
+      if not analyses:
+        return None
+      
+      synonyms = {get_best_synonym(lemma, wordnet_pos_map.get(pos), dicts) for lemma, pos in analyses}
+      if len(synonyms) != 1:
+        return None  # the word's output depends on its context
+      replaced_words.append(synonyms.pop())
+    replaced_words.extend(marks)
+    
+  return {
+    "processed_text": " ".join(replaced_words),
+    "replaced_words": replaced_words
+  }
+
+
+def count_fast_path(hits, misses):
+  with fast_path_counts_lock:
+    fast_path_counts["hits"] += hits
+    fast_path_counts["misses"] += misses
+
+
+def fast_path_stats():
+  with fast_path_counts_lock:
+    hits, misses = fast_path_counts["hits"], fast_path_counts["misses"]
+    
+  return {
+    "enabled": fast_path_active,
+    "mode": FAST_PATH_MODE,
+    "surface_forms": len(fast_path_analyses),
+    "hits": hits,
+    "misses": misses,
+    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+  }
+
+
+# Function to preprocess text
+def preprocess_text(argText, dicts=None):
+  text = clean_text(argText, dicts)
+  if fast_path_active:
+    with stage("fast_path"):
+      processed = fast_path_process(text, dicts or dictionaries)
+    count_fast_path(processed is not None, processed is None)
+    if processed is not None:
+      return processed
+    
+  with stage("spacy_parse"):
+    doc = get_nlp()(text)
+    
+  return process_doc(doc, dicts=dicts)
+
+
+# Function to preprocess many texts at once, spaCy batches them through nlp.pipe
+# and every text in the batch shares the synonym lookups
+def preprocess_texts(texts, batch_size=SPACY_BATCH_SIZE, dicts=None):
+  cleaned_texts = [clean_text(text, dicts) for text in texts]
+  results = [None] * len(cleaned_texts)
+  use_fast_path = fast_path_active  # one answer for the whole batch, a reload may flip it
+  if use_fast_path:
+    with stage("fast_path"):
+      for i, text in enumerate(cleaned_texts):
+        results[i] = fast_path_process(text, dicts or dictionaries)
+  
+  misses = [i for i, result in enumerate(results) if result is None]
+  if use_fast_path:
+    count_fast_path(len(results) - len(misses), len(misses))
+  
+  if misses:
+    with stage("spacy_parse"):
+      docs = list(get_nlp().pipe((cleaned_texts[i] for i in misses), batch_size=batch_size))
+      
+    synonym_cache = {}
+    for i, doc in zip(misses, docs):
+      results[i] = process_doc(doc, synonym_cache, dicts)
+  return results
+  
+
+# Function to turn a list of processed words into the emoji string
+def emojify_words(words_list, dicts=None):
+  dicts = dicts or dictionaries
   result_array = words_list.copy()  # Same length as original
   used_positions = set()
  
   # phrase first (need find their position and mark them so, it wont get lost)
-  for phrase in sorted(phrase_dict.keys(), key=len, reverse=True):
-    phrase_words = phrase.split()
-    
-    # Find where this phrase starts in the words_list
-    for i in range(len(words_list) - len(phrase_words) + 1):
-      if words_list[i:i+len(phrase_words)] == phrase_words:
-        print(f"Found phrase: {phrase} -> {phrase_dict[phrase]} at position {i}")
-        # Replace the first word with the phrase emoji
-        result_array[i] = phrase_dict[phrase]
-        
-        # Mark all positions in this phrase as used
-        for j in range(i, i + len(phrase_words)):
-          used_positions.add(j)
-          
-        # Remove the other words in the phrase (set to None)
-        for j in range(i + 1, i + len(phrase_words)):
-          result_array[j] = None
-        break
-            
+  with stage("phrase_match"):
+    for start, end, emoji in match_phrases(words_list, dicts.phrase_trie):
+      # Replace the first word with the phrase emoji
+      result_array[start] = emoji
+      
+      # Mark all positions in this phrase as used
+      used_positions.update(range(start, end))
+      
+      # Remove the other words in the phrase (set to None)
+      for j in range(start + 1, end):
+        result_array[j] = None
   
   # Individual words (fill remaining positions with individual word emojis)
-  for i, word in enumerate(words_list):
-    if i not in used_positions:  # Position not used by a phrase
-      if word in comprehension_dict:
-        result_array[i] = comprehension_dict[word]
-        print(f"Found word: {word} -> {comprehension_dict[word]} at position {i}")
-      else:
-        result_array[i] = word
-        # print(f"No emoji for: {word} -> keeping as '{word}' at position {i}")
+  with stage("word_match"):
+    for i, word in enumerate(words_list):
+      if i not in used_positions:  # Position not used by a phrase
+        result_array[i] = dicts.comprehension.get(word, word)  # keep the word if there's no emoji
   
   final_result = [item for item in result_array if item is not None]
   # result = " ".join(emoji_sequence)
   # print(f'Final result: {result}')
   return " ".join(final_result)
 
+
+# --- Main Function ---
+def convert_to_emojis(text, dicts=None):
+  dicts = dicts or dictionaries  # one dictionary version for the whole conversion
+  
+  #  Preprocess the text
+  processed_data = preprocess_text(text, dicts)
+  processed_text = processed_data["processed_text"]
+  
+  return emojify_words(processed_text.split(), dicts)
+
+
+# Batch version of convert_to_emojis, results are in the same order as texts
+def convert_many_to_emojis(texts, dicts=None):
+  dicts = dicts or dictionaries
+  return [
+    emojify_words(processed_data["processed_text"].split(), dicts)
+    for processed_data in preprocess_texts(texts, dicts=dicts)
+  ]
@@ -0,0 +1,34 @@
+# python_server/models/boundedExecutor.py
+# Executor wrapper that turns work away instead of queueing it without limit
+
+import threading
+
+
+class ExecutorBusy(Exception):
+    pass
+
+
+class BoundedExecutor:
+    """
+    Executor that refuses new work once max_pending calls are queued or running.
+    A slot is only given back when the call really finishes, so calls that timed out
+    but are still running keep counting against the limit
+    """
+    def __init__(self, executor, max_pending):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise ExecutorBusy()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
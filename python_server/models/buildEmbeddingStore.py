@@ -0,0 +1,123 @@
+# python_server/models/buildEmbeddingStore.py
+# One-time conversion of word vectors into the memory-mapped store the category matcher
+# loads (see models/embeddingStore.py), so the server never parses a vector file or needs
+# the network at startup.
+#
+# run from python_server/:
+#   python models/buildEmbeddingStore.py                                   # GloVe 50d via gensim, full vocabulary
+#   python models/buildEmbeddingStore.py --top 50000                       # 50k most frequent words + app vocabulary
+#   python models/buildEmbeddingStore.py --app-vocab-only                  # only words the app can look up
+#   python models/buildEmbeddingStore.py --source vectors.bin --binary --name googlenews-300
+#   python models/buildEmbeddingStore.py --precision int8                  # writes glove-wiki-gigaword-50-int8
+#   python models/buildEmbeddingStore.py --gensim-model glove-wiki-gigaword-100   # writes glove-wiki-gigaword-100
+#
+# The store is named after its source (the gensim model, or the --source file name
+# without its extension) plus the precision, so building from another source never
+# overwrites the default store. Point the server at another store with WORD_VECTORS_STORE_NAME.
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from models.embeddingStore import DEFAULT_STORE_DIR, DEFAULT_STORE_NAME, PRECISIONS, write_store
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+def load_source(args):
+    """Source vectors as a gensim KeyedVectors, in the file's (frequency) order"""
+    from gensim.models import KeyedVectors
+
+    if args.source:
+        return KeyedVectors.load_word2vec_format(
+            args.source, binary=args.binary, no_header=args.no_header, limit=args.limit
+        )
+
+    import gensim.downloader
+    return gensim.downloader.load(args.gensim_model)
+
+
+def default_store_name(args):
+    """The source's name, with a suffix for any precision but float32"""
+    if args.source:
+        name = os.path.basename(args.source)
+        if name.endswith('.gz'):
+            name = name[:-3]
+        name = os.path.splitext(name)[0]
+    else:
+        name = args.gensim_model
+    return name if args.precision == 'float32' else f'{name}-{args.precision}'
+
+
+def app_vocabulary():
+    """Every lowercased word the app itself can look up: taxonomy items and dataset texts"""
+    from controllers.classificationController import CATEGORY_TAXONOMY
+
+    words = set()
+    for subcats in CATEGORY_TAXONOMY.values():
+        for items in subcats.values():
+            for item in items:
+                words.update(item.lower().split())
+
+    with open(os.path.join(DATA_DIR, 'emoji_dataset.jsonl'), encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                words.update(json.loads(line)['input'].lower().split())
+
+    return words
+
+
+def select_words(model, args):
+    """Words to keep, in the source order"""
+    if args.top is None and not args.app_vocab_only and not args.extra_vocab:
+        return list(model.index_to_key)
+
+    keep = set(app_vocabulary())
+    if args.extra_vocab:
+        with open(args.extra_vocab, encoding='utf-8') as f:
+            keep.update(line.strip().lower() for line in f if line.strip())
+    if args.top is not None and not args.app_vocab_only:
+        keep.update(model.index_to_key[:args.top])
+
+    return [word for word in model.index_to_key if word in keep]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert word vectors into a memory-mapped embedding store')
+    parser.add_argument('--gensim-model', default=DEFAULT_STORE_NAME, help='gensim downloader model to convert')
+    parser.add_argument('--source', help='word2vec/GloVe file to convert instead of a gensim model')
+    parser.add_argument('--binary', action='store_true', help='--source is in binary word2vec format')
+    parser.add_argument('--no-header', action='store_true', help='--source is a GloVe text file without a header line')
+    parser.add_argument('--limit', type=int, help='only read the first LIMIT vectors of --source')
+    parser.add_argument('--top', type=int, help='keep the TOP most frequent words plus the app vocabulary')
+    parser.add_argument('--app-vocab-only', action='store_true', help='keep only the app vocabulary')
+    parser.add_argument('--extra-vocab', help='file with extra words to keep (one per line), e.g. logged phrases')
+    parser.add_argument('--output-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--name', help='store name (file prefix), default the gensim model or --source file '
+                                       'name plus any precision suffix')
+    parser.add_argument('--precision', choices=PRECISIONS, default='float32',
+                        help='float16 halves the store, int8 (with a scale per vector) quarters it')
+    args = parser.parse_args()
+
+    if args.name is None:
+        args.name = default_store_name(args)
+
+    model = load_source(args)
+    words = select_words(model, args)
+    vectors = np.stack([model[word] for word in words]).astype(np.float32)
+
+    paths = write_store(words, vectors, args.output_dir, args.name, meta={
+        'built_at': datetime.now().isoformat(),
+        'source': args.source or f'gensim:{args.gensim_model}',
+        'source_words': len(model.index_to_key),
+        'pruned': len(words) < len(model.index_to_key),
+    }, precision=args.precision)
+
+    size_mb = sum(os.path.getsize(path) for path in paths.values()) / (1024 * 1024)
+    print(f"Wrote {len(words)} of {len(model.index_to_key)} words ({size_mb:.1f} MB) to {paths['vectors']}")
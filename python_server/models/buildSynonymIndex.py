@@ -0,0 +1,82 @@
+# python_server/models/buildSynonymIndex.py
+# Precomputes the (lemma, POS) -> comprehension dictionary key index used by get_best_synonym,
+# so the server never has to read the WordNet corpus while handling a request.
+# WordNet itself is downloaded into the local bundle (data/nltk_data) the server reads from.
+# Both are build outputs and gitignored, rebuild them after changing the dictionaries.
+# run from python_server/: python models/buildSynonymIndex.py [output_path]
+#
+# Live lookups run WordNet's morphy on the word first, so "geese" finds goose's synsets.
+# The index is keyed on WordNet's base lemma names plus the irregular forms from its
+# exception lists ("geese", "mice", "ran"). Regular inflections ("apples") are only keyed
+# by their base lemma. The server looks words up by spaCy's lemma, so they are found,
+# except when spaCy leaves an inflected token as it is: live lookups would still reduce
+# it with morphy's suffix rules, the index misses it and keeps the word.
+
+import os
+import sys
+import json
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import nltk
+from nltk.corpus import wordnet
+from models.TmojiModel import (
+    comprehension_fingerprint, get_dictionaries, NLTK_DATA_DIR, SYNONYM_ANY_POS, SYNONYM_INDEX_PATH
+)
+
+# Same POS values preprocess_text passes to get_best_synonym
+POS_SECTIONS = {
+    wordnet.NOUN: wordnet.NOUN,
+    wordnet.VERB: wordnet.VERB,
+    wordnet.ADJ: wordnet.ADJ,
+    wordnet.ADV: wordnet.ADV,
+    SYNONYM_ANY_POS: None,
+}
+
+
+def irregular_forms():
+    """Inflected forms morphy maps through WordNet's exception lists, e.g. geese -> goose"""
+    # the reader keeps them per POS once the corpus is loaded, which all_lemma_names() did
+    return {form for forms in wordnet._exception_map.values() for form in forms if '_' not in form}
+
+
+def build_synonym_index(dicts):
+    # spaCy tokens never contain spaces, so multi-word lemmas can't be looked up.
+    # Every section walks the full lemma list since synsets() also matches
+    # adjective satellites and other POS variants of a name
+    lemmas = {name for name in wordnet.all_lemma_names() if '_' not in name}
+    lemmas.update(irregular_forms())
+
+    index = {}
+    for section, pos_tag in POS_SECTIONS.items():
+        hits = {}
+        for lemma in sorted(lemmas):
+            if lemma in dicts.comprehension:
+                continue  # get_best_synonym returns dictionary words before the index
+            synonym = dicts.lookup_wordnet_synonym(lemma, pos_tag)
+            if synonym != lemma:
+                hits[lemma] = synonym
+
+        index[section] = hits
+        print(f"{section}: {len(hits)} lemmas map to a dictionary word")
+
+    return index
+
+
+if __name__ == '__main__':
+    output_path = sys.argv[1] if len(sys.argv) > 1 else SYNONYM_INDEX_PATH
+
+    nltk.download('wordnet', download_dir=NLTK_DATA_DIR)
+    nltk.download('omw-1.4', download_dir=NLTK_DATA_DIR)
+
+    dicts = get_dictionaries()
+    index = build_synonym_index(dicts)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'built_at': datetime.now().isoformat(),
+            'dictionary_fingerprint': comprehension_fingerprint(dicts.comprehension),
+            'index': index
+        }, f, ensure_ascii=False, separators=(',', ':'))
+
+    print(f"Synonym index written to {output_path}")
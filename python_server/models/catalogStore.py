@@ -0,0 +1,127 @@
+# python_server/models/catalogStore.py
+# Durable, process-shared store of the patient catalogs the ItemIndexes are built from.
+#
+# Every patient's catalog is an append-only log of operations in its own file:
+#   {"op": "add", "id": "42", "label": "apple juice"}   add an item or relabel it
+#   {"op": "remove", "id": "42"}
+# A full sync writes a new file and swaps it in with os.replace, so readers see the old
+# catalog or the new one and never half of it. Every such snapshot starts with a
+#   {"op": "snapshot", "generation": "<uuid>"}
+# line (inodes are reused, so they can't tell two snapshots apart). Each worker process
+# remembers which generation it has read and up to which byte, and only replays what was
+# appended since:
+# a change made through one worker reaches every other one on its next request, and the
+# catalogs survive restarts. Writers serialise on a lock file next to the log.
+
+import os
+import json
+import fcntl
+import uuid
+from contextlib import contextmanager
+from urllib.parse import quote
+
+
+class CatalogNotLoaded(Exception):
+    """The patient's catalog was never synced (or was dropped), it needs a full sync"""
+    pass
+
+
+class CatalogStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, patient_id):
+        # patient ids come from URLs, quoting keeps every id a plain file name
+        return os.path.join(self.directory, quote(str(patient_id), safe='') + '.jsonl')
+
+    def exists(self, patient_id):
+        return os.path.exists(self.path(patient_id))
+
+    def replace(self, patient_id, items):
+        """Replace the whole catalog with (id, label) pairs"""
+        with self._locked(patient_id):
+            self._write_snapshot(patient_id, items)
+
+    def append(self, patient_id, operations):
+        """Append operations to a catalog, raises CatalogNotLoaded if it was never synced"""
+        lines = ''.join(json.dumps(operation, ensure_ascii=False) + '\n' for operation in operations)
+        with self._locked(patient_id):
+            if not self.exists(patient_id):
+                raise CatalogNotLoaded(patient_id)
+            with open(self.path(patient_id), 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+    def read(self, patient_id, position=None):
+        """
+        Operations after position, which is the (generation, offset) a previous read
+        returned. Returns (operations, position, reset): reset is True when the file was
+        replaced since, and the operations then start from the beginning of the new
+        catalog. Raises CatalogNotLoaded if there is no catalog
+        """
+        try:
+            f = open(self.path(patient_id), 'rb')
+        except FileNotFoundError:
+            raise CatalogNotLoaded(patient_id)
+
+        with f:
+            # the header is written together with the snapshot, so it is always complete
+            generation = json.loads(f.readline())['generation']
+            reset = position is None or position[0] != generation
+            offset = f.tell() if reset else position[1]
+            f.seek(offset)
+            data = f.read()
+
+        # a line still being appended is left for the next read
+        complete = data[:data.rfind(b'\n') + 1]
+        operations = [json.loads(line) for line in complete.splitlines() if line.strip()]
+        return operations, (generation, offset + len(complete)), reset
+
+    def compact(self, patient_id):
+        """Rewrite a catalog as one 'add' per current item, returns the item count"""
+        with self._locked(patient_id):
+            operations, _, _ = self.read(patient_id)
+            items = fold_operations(operations)
+            self._write_snapshot(patient_id, items.items())
+            return len(items)
+
+    def drop(self, patient_id):
+        with self._locked(patient_id):
+            try:
+                os.remove(self.path(patient_id))
+                return True
+            except FileNotFoundError:
+                return False
+
+    # helpers
+    def _write_snapshot(self, patient_id, items):
+        # call with the lock held
+        path = self.path(patient_id)
+        partial = f"{path}.{os.getpid()}.partial"
+        with open(partial, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'op': 'snapshot', 'generation': uuid.uuid4().hex}) + '\n')
+            for item_id, label in items:
+                f.write(json.dumps({'op': 'add', 'id': item_id, 'label': label}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+
+    @contextmanager
+    def _locked(self, patient_id):
+        with open(self.path(patient_id) + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def fold_operations(operations, items=None):
+    """Apply operations to an {id: label} dict (a new one if items is None) and return it"""
+    items = {} if items is None else items
+    for operation in operations:
+        if operation['op'] == 'add':
+            items[operation['id']] = operation['label']
+        elif operation['op'] == 'remove':
+            items.pop(operation['id'], None)
+    return items
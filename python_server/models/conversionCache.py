@@ -0,0 +1,124 @@
+# python_server/models/conversionCache.py
+# Bounded result cache for text -> emoji conversions, shared by the single and batch routes
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+EVICTION_POLICIES = ('lru', 'fifo')
+
+
+class ConversionCache:
+    """
+    Thread-safe result cache keyed on normalized input text.
+
+    Bounded by entry count and by an approximate memory budget, with an optional TTL.
+    Every entry belongs to a dictionary version: when the caller passes a different
+    version the whole cache is dropped, so results never outlive the dictionaries
+    that produced them
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=16 * 1024 * 1024, ttl_seconds=3600, eviction='lru'):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction}', expected one of {EVICTION_POLICIES}")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.eviction = eviction
+
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize(text):
+        """Conversion lowercases and splits on whitespace, so these spellings share a result"""
+        return ' '.join(text.lower().split())
+
+    def get(self, text, version):
+        key = self.normalize(text)
+        with self._lock:
+            self._check_version(version)
+
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if self.eviction == 'lru':
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, text, version, value):
+        key = self.normalize(text)
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return  # would evict everything else, not worth caching
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if version != self._version:
+                return  # computed with dictionaries that have since been replaced
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'approx_bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'eviction': self.eviction,
+                'dictionary_version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    # helpers, call with the lock held
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
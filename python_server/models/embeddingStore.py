@@ -0,0 +1,136 @@
+# python_server/models/embeddingStore.py
+# Read-only word vector store backed by a memory-mapped .npy matrix and a marisa-trie
+# vocabulary, written once by models/buildEmbeddingStore.py.
+#
+# Opening a store maps the files instead of parsing them, so it takes milliseconds and
+# the vector pages live in the OS page cache, shared by every worker process that maps
+# the same file. Only the pages of words that are actually looked up are ever read.
+#
+# A store can be written in reduced precision: float16, or int8 with one float32 scale per
+# vector (row ~= codes * scale), at a half or a quarter of the float32 size. Lookups
+# return float32 vectors either way.
+
+import os
+import json
+
+import numpy as np
+import marisa_trie
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'embeddings')
+DEFAULT_STORE_NAME = 'glove-wiki-gigaword-50'
+PRECISIONS = ('float32', 'float16', 'int8')
+
+
+def store_paths(store_dir, name):
+    base = os.path.join(store_dir, name)
+    return {
+        'vectors': base + '.npy',
+        'vocab': base + '.marisa',
+        'meta': base + '.json',
+        'scales': base + '.scales.npy',  # int8 stores only
+    }
+
+
+def store_exists(store_dir=DEFAULT_STORE_DIR, name=DEFAULT_STORE_NAME):
+    paths = store_paths(store_dir, name)
+    return all(os.path.exists(paths[key]) for key in ('vectors', 'vocab', 'meta'))
+
+
+def quantize(matrix, precision):
+    """
+    Rows of matrix in precision: (data, scales). scales is None except for int8, where every
+    row gets the scale that maps its largest absolute value to 127
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+    if precision != 'int8':
+        return np.asarray(matrix, dtype=precision), None
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0  # all-zero rows stay zero
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize(data, scales=None):
+    """float32 rows of quantize(...) output"""
+    rows = np.asarray(data, dtype=np.float32)
+    return rows if scales is None else rows * np.asarray(scales)[..., None]
+
+
+class EmbeddingStore:
+    """
+    The subset of the gensim KeyedVectors API the category matcher uses:
+    `word in store.key_to_index`, `store[word]`, `store.vector_size` and `len(store)`.
+    Row i of the matrix is the vector of the word with trie id i
+    """
+
+    def __init__(self, vectors, vocab, meta=None, scales=None):
+        if len(vocab) != vectors.shape[0]:
+            raise ValueError(f"Vocabulary has {len(vocab)} words but the matrix has {vectors.shape[0]} rows")
+        if (vectors.dtype == np.int8) != (scales is not None):
+            raise ValueError("int8 vectors need per-vector scales, other precisions don't have them")
+
+        self.vectors = vectors
+        self.scales = scales
+        self.key_to_index = vocab  # a marisa Trie: `word in trie` and `trie[word]` -> row
+        self.vector_size = vectors.shape[1]
+        self.precision = str(vectors.dtype)
+        self.meta = meta or {}
+
+    @classmethod
+    def open(cls, store_dir=DEFAULT_STORE_DIR, name=DEFAULT_STORE_NAME):
+        paths = store_paths(store_dir, name)
+        vectors = np.load(paths['vectors'], mmap_mode='r')
+        scales = np.load(paths['scales'], mmap_mode='r') if vectors.dtype == np.int8 else None
+        vocab = marisa_trie.Trie()
+        vocab.mmap(paths['vocab'])
+        with open(paths['meta'], encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(vectors, vocab, meta, scales)
+
+    def __contains__(self, word):
+        return word in self.key_to_index
+
+    def __getitem__(self, word):
+        row = self.key_to_index[word]
+        if self.scales is None:
+            return np.asarray(self.vectors[row], dtype=np.float32)
+        return dequantize(self.vectors[row], self.scales[row])
+
+    def get_vector(self, word):
+        return self[word]
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+
+def write_store(words, vectors, store_dir=DEFAULT_STORE_DIR, name=DEFAULT_STORE_NAME, meta=None,
+                precision='float32'):
+    """Write words and their vectors (same order) as a store, rows reordered to trie ids"""
+    vocab = marisa_trie.Trie(words)
+    if len(vocab) != len(words):
+        raise ValueError("Words must be unique")
+
+    matrix = np.empty((len(words), vectors.shape[1]), dtype=np.float32)
+    matrix[[vocab[word] for word in words]] = vectors
+    data, scales = quantize(matrix, precision)
+
+    paths = store_paths(store_dir, name)
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(paths['vectors'], data)
+    if scales is not None:
+        np.save(paths['scales'], scales)
+    elif os.path.exists(paths['scales']):
+        os.remove(paths['scales'])  # left over from an earlier int8 store of the same name
+    vocab.save(paths['vocab'])
+    with open(paths['meta'], 'w', encoding='utf-8') as f:
+        json.dump({
+            **(meta or {}),
+            'words': len(words),
+            'dimensions': int(matrix.shape[1]),
+            'precision': precision
+        }, f, indent=2)
+
+    return {key: path for key, path in paths.items() if os.path.exists(path)}
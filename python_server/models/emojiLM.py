@@ -0,0 +1,416 @@
+# python_server/models/emojiLM.py
+# CPU inference for the emoji LM fine-tuned by models/trainLLMForEmoji.py.
+#
+# One generate call per request would leave the CPU doing tiny matrix products one prompt
+# at a time. MicroBatcher collects concurrent requests instead: the first one opens a
+# batch, which closes after max_wait_seconds or at max_batch_size prompts, and EmojiLM
+# then pads the whole batch on the left and generates it in one call.
+#
+# A server with several worker processes (gunicorn, ASGI_EXECUTOR=process) would load one
+# copy of the model per worker and batch only that worker's few concurrent requests. It
+# runs this module as one shared LM server per node instead, and its workers submit to it
+# with EmojiLMClient over a Unix socket:
+#   python -m models.emojiLM emoji-lora-adapter --socket /tmp/emoji-lm.sock
+# gunicorn.conf.py and asgi.py start and stop it themselves (see start_emoji_lm_server in
+# controllers/emojiController.py), or point EMOJI_LM_SOCKET at one run like above.
+#
+# Needs the packages in requirements-lm.txt.
+
+import os
+import sys
+import time
+import queue
+import logging
+import argparse
+import itertools
+import threading
+import subprocess
+from concurrent.futures import Future
+from multiprocessing.connection import Listener, Client
+
+from models.boundedExecutor import ExecutorBusy
+from models.trainLLMForEmoji import format_prompt
+
+logger = logging.getLogger(__name__)
+
+
+class EmojiLM:
+    """
+    The fine-tuned model on CPU, greedy decoding. path is a LoRA adapter directory as saved
+    by trainLLMForEmoji.py (merged into its base model on load) or a full model directory
+    """
+
+    def __init__(self, path, max_new_tokens=16, instruction="Translate to emoji", threads=None):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        if threads:
+            torch.set_num_threads(threads)
+
+        if os.path.exists(os.path.join(path, 'adapter_config.json')):
+            from peft import AutoPeftModelForCausalLM
+            # merging once saves the adapter's extra matmuls on every token
+            model = AutoPeftModelForCausalLM.from_pretrained(path).merge_and_unload()
+        else:
+            model = AutoModelForCausalLM.from_pretrained(path)
+
+        tokenizer = AutoTokenizer.from_pretrained(path)
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        # left padding keeps every prompt's last token at the end, where generation continues
+        tokenizer.padding_side = 'left'
+
+        self.torch = torch
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        self.max_new_tokens = max_new_tokens
+        self.instruction = instruction
+
+    def generate_batch(self, texts):
+        """Emoji for every text, in order, from one padded generate call"""
+        prompts = [format_prompt(self.instruction, text) for text in texts]
+        inputs = self.tokenizer(prompts, return_tensors='pt', padding=True)
+
+        with self.torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs,
+                max_new_tokens=self.max_new_tokens,
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=self.tokenizer.eos_token_id
+            )
+
+        generated = outputs[:, inputs['input_ids'].shape[1]:]
+        decoded = self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+        # the model answers on the line after the prompt, anything after that is not the answer
+        return [(text.strip().splitlines() or [''])[0].strip() for text in decoded]
+
+
+class MicroBatcher:
+    """
+    Runs generate_batch(items) -> results on a background thread over batches of the
+    items submitted concurrently. submit returns a Future, and raises ExecutorBusy when
+    max_pending items are already waiting
+    """
+
+    def __init__(self, generate_batch, max_batch_size=8, max_wait_seconds=0.01, max_pending=256,
+                 name="micro-batcher"):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.busy_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        if self._stopped.is_set():
+            raise RuntimeError("MicroBatcher has been shut down")
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            raise ExecutorBusy(f"{self._queue.maxsize} items already waiting")
+        return future
+
+    @property
+    def closed(self):
+        return self._stopped.is_set()
+
+    def shutdown(self):
+        self._stopped.set()
+        self._thread.join()
+        # fail whatever was still waiting instead of leaving its callers hanging
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("MicroBatcher has been shut down"))
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'pending': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_seconds * 1000
+            }
+
+    # helpers
+    def _collect(self):
+        """The next batch: blocks for its first item, then waits up to max_wait_seconds for more"""
+        while not self._stopped.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+                break
+            except queue.Empty:
+                continue
+        else:
+            return []
+
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # callers that gave up and cancelled their future are dropped here
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = self.generate_batch([item for item, _ in batch])
+            except Exception as e:
+                logger.error(f"❌ Batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self.busy_seconds += time.perf_counter() - started
+
+
+class EmojiLMServer:
+    """
+    Serves one MicroBatcher to every worker process of a node over a Unix socket. Each
+    connection sends (request_id, op, item) and gets (request_id, status, value) back:
+      ('generate', text)       -> 'ok' with the emoji, 'busy' or 'error' with a message
+      ('cancel', request_id)   -> no answer, drops that text if its batch hasn't started
+      ('stats', None)          -> 'ok' with the batcher's stats
+    """
+
+    def __init__(self, batcher, address):
+        self.batcher = batcher
+        self.address = address
+        self.listener = Listener(address, family='AF_UNIX')
+
+    def serve_forever(self):
+        while True:
+            conn = self.listener.accept()
+            threading.Thread(target=self._serve_connection, args=(conn,), name="emoji-lm-connection",
+                             daemon=True).start()
+
+    # helpers
+    def _serve_connection(self, conn):
+        send_lock = threading.Lock()
+        futures = {}
+
+        def reply(request_id, status, value):
+            try:
+                with send_lock:
+                    conn.send((request_id, status, value))
+            except (OSError, ValueError):
+                pass  # the worker went away, its requests are cancelled below
+
+        def on_done(request_id, future):
+            futures.pop(request_id, None)
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                reply(request_id, 'error', str(future.exception()))
+            else:
+                reply(request_id, 'ok', future.result())
+
+        try:
+            while True:
+                request_id, op, item = conn.recv()
+                if op == 'generate':
+                    try:
+                        future = self.batcher.submit(item)
+                    except ExecutorBusy as e:
+                        reply(request_id, 'busy', str(e))
+                        continue
+                    futures[request_id] = future
+                    future.add_done_callback(lambda f, request_id=request_id: on_done(request_id, f))
+                elif op == 'cancel':
+                    future = futures.pop(item, None)
+                    if future is not None:
+                        future.cancel()
+                elif op == 'stats':
+                    reply(request_id, 'ok', self.batcher.stats())
+        except (EOFError, OSError):
+            pass
+        finally:
+            for future in list(futures.values()):
+                future.cancel()
+            conn.close()
+
+
+class EmojiLMClient:
+    """
+    A worker's connection to the node's EmojiLMServer, with the same submit, stats,
+    closed and shutdown as MicroBatcher. Raises OSError if the server isn't listening (yet).
+    Once the server goes away, waiting futures fail and submit raises ConnectionError
+    """
+
+    def __init__(self, address, stats_timeout=1.0):
+        self.address = address
+        self.stats_timeout = stats_timeout
+        self._conn = Client(address, family='AF_UNIX')
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._receive, name="emoji-lm-client", daemon=True)
+        self._thread.start()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def submit(self, item):
+        future, request_id = self._request('generate', item)
+        # a caller that gives up cancels its future, the server then drops the text too
+        future.add_done_callback(lambda f: f.cancelled() and self._cancel(request_id))
+        return future
+
+    def stats(self):
+        try:
+            stats = self._request('stats')[0].result(timeout=self.stats_timeout)
+        except Exception as e:
+            stats = {'error': str(e) or type(e).__name__}
+        return {'server': self.address, **stats}
+
+    def shutdown(self):
+        self._fail_pending()
+        self._conn.close()
+
+    # helpers
+    def _request(self, op, item=None):
+        future = Future()
+        with self._pending_lock:
+            if self._closed:
+                raise ConnectionError(f"Emoji LM server at {self.address} went away")
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+        try:
+            self._send((request_id, op, item))
+        except (OSError, ValueError) as e:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            self._closed = True
+            raise ConnectionError(f"Emoji LM server at {self.address} went away: {e}")
+        return future, request_id
+
+    def _cancel(self, request_id):
+        with self._pending_lock:
+            self._pending.pop(request_id, None)
+        try:
+            self._send((None, 'cancel', request_id))
+        except (OSError, ValueError):
+            pass
+
+    def _send(self, message):
+        with self._send_lock:
+            self._conn.send(message)
+
+    def _receive(self):
+        try:
+            while True:
+                request_id, status, value = self._conn.recv()
+                with self._pending_lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None or not future.set_running_or_notify_cancel():
+                    continue
+                if status == 'ok':
+                    future.set_result(value)
+                elif status == 'busy':
+                    future.set_exception(ExecutorBusy(value))
+                else:
+                    future.set_exception(RuntimeError(value))
+        except (EOFError, OSError):
+            pass
+        self._fail_pending()
+
+    def _fail_pending(self):
+        # fail whatever was still waiting instead of leaving its callers hanging
+        with self._pending_lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if future.set_running_or_notify_cancel():
+                future.set_exception(ConnectionError(f"Emoji LM server at {self.address} went away"))
+
+
+def spawn_server(path, address, max_new_tokens=16, threads=0, max_batch_size=8, max_wait_seconds=0.01,
+                 max_pending=256):
+    """Start python -m models.emojiLM in a child process that exits with this one, returns the Popen"""
+    return subprocess.Popen([
+        sys.executable, '-m', 'models.emojiLM', path,
+        '--socket', address,
+        '--parent-pid', str(os.getpid()),
+        '--max-new-tokens', str(max_new_tokens),
+        '--threads', str(threads),
+        '--max-batch', str(max_batch_size),
+        '--max-wait-ms', str(max_wait_seconds * 1000),
+        '--max-pending', str(max_pending)
+    ], cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def exit_with_parent(parent_pid):
+    # a killed gunicorn master or uvicorn can't stop its server, so the server watches it
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    logger.info("Parent process exited, stopping the emoji LM server")
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the emoji LM to the worker processes of one node')
+    parser.add_argument('path', help='LoRA adapter or model directory')
+    parser.add_argument('--socket', required=True, help='Unix socket to listen on')
+    parser.add_argument('--parent-pid', type=int, help='exit when this process does')
+    parser.add_argument('--max-new-tokens', type=int, default=16)
+    parser.add_argument('--threads', type=int, default=0, help="torch threads, 0 keeps torch's default")
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--max-pending', type=int, default=256)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    if args.parent_pid:
+        threading.Thread(target=exit_with_parent, args=(args.parent_pid,), name="emoji-lm-parent",
+                         daemon=True).start()
+
+    lm = EmojiLM(args.path, max_new_tokens=args.max_new_tokens, threads=args.threads)
+    batcher = MicroBatcher(lm.generate_batch, max_batch_size=args.max_batch,
+                           max_wait_seconds=args.max_wait_ms / 1000, max_pending=args.max_pending,
+                           name="emoji-lm-batcher")
+
+    # workers only connect once the model has loaded, until then they report lm_loading
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    server = EmojiLMServer(batcher, args.socket)
+    logger.info(f"🧠 Emoji LM from {args.path} serving on {args.socket}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# python_server/models/itemIndex.py
+# Per-patient vector index of caregiver-created items, for matching phrases to a patient's own catalog
+
+import threading
+
+import numpy as np
+
+INITIAL_CAPACITY = 64
+
+
+class ItemIndex:
+    """
+    Thread-safe index of one patient's items: a unit-normalized vector per item in a
+    preallocated matrix, so add, remove and rename touch one row instead of rebuilding.
+
+    Rows are packed: removing an item moves the last row into its place. Search is an
+    exact top-k over the packed rows, one matrix-vector product and an argpartition:
+    linear in the catalog size, but under a millisecond up to about 20k items of 50 dims
+    """
+
+    def __init__(self, vector_size, dtype=np.float32):
+        self.vector_size = vector_size
+        self._vectors = np.zeros((INITIAL_CAPACITY, vector_size), dtype=dtype)
+        self._ids = []      # row -> item id
+        self._labels = []   # row -> item label
+        self._rows = {}     # item id -> row
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, item_id):
+        return item_id in self._rows
+
+    def add(self, item_id, label, vector):
+        """Add an item, or replace the label and vector of an existing one"""
+        unit = self._unit(vector)
+        with self._lock:
+            row = self._rows.get(item_id)
+            if row is None:
+                row = len(self._ids)
+                if row == len(self._vectors):
+                    self._grow()
+                self._ids.append(item_id)
+                self._labels.append(label)
+                self._rows[item_id] = row
+            else:
+                self._labels[row] = label
+            self._vectors[row] = unit
+
+    def rename(self, item_id, label, vector):
+        """Give an existing item a new label and vector, raises KeyError if it isn't indexed"""
+        unit = self._unit(vector)
+        with self._lock:
+            row = self._rows[item_id]
+            self._labels[row] = label
+            self._vectors[row] = unit
+
+    def remove(self, item_id):
+        """Remove an item, returns False if it wasn't indexed"""
+        with self._lock:
+            row = self._rows.pop(item_id, None)
+            if row is None:
+                return False
+
+            last = len(self._ids) - 1
+            if row != last:
+                # fill the hole with the last row so the live rows stay packed
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = self._ids[last]
+                self._labels[row] = self._labels[last]
+                self._rows[self._ids[row]] = row
+            self._ids.pop()
+            self._labels.pop()
+            return True
+
+    def search(self, vector, k=5):
+        """The k most similar items as [(item id, label, similarity)], most similar first"""
+        query = self._unit(vector)
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or k <= 0:
+                return []
+
+            similarities = self._vectors[:count] @ query
+            if k < count:
+                top = np.argpartition(similarities, count - k)[count - k:]
+            else:
+                top = np.arange(count)
+            top = top[np.argsort(-similarities[top], kind='stable')]
+            return [(self._ids[row], self._labels[row], float(similarities[row])) for row in top]
+
+    def items(self):
+        with self._lock:
+            return list(zip(self._ids, self._labels))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'items': len(self._ids),
+                'capacity': len(self._vectors),
+                'vector_size': self.vector_size,
+                'approx_bytes': self._vectors.nbytes
+            }
+
+    # helpers
+    def _unit(self, vector):
+        vector = np.asarray(vector, dtype=self._vectors.dtype)
+        if vector.shape != (self.vector_size,):
+            raise ValueError(f"Expected a vector of size {self.vector_size}, got shape {vector.shape}")
+        norm = np.linalg.norm(vector)
+        if not norm:
+            raise ValueError("Cannot index a zero vector")
+        return vector / norm
+
+    def _grow(self):
+        # call with the lock held; doubling keeps appends amortized O(1)
+        grown = np.zeros((len(self._vectors) * 2, self.vector_size), dtype=self._vectors.dtype)
+        grown[:len(self._vectors)] = self._vectors
+        self._vectors = grown
+
+
+class ItemIndexRegistry:
+    """
+    The item indexes of every patient in this process. node_server owns the catalogs,
+    the indexes are built from the copy it pushes into the CatalogStore
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, patient_id):
+        with self._lock:
+            return self._indexes.get(patient_id)
+
+    def get_or_create(self, patient_id, vector_size):
+        with self._lock:
+            index = self._indexes.get(patient_id)
+            if index is None or index.vector_size != vector_size:
+                index = self._indexes[patient_id] = ItemIndex(vector_size)
+            return index
+
+    def replace(self, patient_id, index):
+        """Swap in a freshly built index, eg. after a full catalog sync"""
+        with self._lock:
+            self._indexes[patient_id] = index
+
+    def drop(self, patient_id):
+        with self._lock:
+            return self._indexes.pop(patient_id, None) is not None
+
+    def stats(self):
+        with self._lock:
+            indexes = dict(self._indexes)
+        return {
+            'patients': len(indexes),
+            'items': sum(len(index) for index in indexes.values())
+        }
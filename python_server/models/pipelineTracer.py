@@ -0,0 +1,161 @@
+# python_server/models/pipelineTracer.py
+# Per-stage latency tracing for the Tmoji pipeline.
+#
+# A trace is started per request (always when the caller asks for timings, otherwise
+# for a sampled fraction of requests) and lives in a thread-local. Pipeline code wraps
+# each stage in `with stage("name"):`, which costs one attribute lookup when no trace is
+# active, so there is no timing or I/O on the hot path with tracing off.
+# Finished traces feed in-process histograms, one per stage.
+
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+
+SAMPLE_RATE = float(os.getenv("TMOJI_TRACE_SAMPLE_RATE", "0"))
+
+# upper bounds of the histogram buckets in milliseconds, the last bucket is unbounded
+BUCKET_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, percentiles are estimated from bucket bounds"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 4) if self.count else None,
+            'max_ms': round(self.max_ms, 4),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': {
+                **{f'le_{bound}': count for bound, count in zip(BUCKET_BOUNDS_MS, self.counts)},
+                'le_inf': self.counts[-1]
+            }
+        }
+
+
+class Trace:
+    """Stage timings of one request, a stage that runs several times is summed"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages_ms = {}
+
+    def add(self, name, ms):
+        self.stages_ms[name] = self.stages_ms.get(name, 0.0) + ms
+
+    def merge(self, child):
+        """Add the stages of a child trace, once the thread that recorded it is done with it"""
+        for name, ms in child.stages_ms.items():
+            self.add(name, ms)
+
+    def timings(self):
+        timings = {name: round(ms, 4) for name, ms in self.stages_ms.items()}
+        timings['total'] = round((time.perf_counter() - self.started) * 1000, 4)
+        return timings
+
+
+class _StageTimer:
+    __slots__ = ('trace', 'name', 'started')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class _NoOpStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_OP_STAGE = _NoOpStage()
+_local = threading.local()
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def start_trace(force=False):
+    """Start a trace on this thread if forced or sampled, returns it (or None)"""
+    if force or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE):
+        trace = Trace()
+    else:
+        trace = None
+    _local.trace = trace
+    return trace
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+def attach_trace(trace):
+    """
+    Record stages on this thread into trace. A trace is only ever written by one thread,
+    so work handed to an executor gets a child Trace that is merged back when it's done
+    """
+    _local.trace = trace
+
+
+def stage(name):
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return _NO_OP_STAGE
+    return _StageTimer(trace, name)
+
+
+def finish_trace(trace):
+    """Detach the trace from this thread and record it into the histograms, returns the timings"""
+    if getattr(_local, 'trace', None) is trace:
+        _local.trace = None
+    if trace is None:
+        return None
+
+    timings = trace.timings()
+    with _histograms_lock:
+        for name, ms in timings.items():
+            _histograms.setdefault(name, LatencyHistogram()).record(ms)
+    return timings
+
+
+def histogram_snapshot():
+    with _histograms_lock:
+        return {name: histogram.snapshot() for name, histogram in _histograms.items()}
@@ -1,63 +1,329 @@
-from datasets import load_dataset
-from transformers import AutoTokenizer, AutoModelForCausalLM, TrainingArguments, Trainer, DataCollatorForLanguageModeling
-from peft import prepare_model_for_kbit_training, LoraConfig, get_peft_model
-
-# 1) Load your JSONL dataset
-dataset = load_dataset("json", data_files="../data/emoji_dataset.jsonl")
-
-# 2) Format it
-def format_example(example):
-    return {"text": f"{example['instruction']}\n{example['input']}\n{example['output']}"}
-dataset = dataset.map(format_example)
-
-# 3) Load tokenizer & model
-model_name = "mistralai/Mistral-7B-v0.1"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForCausalLM.from_pretrained(model_name, load_in_4bit=True, device_map="auto")
-
-# 4) Apply LoRA
-model = prepare_model_for_kbit_training(model)
-config = LoraConfig(
-    r=8,
-    lora_alpha=32,
-    target_modules=["q_proj", "v_proj"],
-    lora_dropout=0.05,
-    bias="none",
-    task_type="CAUSAL_LM"
-)
-model = get_peft_model(model, config)
-
-# 5) Setup training
-training_args = TrainingArguments(
-    per_device_train_batch_size=2,
-    gradient_accumulation_steps=4,
-    warmup_steps=10,
-    max_steps=100,
-    learning_rate=2e-4,
-    fp16=True,
-    logging_steps=10,
-    output_dir="./emoji-lora",
-    save_strategy="no",
-    report_to="none"
-)
-data_collator = DataCollatorForLanguageModeling(tokenizer, mlm=False)
-trainer = Trainer(
-    model=model,
-    train_dataset=dataset["train"],
-    args=training_args,
-    tokenizer=tokenizer,
-    data_collator=data_collator
-)
-
-# 6) Train
-trainer.train()
-
-# 7) Test inference
-prompt = "Translate to emoji\nDo you want to drink some water?\n"
-inputs = tokenizer(prompt, return_tensors="pt").input_ids.cuda()
-outputs = model.generate(inputs, max_new_tokens=50)
-print(tokenizer.decode(outputs[0], skip_special_tokens=True))
-
-# 8) Save merged model
-model.save_pretrained("emoji-lora-merged")
-tokenizer.save_pretrained("emoji-lora-merged")
\ No newline at end of file
+# python_server/models/trainLLMForEmoji.py
+# LoRA fine-tuning of a causal LM on the text -> emoji dataset.
+#
+# The JSONL corpus is read line by line in shards of --shard-lines examples, never all at
+# once. Each shard is formatted and tokenized (with --num-proc processes) and saved under
+# --cache-dir keyed on a hash of its content, the tokenizer and the max length, so a rerun
+# only tokenizes the shards that changed: appending examples re-tokenizes the last shard.
+# Shards are grouped per dataset file, tokenizer and max length, and every run deletes the
+# shards of its group it no longer uses, so the cache doesn't grow as the corpus does.
+#
+# Training saves the LoRA adapter, not a merged model, to --save-dir (emoji-lora-adapter).
+# models/emojiLM.py merges it into its base model when it loads it.
+#
+# run from python_server/:
+#   python models/trainLLMForEmoji.py                                   # Mistral-7B, 4-bit on CUDA
+#   python models/trainLLMForEmoji.py --prepare-only                    # just build the token cache
+#   python models/trainLLMForEmoji.py --init-tiny-model /tmp/tiny-emoji-lm   # offline, random-weight tiny Mistral
+#   python models/trainLLMForEmoji.py --model /tmp/tiny-emoji-lm --device cpu --max-steps 2
+#
+# The last two are the CPU end-to-end check: no GPU, network or 4-bit quantization needed.
+# Any other local model directory or hub name works for --model too.
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import inspect
+import argparse
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DEFAULT_DATASET = os.path.join(DATA_DIR, 'emoji_dataset.jsonl')
+DEFAULT_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'tokenized')
+DEFAULT_MODEL = "mistralai/Mistral-7B-v0.1"
+
+# bump whenever format_examples or tokenize_examples change, so old cache entries aren't reused
+FORMAT_VERSION = 2
+
+# below this many examples per process, starting processes costs more than it saves
+MIN_EXAMPLES_PER_PROCESS = 1000
+
+
+# --- Dataset preparation ---
+def format_prompt(instruction, text):
+    """The prompt part of a training example, also what the model is given at inference"""
+    return f"{instruction}\n{text}\n"
+
+
+def format_examples(batch, eos_token):
+    # the EOS token teaches the model to stop after the emoji
+    return {"text": [
+        format_prompt(instruction, text) + output + eos_token
+        for instruction, text, output in zip(batch["instruction"], batch["input"], batch["output"])
+    ]}
+
+
+def tokenize_examples(batch, tokenizer, max_length):
+    return tokenizer(batch["text"], truncation=True, max_length=max_length)
+
+
+def iter_jsonl_shards(path, shard_lines):
+    """Non-empty lines of a JSONL file in lists of shard_lines, read as a stream"""
+    shard = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                shard.append(line)
+                if len(shard) == shard_lines:
+                    yield shard
+                    shard = []
+    if shard:
+        yield shard
+
+
+def tokenizer_fingerprint(tokenizer, model_name):
+    """Model name plus the tokenizer's full definition where it has one, so a retrained local tokenizer isn't mistaken for the old one"""
+    backend = getattr(tokenizer, 'backend_tokenizer', None)
+    if backend is not None:
+        # truncation and padding are call settings that tokenizing changes, not part of the vocabulary
+        definition = {k: v for k, v in json.loads(backend.to_str()).items() if k not in ('truncation', 'padding')}
+        definition = json.dumps(definition, sort_keys=True)
+    else:
+        definition = str(len(tokenizer))
+    return model_name + ':' + hashlib.sha256(definition.encode('utf-8')).hexdigest()[:16]
+
+
+def source_fingerprint(path, tokenizer_key, max_length):
+    """Cache group of a dataset file tokenized one way, its shards are pruned together"""
+    key = json.dumps([FORMAT_VERSION, os.path.abspath(path), tokenizer_key, max_length])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def prune_cache(source_dir, keep):
+    """Delete the cached shards in source_dir that aren't in keep, returns how many"""
+    pruned = 0
+    for name in os.listdir(source_dir):
+        if name not in keep:
+            shutil.rmtree(os.path.join(source_dir, name), ignore_errors=True)
+            pruned += 1
+    return pruned
+
+
+def shard_fingerprint(lines, tokenizer_key, max_length):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([FORMAT_VERSION, tokenizer_key, max_length]).encode('utf-8'))
+    for line in lines:
+        digest.update(line.encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def tokenize_shard(lines, tokenizer, max_length, num_proc):
+    from datasets import Dataset
+
+    shard = Dataset.from_list([json.loads(line) for line in lines])
+    num_proc = num_proc if num_proc and len(shard) >= MIN_EXAMPLES_PER_PROCESS * num_proc else None
+
+    shard = shard.map(format_examples, batched=True, num_proc=num_proc,
+                      fn_kwargs={"eos_token": tokenizer.eos_token or ""},
+                      remove_columns=shard.column_names)
+    return shard.map(tokenize_examples, batched=True, num_proc=num_proc,
+                     fn_kwargs={"tokenizer": tokenizer, "max_length": max_length},
+                     remove_columns=["text"])
+
+
+def prepare_dataset(path, tokenizer, model_name, cache_dir=DEFAULT_CACHE_DIR,
+                    shard_lines=5000, max_length=256, num_proc=None, rebuild=False):
+    """
+    Tokenized training set for path, one cached dataset per shard. Returns
+    (dataset, {'shards', 'cached', 'tokenized', 'pruned'})
+    """
+    from datasets import load_from_disk, concatenate_datasets
+
+    tokenizer_key = tokenizer_fingerprint(tokenizer, model_name)
+    source_dir = os.path.join(cache_dir, source_fingerprint(path, tokenizer_key, max_length))
+    os.makedirs(source_dir, exist_ok=True)
+    shards = []
+    used = set()
+    stats = {'shards': 0, 'cached': 0, 'tokenized': 0, 'pruned': 0}
+    for lines in iter_jsonl_shards(path, shard_lines):
+        fingerprint = shard_fingerprint(lines, tokenizer_key, max_length)
+        shard_dir = os.path.join(source_dir, fingerprint)
+        used.add(fingerprint)
+        stats['shards'] += 1
+
+        if os.path.isdir(shard_dir) and not rebuild:
+            shards.append(load_from_disk(shard_dir))
+            stats['cached'] += 1
+            continue
+
+        shard = tokenize_shard(lines, tokenizer, max_length, num_proc)
+        # write next to the final place and rename, so an interrupted run leaves no half shard
+        partial_dir = shard_dir + '.partial'
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        shard.save_to_disk(partial_dir)
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        os.replace(partial_dir, shard_dir)
+
+        shards.append(load_from_disk(shard_dir))
+        stats['tokenized'] += 1
+
+    if not shards:
+        raise ValueError(f"No examples in {path}")
+    # eg. the old last shard after examples were appended
+    stats['pruned'] = prune_cache(source_dir, used)
+    return concatenate_datasets(shards), stats
+
+
+# --- Model ---
+def resolve_device(device):
+    import torch
+
+    if device == 'auto':
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+    if device == 'cuda' and not torch.cuda.is_available():
+        raise ValueError("--device cuda but CUDA is not available")
+    return device
+
+
+def load_tokenizer(model_name):
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if tokenizer.pad_token is None:
+        # the LM collator pads batches; causal LMs like Mistral don't define a pad token
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
+def init_tiny_model(path, data_path=DEFAULT_DATASET):
+    """
+    Save a randomly initialised, few-hundred-kilobyte Mistral with a byte-level BPE tokenizer
+    trained on the dataset to path, for testing the whole pipeline offline on CPU
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers, decoders, trainers
+    from transformers import PreTrainedTokenizerFast, MistralConfig, MistralForCausalLM
+
+    texts = []
+    for lines in iter_jsonl_shards(data_path, 5000):
+        for line in lines:
+            example = json.loads(line)
+            texts.append(format_prompt(example["instruction"], example["input"]) + example["output"])
+
+    bpe = Tokenizer(models.BPE())
+    bpe.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    bpe.decoder = decoders.ByteLevel()
+    bpe.train_from_iterator(texts, trainers.BpeTrainer(
+        vocab_size=512, special_tokens=["<s>", "</s>"], initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    ))
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=bpe, bos_token="<s>", eos_token="</s>", pad_token="</s>")
+
+    config = MistralConfig(
+        vocab_size=len(tokenizer), hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=512,
+        bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id, pad_token_id=tokenizer.pad_token_id
+    )
+    MistralForCausalLM(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+def load_model(model_name, device, load_in_4bit, lora_targets):
+    from transformers import AutoModelForCausalLM, BitsAndBytesConfig
+    from peft import prepare_model_for_kbit_training, LoraConfig, get_peft_model
+
+    if device == 'cuda' and load_in_4bit:
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name, quantization_config=BitsAndBytesConfig(load_in_4bit=True), device_map="auto"
+        )
+        model = prepare_model_for_kbit_training(model)
+    else:
+        # bitsandbytes 4-bit needs CUDA: full precision, on whichever device was picked
+        model = AutoModelForCausalLM.from_pretrained(model_name).to(device)
+
+    config = LoraConfig(
+        r=8,
+        lora_alpha=32,
+        target_modules=lora_targets,
+        lora_dropout=0.05,
+        bias="none",
+        task_type="CAUSAL_LM"
+    )
+    return get_peft_model(model, config)
+
+
+def train(model, tokenizer, dataset, args, device):
+    from transformers import TrainingArguments, Trainer, DataCollatorForLanguageModeling
+
+    training_args = TrainingArguments(
+        per_device_train_batch_size=args.batch_size,
+        gradient_accumulation_steps=args.gradient_accumulation_steps,
+        warmup_steps=min(10, args.max_steps // 10),
+        max_steps=args.max_steps,
+        learning_rate=2e-4,
+        fp16=device == 'cuda',
+        use_cpu=device == 'cpu',
+        logging_steps=min(10, args.max_steps),
+        output_dir=args.output_dir,
+        save_strategy="no",
+        report_to="none",
+        dataloader_num_workers=args.num_proc or 0
+    )
+    data_collator = DataCollatorForLanguageModeling(tokenizer, mlm=False)
+    # newer transformers renamed Trainer's tokenizer argument
+    tokenizer_arg = 'processing_class' if 'processing_class' in inspect.signature(Trainer.__init__).parameters else 'tokenizer'
+    trainer = Trainer(
+        model=model,
+        train_dataset=dataset,
+        args=training_args,
+        data_collator=data_collator,
+        **{tokenizer_arg: tokenizer}
+    )
+    trainer.train()
+
+
+def generate(model, tokenizer, text, instruction="Translate to emoji", max_new_tokens=50):
+    inputs = tokenizer(format_prompt(instruction, text), return_tensors="pt").input_ids.to(model.device)
+    outputs = model.generate(inputs, max_new_tokens=max_new_tokens, pad_token_id=tokenizer.pad_token_id)
+    return tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LoRA fine-tune a causal LM on the emoji dataset')
+    parser.add_argument('--data', default=DEFAULT_DATASET, help='JSONL file with instruction/input/output examples')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='model name or local model directory')
+    parser.add_argument('--device', choices=('auto', 'cpu', 'cuda'), default='auto')
+    parser.add_argument('--no-4bit', dest='load_in_4bit', action='store_false', help='load in full precision on CUDA too')
+    parser.add_argument('--lora-targets', default='q_proj,v_proj', help='comma separated modules to adapt')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='tokenized shard cache')
+    parser.add_argument('--rebuild-cache', action='store_true', help='tokenize every shard again')
+    parser.add_argument('--shard-lines', type=int, default=5000, help='examples per shard')
+    parser.add_argument('--max-length', type=int, default=256, help='truncate examples to this many tokens')
+    parser.add_argument('--num-proc', type=int, default=min(4, os.cpu_count() or 1),
+                        help='processes for formatting, tokenization and data loading')
+    parser.add_argument('--prepare-only', action='store_true', help='build the token cache and exit')
+    parser.add_argument('--batch-size', type=int, default=2)
+    parser.add_argument('--gradient-accumulation-steps', type=int, default=4)
+    parser.add_argument('--max-steps', type=int, default=100)
+    parser.add_argument('--output-dir', default='./emoji-lora')
+    parser.add_argument('--save-dir', default='emoji-lora-adapter',
+                        help='where the LoRA adapter (not merged into the model) and tokenizer are saved')
+    parser.add_argument('--init-tiny-model', metavar='DIR', help='save a tiny random-weight model for CPU testing and exit')
+    args = parser.parse_args()
+
+    if args.init_tiny_model:
+        print(f"Tiny model saved to {init_tiny_model(args.init_tiny_model, args.data)}")
+        sys.exit(0)
+
+    # 1) Tokenizer and tokenized dataset (from the cache where the shards haven't changed)
+    tokenizer = load_tokenizer(args.model)
+    dataset, stats = prepare_dataset(args.data, tokenizer, args.model, args.cache_dir, args.shard_lines,
+                                     args.max_length, args.num_proc, args.rebuild_cache)
+    print(f"{len(dataset)} examples in {stats['shards']} shards: "
+          f"{stats['cached']} from the cache, {stats['tokenized']} tokenized, {stats['pruned']} stale shards pruned")
+    if args.prepare_only:
+        sys.exit(0)
+
+    # 2) Model with LoRA adapters
+    device = resolve_device(args.device)
+    model = load_model(args.model, device, args.load_in_4bit, args.lora_targets.split(','))
+
+    # 3) Train
+    train(model, tokenizer, dataset, args, device)
+
+    # 4) Test inference
+    print(generate(model, tokenizer, "Do you want to drink some water?"))
+
+    # 5) Save the adapter, EMOJI_LM_PATH can point straight at it
+    model.save_pretrained(args.save_dir)
+    tokenizer.save_pretrained(args.save_dir)
@@ -0,0 +1,23 @@
+# python_server/wsgi.py
+# Production entry point, served by gunicorn (see gunicorn.conf.py):
+#   gunicorn -c gunicorn.conf.py
+#
+# With preload_app this module is imported once in the gunicorn master. The models are
+# loaded and warmed here, before any worker is forked, so every worker starts ready and
+# shares the loaded pipeline with the master copy-on-write.
+#
+# The synonym index and WordNet bundle are build outputs, not part of the checkout:
+# run python models/buildSynonymIndex.py first, /ready stays 503 until one exists.
+
+import gc
+
+from app import create_app
+from controllers.emojiController import warm_up_emoji_model
+
+app = create_app(background_warm_up=False)
+warm_up_emoji_model()
+
+# Move everything loaded so far into the permanent generation. The workers' garbage
+# collections then skip it instead of touching (and so copying) the shared pages
+gc.collect()
+gc.freeze()